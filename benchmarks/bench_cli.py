@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Benchmark end-to-end wall time of main.py commands.
+
+Usage:
+    python benchmarks/bench_cli.py [SIZE ...] [--quick] [--output FILE]
+
+Each command runs in a fresh interpreter against a registry with SIZE
+entries, in-process (--no-daemon). Stub sudo, systemctl and docker
+binaries come first on PATH, so operations and status queries spawn
+processes as usual without touching the system.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from harness import ROOT, fake_binaries, main, measure, write_registry
+
+MAIN = os.path.join(ROOT, "main.py")
+
+COMMANDS = {
+    "list": ["list"],
+    "status": ["status", "--refresh"],
+    "operate": ["operate", "0", "--action", "restart"],
+}
+
+
+def run_cli(args: List[str], cwd: str) -> None:
+    subprocess.run([sys.executable, MAIN, "--no-daemon", *args], cwd=cwd, check=True,
+                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run(sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    with fake_binaries(), tempfile.TemporaryDirectory() as cwd:
+        os.makedirs(os.path.join(cwd, "data"))
+        for size in sizes:
+            write_registry(os.path.join(cwd, "data", "services.json"), size)
+            for name, args in COMMANDS.items():
+                results.append(measure(f"cli.{name}", lambda: run_cli(args, cwd), {"size": size}))
+    return results
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(run, __doc__.splitlines()[0]))
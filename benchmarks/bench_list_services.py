@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Benchmark Manager.list_services on large registries.
+
+Usage:
+    python benchmarks/bench_list_services.py [SIZE ...] [--quick] [--output FILE]
+
+``list_services`` is timed with the registry already parsed, so the
+numbers show the cost of building Service objects.
+"""
+
+import os
+import tempfile
+from typing import Any, Dict, List
+
+from harness import main, measure, write_registry
+
+from src.manager import Manager, ServiceRepository
+
+
+def bench(size: int, repeat: int = 5) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "services.json")
+        write_registry(path, size)
+        manager = Manager(ServiceRepository(path))
+        manager.list_services()
+        return measure("manager.list_services", manager.list_services, {"size": size}, repeat=repeat)
+
+
+def run(sizes: List[int]) -> List[Dict[str, Any]]:
+    return [bench(size) for size in sizes]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(run, __doc__.splitlines()[0]))
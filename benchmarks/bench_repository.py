@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Benchmark the registry backends: save, load_all and remove.
+
+Usage:
+    python benchmarks/bench_repository.py [SIZE ...] [--quick] [--output FILE]
+
+Each backend starts from a services.json with SIZE entries. ``load_all``
+is timed both on a freshly opened repository (cold) and on one that has
+already read the registry (warm).
+"""
+
+import itertools
+import os
+import tempfile
+from typing import Any, Dict, List
+
+from harness import main, measure, write_registry
+
+from src.services import Service
+from src.storage import make_repository
+
+STORAGES = ["json", "journal", "sqlite"]
+
+
+def close(repository) -> None:
+    if hasattr(repository, "close"):
+        repository.close()
+
+
+def bench_storage(storage: str, size: int) -> List[Dict[str, Any]]:
+    params = {"storage": storage, "size": size}
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "services.json")
+        write_registry(path, size)
+        repository = make_repository(storage, path)
+        repository.load_all()
+
+        # Cold loads open a new repository every round, so nothing is cached
+        cold = [make_repository(storage, path)]
+
+        def reopen() -> None:
+            close(cold[0])
+            cold[0] = make_repository(storage, path)
+
+        results.append(measure("repository.load_all.cold", lambda: cold[0].load_all(), params, setup=reopen))
+        close(cold[0])
+        results.append(measure("repository.load_all.warm", repository.load_all, params, number=10))
+
+        counter = itertools.count()
+        results.append(measure("repository.save",
+                               lambda: repository.save(Service("sys", f"bench-{next(counter)}")), params))
+        removed = itertools.count()
+        results.append(measure("repository.remove",
+                               lambda: repository.remove(f"bench-{next(removed)}"), params))
+        close(repository)
+    return results
+
+
+def run(sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        for storage in STORAGES:
+            results.extend(bench_storage(storage, size))
+    return results
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(run, __doc__.splitlines()[0]))
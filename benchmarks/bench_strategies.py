@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Benchmark generate_command throughput of every service strategy.
+
+Usage:
+    python benchmarks/bench_strategies.py [--output FILE]
+
+The sizes argument is accepted for symmetry with the other benchmarks but
+not used. No strategy opens a connection to build a command.
+"""
+
+import tempfile
+from typing import Any, Dict, List
+
+from harness import main, measure
+
+from src.docker_api import DockerClient
+from src.strategies import (SystemServiceStrategy, SystemdDBusStrategy, DockerServiceStrategy,
+                            DockerEngineStrategy)
+
+CALLS = 10_000
+
+
+def run(sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory() as project:
+        strategies = {
+            "systemctl": SystemServiceStrategy(),
+            "dbus": SystemdDBusStrategy(),
+            "compose": DockerServiceStrategy(project),
+            "engine": DockerEngineStrategy(project, DockerClient("/nonexistent/docker.sock")),
+        }
+        for name, strategy in strategies.items():
+            for operation in (0, 1):
+                results.append(measure("strategy.generate_command",
+                                       lambda: strategy.generate_command(operation, "web-1", project),
+                                       {"strategy": name, "operation": operation}, number=CALLS))
+    return results
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(run, __doc__.splitlines()[0]))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Shared helpers for the benchmark scripts.
+
+Every benchmark module exposes ``run(sizes) -> List[Dict]`` returning result
+records built by :func:`measure`, and can be run on its own through
+:func:`main`. ``run.py`` runs all of them and writes a single JSON report.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Registry sizes used when none are given on the command line
+DEFAULT_SIZES = [100, 10_000, 100_000]
+QUICK_SIZES = [100, 1_000]
+
+# Stand-ins for the binaries the manager spawns; they succeed without
+# touching the system. 'docker compose ls' answers with an empty project list.
+FAKE_BINARIES = {
+    "sudo": '#!/bin/sh\nexec "$@"\n',
+    "systemctl": "#!/bin/sh\nexit 0\n",
+    "docker": '#!/bin/sh\nif [ "$1" = compose ] && [ "$2" = ls ]; then echo "[]"; fi\nexit 0\n',
+}
+
+
+def measure(name: str,
+            fn: Callable[[], Any],
+            params: Optional[Dict[str, Any]] = None,
+            number: int = 1,
+            repeat: int = 5,
+            setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Time a function and return a result record.
+
+    Args:
+        name: Benchmark name, such as 'repository.save'
+        fn: Function to time
+        params: Parameters identifying the case, such as the registry size
+        number: Calls per timed round; times are reported per call
+        repeat: Number of timed rounds
+        setup: Function called before every round, outside the timing
+
+    Returns:
+        Record with the min, median, mean and max seconds per call
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "name": name,
+        "params": params or {},
+        "number": number,
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "max": max(timings),
+    }
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    """Identify a result across runs, e.g. 'repository.save[size=100,storage=json]'."""
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def write_registry(path: str, size: int) -> None:
+    """Write a services.json with ``size`` entries, half systemd units and half compose projects."""
+    services = []
+    for i in range(size):
+        if i % 2:
+            services.append({"tag": "docker", "name": f"stack-{i}", "path": f"/srv/stack-{i}"})
+        else:
+            services.append({"tag": "sys", "name": f"unit-{i}", "path": None})
+    with open(path, "w") as file:
+        json.dump(services, file)
+
+
+@contextmanager
+def fake_binaries() -> Iterator[str]:
+    """Put stub ``sudo``, ``systemctl`` and ``docker`` executables first on PATH.
+
+    Yields:
+        Directory holding the stubs
+    """
+    bin_dir = tempfile.mkdtemp(prefix="bench-bin-")
+    old_path = os.environ.get("PATH", "")
+    try:
+        for name, script in FAKE_BINARIES.items():
+            path = os.path.join(bin_dir, name)
+            with open(path, "w") as file:
+                file.write(script)
+            os.chmod(path, 0o755)
+        os.environ["PATH"] = bin_dir + os.pathsep + old_path
+        yield bin_dir
+    finally:
+        os.environ["PATH"] = old_path
+        shutil.rmtree(bin_dir, ignore_errors=True)
+
+
+def metadata() -> Dict[str, Any]:
+    """Describe the environment so reports from different commits can be told apart."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def report(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Wrap results in a report with the environment metadata."""
+    return {"meta": metadata(), "results": results}
+
+
+def print_table(results: List[Dict[str, Any]], file=sys.stderr) -> None:
+    """Print a human readable summary of the results."""
+    for result in results:
+        median = result["median"]
+        rate = f"{1 / median:,.0f}/s" if median > 0 else "-"
+        print(f"{result_key(result):<60} {median * 1000:10.3f} ms  {rate:>14}", file=file)
+
+
+def main(run: Callable[[List[int]], List[Dict[str, Any]]], description: str) -> int:
+    """Command line entry point of a single benchmark module."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("sizes", nargs="*", type=int, help=f"Registry sizes (default: {DEFAULT_SIZES})")
+    parser.add_argument("--quick", action="store_true", help=f"Use small sizes {QUICK_SIZES}")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    results = run(args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES))
+    print_table(results)
+    dump(report(results), args.output)
+    return 0
+
+
+def dump(data: Dict[str, Any], output: Optional[str] = None) -> None:
+    """Write a report as JSON to a file, or to stdout when no file is given."""
+    if output is None:
+        json.dump(data, sys.stdout, indent=2)
+        print()
+        return
+    with open(output, "w") as file:
+        json.dump(data, file, indent=2)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Run the benchmark suite and compare the report with an earlier one.
+
+Usage:
+    python benchmarks/run.py [--quick] [--only NAME ...] [--output FILE]
+                             [--baseline FILE] [--threshold 0.2]
+
+The JSON report goes to stdout or --output. With --baseline, the medians
+are compared with a report from another commit, and the exit code is 1
+when any benchmark got slower by more than the threshold.
+"""
+
+import argparse
+import json
+import logging
+import sys
+from typing import Any, Dict, List
+
+from harness import DEFAULT_SIZES, QUICK_SIZES, dump, print_table, report, result_key
+
+import bench_cli
+import bench_list_services
+import bench_repository
+import bench_strategies
+
+SUITES = {
+    "repository": bench_repository,
+    "list_services": bench_list_services,
+    "strategies": bench_strategies,
+    "cli": bench_cli,
+}
+
+# The CLI spawns a process per call; 100k entries only measures JSON parsing again
+CLI_MAX_SIZE = 10_000
+
+
+def compare(baseline: Dict[str, Any], results: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """Compare medians with a baseline report.
+
+    Args:
+        baseline: Report written by an earlier run
+        results: Results of this run
+        threshold: Relative slowdown counted as a regression, e.g. 0.2 for 20%
+
+    Returns:
+        Keys of the benchmarks that regressed
+    """
+    previous = {result_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    print(f"Compared with {baseline.get('meta', {}).get('commit') or 'baseline'}:", file=sys.stderr)
+    for result in results:
+        key = result_key(result)
+        if key not in previous:
+            continue
+        ratio = result["median"] / previous[key]["median"] if previous[key]["median"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<60} {ratio:6.2f}x{flag}", file=sys.stderr)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--quick", action="store_true", help=f"Use small sizes {QUICK_SIZES} instead of {DEFAULT_SIZES}")
+    parser.add_argument("--only", nargs="+", choices=list(SUITES), help="Run only these suites")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Slowdown of the median counted as a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    sizes = QUICK_SIZES if args.quick else DEFAULT_SIZES
+    results = []
+    for name in args.only or SUITES:
+        suite_sizes = [s for s in sizes if s <= CLI_MAX_SIZE] if name == "cli" else sizes
+        print(f"Running {name}...", file=sys.stderr)
+        results.extend(SUITES[name].run(suite_sizes))
+
+    print_table(results)
+    dump(report(results), args.output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if compare(baseline, results, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,69 +1,551 @@
 #!/usr/bin/env python3
 
 import argparse
-import json
 import os
-from src.manager import ServiceFactory, ServiceRepository, Manager
-from src.services import DockerServiceStrategy, SystemServiceStrategy
+import sys
+
+SOCKET_PATH = "data/manager.sock"
+STATUS_CACHE = "data/status-cache.json"
+FINGERPRINTS = "data/fingerprints.json"
+DISCOVERY_CACHE = "data/discovery-cache.json"
+LOG_FILE = "data/manager.log.jsonl"
+OUTPUT_TAIL_LINES = 10
+# 守护进程启动时固定、客户端无法转发的全局选项
+DAEMON_SETTINGS = ("storage", "transport", "metrics_textfile", "log_sink", "log_file", "log_rate")
+
+
+def format_service(index, tag, name, path, depends_on=None):
+    """格式化一行服务列表输出"""
+    line = f"{index}: [{tag}] {name} {f'(path: {path})' if path else ''}"
+    if depends_on:
+        line += f" (depends on: {', '.join(depends_on)})"
+    return line
+
+
+def print_output_tail(result):
+    """输出失败命令的最后几行"""
+    if result.output:
+        for line in result.output.splitlines()[-OUTPUT_TAIL_LINES:]:
+            print(f"      | {line}")
+
+
+def print_summary(results):
+    """输出批量操作汇总，返回退出码"""
+    print("Summary:")
+    for result in results:
+        status = "OK" if result.ok else "FAILED"
+        code = "-" if result.returncode is None else result.returncode
+        line = f"  [{status}] [{result.tag}] {result.name} (exit code: {code})"
+        if result.error and not result.ok:
+            line += f": {result.error}"
+        print(line)
+        if not result.ok:
+            print_output_tail(result)
+    failed = sum(1 for r in results if not r.ok)
+    print(f"{len(results) - failed} succeeded, {failed} failed")
+    return 1 if failed else 0
+
+
+def print_results(results, as_json=False):
+    """输出操作结果，返回退出码"""
+    if as_json:
+        import json
+        print(json.dumps([r.to_dict() for r in results], indent=2))
+        return 1 if any(not r.ok for r in results) else 0
+    return print_summary(results)
+
+
+def resolve_operation(args):
+    """确定要执行的操作：优先使用 --action，仅在终端交互时提示输入
+
+    返回操作码，用户取消时返回 None；无法提示时抛出 ValueError
+    """
+    from src.services import OPERATIONS, get_operation
+    if args.action:
+        return OPERATIONS[args.action]
+    if not sys.stdin.isatty():
+        raise ValueError("--action is required when stdin is not a terminal")
+    return get_operation()
+
+
+def read_manifest(args):
+    """读取 register --from 指定的清单，未指定时返回 None
+
+    与位置参数同时使用或两者都缺失时抛出 ValueError
+    """
+    if args.manifest is None:
+        if args.tag is None or args.name is None:
+            raise ValueError("tag and name are required unless --from is given")
+        return None
+    if args.tag or args.name or args.path or args.depends_on:
+        raise ValueError("--from cannot be combined with a tag, name, --path or --depends-on")
+    from src.manifest import load_manifest
+    return load_manifest(args.manifest)
+
+
+def run_discover(args, registered, register, remove):
+    """查找尚未注册的服务并批量注册，返回退出码
+
+    registered 为已注册服务的记录；register 接收注册条目、remove 接收服务名称，
+    均返回处理过的服务名称
+    """
+    if not (args.root or args.systemd):
+        raise ValueError("--root or --systemd is required")
+    if args.sync and not args.systemd:
+        raise ValueError("--sync requires --systemd")
+    from src import discovery
+    entries, stale = [], []
+    if args.root:
+        cache = discovery.DirectoryCache(DISCOVERY_CACHE)
+        cache.load()
+        projects = discovery.find_compose_projects(args.root, args.max_depth, args.max_parallel, cache)
+        cache.save()
+        entries += discovery.compose_entries(projects, registered)
+    if args.systemd:
+        units = discovery.list_systemd_units()
+        entries += discovery.systemd_entries(units, registered + entries, args.pattern)
+        if args.sync:
+            stale = discovery.stale_systemd_services(units, registered, args.pattern)
+    if not (entries or stale):
+        print("No new services found")
+        return 0
+    if args.dry_run:
+        for entry in entries:
+            path = f" (path: {entry['path']})" if entry["path"] else ""
+            print(f"Would register: [{entry['tag']}] {entry['name']}{path}")
+        for name in stale:
+            print(f"Would remove: {name}")
+        return 0
+    if stale:
+        names = remove(stale)
+        print(f"Removed {len(names)} services whose unit is gone: {', '.join(names)}")
+    if entries:
+        names = register(entries)
+        print(f"Registered {len(names)} services: {', '.join(names)}")
+    return 0
+
+
+def print_status(statuses, as_json=False):
+    """输出服务运行状态"""
+    if as_json:
+        import json
+        print(json.dumps([s.to_dict() for s in statuses], indent=2))
+        return
+    for status in statuses:
+        detail = f" ({status.detail})" if status.detail else ""
+        pid = f", pid {status.pid}" if status.pid else ""
+        print(f"[{status.tag}] {status.name}: {status.state}{detail}{pid}")
+
+
+def run_remote(client, args):
+    """通过守护进程执行命令"""
+    from src.client import DaemonError
+    from src.services import OperationResult
+
+    try:
+        if args.command == "register":
+            entries = read_manifest(args)
+            if entries is not None:
+                services = client.call("register_many", services=entries)
+                print(f"Registered {len(services)} services: {', '.join(s['name'] for s in services)}")
+                return 0
+            service = client.call("register", tag=args.tag, name=args.name, path=args.path,
+                                  depends_on=args.depends_on)
+            print(f"Register a new service successfully: {service['name']}")
+
+        elif args.command == "list":
+            for i, service in enumerate(client.call("list")):
+                print(format_service(i, service["tag"], service["name"], service.get("path"),
+                                     service.get("depends_on")))
+
+        elif args.command == "operate":
+            if not (args.all or args.tag or args.selector):
+                print("Error: no services selected")
+                return 1
+            operation = resolve_operation(args)
+            if operation is None:
+                print("Operation cancelled")
+                return 0
+            results = client.call("operate", operation=operation, selectors=args.selector, tag=args.tag,
+                                  all=args.all, max_parallel=args.max_parallel,
+                                  coalesce=not args.no_coalesce, ordered=args.ordered,
+                                  rolling=args.rolling, batch_size=args.batch_size,
+                                  health_cmd=args.health_cmd, health_url=args.health_url,
+                                  health_tcp=args.health_tcp, health_timeout=args.health_timeout,
+                                  on_failure=args.on_failure, if_changed=args.if_changed)
+            return print_results([OperationResult.from_dict(r) for r in results], args.json)
+
+        elif args.command == "remove":
+            for name in client.call("remove", selectors=args.selector, tag=args.tag):
+                print(f"Service {name} removed successfully")
+
+        elif args.command == "discover":
+            return run_discover(args, client.call("list"),
+                                lambda entries: [s["name"] for s in client.call("register_many", services=entries)],
+                                lambda names: client.call("remove", selectors=names, tag="sys"))
+
+        elif args.command == "status":
+            from src.status import ServiceStatus
+            result = client.call("status", services=True, selectors=args.selector, tag=args.tag,
+                                 refresh=args.refresh)
+            print_status([ServiceStatus.from_dict(s) for s in result["services"]], args.json)
+
+    except (DaemonError, ValueError, OSError) as e:
+        print(f"Error: {str(e)}")
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+def daemon_settings(args):
+    """返回需要与守护进程一致的全局选项"""
+    return {name: getattr(args, name) for name in DAEMON_SETTINGS}
+
+
+def configure_logging(args):
+    """按命令行选项配置日志输出"""
+    from src.log import setup_logging
+    setup_logging(sink=args.log_sink, path=args.log_file, rate=args.log_rate or None)
+
+
+def serve(args):
+    """以守护进程方式运行管理器"""
+    import signal
+    from src.daemon import ManagerDaemon
+    from src.manager import Manager
+    from src.storage import make_repository
+
+    if args.status:
+        from src.client import DaemonClient
+        client = DaemonClient.connect(args.socket, timeout=5)
+        if client is None:
+            print(f"No daemon listening on {args.socket}")
+            return 1
+        status = client.call("status")["daemon"]
+        client.close()
+        print(f"Daemon {status['pid']} on {status['socket']}: up {status['uptime']:.0f}s, "
+              f"{'busy' if status['busy'] else 'idle'}, {status['queued']} queued")
+        return 0
+
+    os.makedirs("data", exist_ok=True)
+    manager = Manager(make_repository(args.storage, "data/services.json"), transport=args.transport,
+                      metrics_textfile=args.metrics_textfile, fingerprints=FINGERPRINTS)
+    daemon = ManagerDaemon(manager, args.socket, daemon_settings(args))
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.shutdown())
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(f"Error: {str(e)}")
+        return 1
+    return 0
+
 
 def main():
     parser = argparse.ArgumentParser(description="=====> Web Services Manager <=====")
+    parser.add_argument("--storage", choices=["json", "journal", "sqlite"], default="json",
+                        help="Storage backend of the service registry (default: json)")
+    parser.add_argument("--socket", default=SOCKET_PATH,
+                        help=f"Unix socket of the manager daemon (default: {SOCKET_PATH})")
+    parser.add_argument("--no-daemon", action="store_true",
+                        help="Run in-process even if a manager daemon is running")
+    parser.add_argument("--transport", choices=["cli", "native"], default="cli",
+                        help="Operate services by spawning systemctl/docker compose (cli) or through the D-Bus and Docker Engine APIs (native) (default: cli)")
+    parser.add_argument("--metrics-textfile", metavar="PATH",
+                        help="Write operation counters and latency histograms to this .prom file, e.g. in the node_exporter textfile collector directory")
+    parser.add_argument("--log-sink", choices=["console", "json", "journald"], default="console",
+                        help="Where log records go: colored stderr, JSON lines in --log-file, or the systemd journal (default: console)")
+    parser.add_argument("--log-file", default=LOG_FILE, help=f"Log file of the json sink (default: {LOG_FILE})")
+    parser.add_argument("--log-rate", type=float, default=10.0,
+                        help="INFO messages per second allowed from each logging call, 0 to log everything (default: 10)")
     subparsers = parser.add_subparsers(dest="command", required=True)
     
     # 注册服务命令
     register_parser = subparsers.add_parser("register", help="Register a new service")
-    register_parser.add_argument("tag", choices=["sys", "docker"], help="Tag of the service")
-    register_parser.add_argument("name", help="Name of the service")
+    register_parser.add_argument("tag", nargs="?", choices=["sys", "docker"], help="Tag of the service")
+    register_parser.add_argument("name", nargs="?", help="Name of the service")
+    register_parser.add_argument("--from", dest="manifest", metavar="FILE", help="Register every service listed in a JSON or YAML manifest at once, '-' reads it from stdin")
     register_parser.add_argument("--path", help="Config/Data path of the service where the 'docker-compose.yml' located (docker-based services only)")
+    register_parser.add_argument("--depends-on", nargs="+", metavar="NAME", help="Services that must be up before this one")
     
     # 列出服务命令
     subparsers.add_parser("list", help="List all services")
     
     # 执行操作命令
     operate_parser = subparsers.add_parser("operate", help="Service operations to carry out")
-    operate_parser.add_argument("index", type=int, help="Index of the service, which is a integer")
+    operate_parser.add_argument("selector", nargs="*", help="Indexes, ranges such as 5-20, names or glob patterns such as 'web-*'")
+    operate_parser.add_argument("--action", choices=["stop", "restart", "start", "reload"], help="Operation to carry out (default: ask interactively)")
+    operate_parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    operate_parser.add_argument("--all", action="store_true", help="Operate on all services")
+    operate_parser.add_argument("--tag", choices=["sys", "docker"], help="Operate on all services with this tag")
+    operate_parser.add_argument("--max-parallel", type=int, default=4, help="Maximum number of operations running at once (default: 4)")
+    operate_parser.add_argument("--ordered", action="store_true", help="Follow service dependencies: start dependencies first, stop dependents first")
+    operate_parser.add_argument("--no-coalesce", action="store_true", help="Run one systemctl command per unit instead of batching units into one call")
+    operate_parser.add_argument("--rolling", action="store_true", help="Operate in waves and wait for each wave to pass a health check before the next one")
+    operate_parser.add_argument("--batch-size", type=int, default=1, help="Number of services per rolling wave (default: 1)")
+    operate_parser.add_argument("--health-cmd", help="Health command for rolling waves, '{name}' is replaced with the service name (default: check the service state)")
+    operate_parser.add_argument("--health-url", help="URL that must answer HTTP 200 for rolling waves, e.g. http://localhost:8080/health")
+    operate_parser.add_argument("--health-tcp", metavar="HOST:PORT", help="TCP port that must accept connections for rolling waves")
+    operate_parser.add_argument("--health-timeout", type=float, default=60.0, help="Seconds a service may take to become healthy (default: 60)")
+    operate_parser.add_argument("--if-changed", action="store_true", help="Only start or restart docker services whose compose files, .env or images changed since the last --if-changed run brought them up")
+    operate_parser.add_argument("--on-failure", choices=["abort", "continue"], default="abort", help="Abort the rollout or roll forward when a wave fails (default: abort)")
     
     # 移除服务命令
     remove_parser = subparsers.add_parser("remove", help="Remove a service")
-    remove_parser.add_argument("index", type=int, help="Index of the service to remove")
+    remove_parser.add_argument("selector", nargs="*", help="Indexes, ranges, names or glob patterns of the services to remove")
+    remove_parser.add_argument("--tag", choices=["sys", "docker"], help="Remove all services with this tag")
+    
+    # 自动发现服务命令
+    discover_parser = subparsers.add_parser("discover", help="Find and register services automatically")
+    discover_parser.add_argument("--root", action="append", metavar="DIR", help="Directory to search for compose projects; may be given more than once")
+    discover_parser.add_argument("--max-depth", type=int, default=3, help="Directory levels below each root to search (default: 3)")
+    discover_parser.add_argument("--max-parallel", type=int, default=8, help="Maximum number of directories scanned at once (default: 8)")
+    discover_parser.add_argument("--systemd", action="store_true", help="Register systemd service units found with systemctl list-units")
+    discover_parser.add_argument("--pattern", action="append", metavar="GLOB", help="Only consider systemd units matching this pattern, e.g. 'web-*'; may be given more than once")
+    discover_parser.add_argument("--sync", action="store_true", help="Also remove registered systemd services whose unit no longer exists")
+    discover_parser.add_argument("--dry-run", action="store_true", help="Only print the services that would be registered")
+
+    # 查看服务状态命令
+    status_parser = subparsers.add_parser("status", help="Show whether services are running")
+    status_parser.add_argument("selector", nargs="*", help="Indexes, ranges, names or glob patterns (default: all services)")
+    status_parser.add_argument("--tag", choices=["sys", "docker"], help="Only show services with this tag")
+    status_parser.add_argument("--refresh", action="store_true", help="Query every service again instead of using cached states")
+    status_parser.add_argument("--json", action="store_true", help="Print the states as JSON")
+    
+    # 守护进程命令
+    serve_parser = subparsers.add_parser("serve", help="Run the manager daemon on a Unix socket")
+    serve_parser.add_argument("--status", action="store_true", help="Show the state of the running daemon")
     
     args = parser.parse_args()
+
+    if args.command == "operate" and not args.rolling and (args.health_cmd or args.health_url or args.health_tcp):
+        # 健康检查只在滚动操作的每一波之后执行
+        print("Error: --health-cmd, --health-url and --health-tcp require --rolling")
+        return 1
+
+    if args.command == "serve":
+        configure_logging(args)
+        return serve(args)
+
+    # 守护进程运行时作为瘦客户端，否则在进程内执行
+    if not args.no_daemon:
+        from src.client import DaemonClient
+        client = DaemonClient.connect(args.socket)
+        if client is not None:
+            # 守护进程的存储、传输和日志设置与本次命令不同时不能代为执行
+            from src.client import DaemonError
+            try:
+                mismatched = client.mismatched_settings(daemon_settings(args))
+            except (DaemonError, OSError) as e:
+                client.close()
+                print(f"Error: daemon unavailable on {args.socket}: {str(e)}")
+                return 1
+            if mismatched:
+                client.close()
+                options = ", ".join("--" + name.replace("_", "-") for name in mismatched)
+                print(f"Error: the daemon on {args.socket} runs with different {options}; "
+                      f"pass the same options, stop the daemon or use --no-daemon")
+                return 1
+            return run_remote(client, args)
+
+    # 解析参数后再导入项目模块并配置日志，保证 CLI 启动速度
+    from src.manager import Manager, parse_selectors
+    from src.storage import make_repository, is_pattern
+    configure_logging(args)
     
     # 初始化仓库和管理器
     # 确保 data 目录存在
     os.makedirs("data", exist_ok=True)
-    repo = ServiceRepository("data/services.json")
-    manager = Manager(repo)
+    repo = make_repository(args.storage, "data/services.json")
+    manager = Manager(repo, transport=args.transport, status_cache=STATUS_CACHE,
+                      metrics_textfile=args.metrics_textfile, fingerprints=FINGERPRINTS)
     
     if args.command == "register":
+        # 从清单批量注册
+        try:
+            entries = read_manifest(args)
+            if entries is not None:
+                services = manager.register_services(entries)
+                print(f"Registered {len(services)} services: {', '.join(s.name for s in services)}")
+                return 0
+        except (ValueError, OSError) as e:
+            print(f"Error: {str(e)}")
+            return 1
         # 创建服务
-        service = manager.register_service(args.tag, args.name, args.path)
+        try:
+            service = manager.register_service(args.tag, args.name, args.path, args.depends_on)
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            return 1
         print(f"Register a new service successfully: {service.name}")
         
     elif args.command == "list":
         # 列出所有服务
         services = manager.list_services()
         for i, service in enumerate(services):
-            print(f"{i}: [{service.tag}] {service.name} {f'(path: {service.path})' if service.path else ''}")
+            print(format_service(i, service.tag, service.name, service.path, service.depends_on))
             
     elif args.command == "operate":
-        # 执行服务操作
         try:
-            manager.execute_service_operation(args.index)
+            indexes, names = parse_selectors(args.selector) if not args.all else (None, [])
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            return 1
+
+        # 滚动和依赖顺序选项需要走批量路径
+        single = (not args.all and args.tag is None and len(args.selector) == 1 and not args.if_changed
+                  and not (args.rolling or args.ordered))
+        if single and (args.selector[0].isdigit() or (indexes is None and not is_pattern(names[0]))):
+            try:
+                operation = resolve_operation(args)
+            except ValueError as e:
+                print(f"Error: {str(e)}")
+                return 1
+            if operation is None:
+                print("Operation cancelled")
+                return 0
+            try:
+                if args.selector[0].isdigit():
+                    # 按索引执行单个服务操作
+                    result = manager.execute_service_operation(int(args.selector[0]), operation)
+                else:
+                    # 按名称执行单个服务操作
+                    result = manager.execute_named_operation(names[0], operation)
+            except IndexError:
+                print("Error: invalid index")
+                return 1
+            except ValueError as e:
+                print(f"Error: {str(e)}")
+                return 1
+            if result is None:
+                print("Operation cancelled")
+                return 0
+            if args.json:
+                return print_results([result], True)
+            if not result.ok:
+                print(f"Operation failed: {result.error}")
+                print_output_tail(result)
+                return 1
             print("Operation success!")
-        except IndexError:
-            print("Error: invalid index")
-        except Exception as e:
-            print(f"Operation failed: {str(e)}")
+            return 0
+
+        # 批量执行服务操作
+        if not (args.all or args.tag or args.selector):
+            print("Error: no services selected")
+            return 1
+        try:
+            services = manager.select_services(indexes, args.tag, names)
+        except (IndexError, ValueError) as e:
+            print(f"Error: {str(e)}")
+            return 1
+        if not services:
+            print("Error: no services matched")
+            return 1
+
+        try:
+            operation = resolve_operation(args)
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            return 1
+        if operation is None:
+            print("Operation cancelled")
+            return 0
+        if args.if_changed:
+            # 只重建配置发生变化的 docker 服务
+            if operation not in (1, 2):
+                print("Error: --if-changed only applies to start and restart")
+                return 1
+            changed = manager.changed_services(services, args.max_parallel)
+            kept = {id(s) for s in changed}
+            unchanged = [s.name for s in services if id(s) not in kept]
+            if unchanged and not args.json:
+                print(f"Unchanged, skipped: {', '.join(unchanged)}")
+            if not changed:
+                if args.json:
+                    return print_results([], True)
+                print("Nothing changed")
+                return 0
+            services = changed
+        try:
+            if args.rolling:
+                from src.health import make_probes
+                probes = make_probes(args.health_cmd, args.health_url, args.health_tcp)
+                results = manager.execute_rolling_operation(services, operation, args.batch_size, probes,
+                                                            args.on_failure, args.health_timeout,
+                                                            args.max_parallel)
+            elif args.ordered:
+                results = manager.execute_ordered_operation(services, operation, args.max_parallel)
+            else:
+                results = manager.execute_bulk_operation(services, operation, args.max_parallel,
+                                                         coalesce=not args.no_coalesce)
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            return 1
+        if args.if_changed:
+            manager.record_fingerprints(services, results, args.max_parallel)
+
+        # 输出汇总
+        return print_results(results, args.json)
             
     elif args.command == "remove":
+        if len(args.selector) == 1 and args.selector[0].isdigit() and args.tag is None:
+            index = int(args.selector[0])
+            try:
+                manager.remove_service(index)
+                print(f"Service at index {index} removed successfully")
+            except IndexError:
+                print("Error: invalid index")
+            except Exception as e:
+                print(f"Remove failed: {str(e)}")
+            return 0
+
+        # 按名称、通配符或标签移除
+        if not (args.selector or args.tag):
+            print("Error: no services selected")
+            return 1
         try:
-            manager.remove_service(args.index)
-            print(f"Service at index {args.index} removed successfully")
+            indexes, names = parse_selectors(args.selector)
+            services = manager.select_services(indexes, args.tag, names)
+            if not services:
+                print("Error: no services matched")
+                return 1
+            manager.remove_services(services)
         except IndexError:
             print("Error: invalid index")
+            return 1
         except Exception as e:
             print(f"Remove failed: {str(e)}")
+            return 1
+        for service in services:
+            print(f"Service {service.name} removed successfully")
+
+    elif args.command == "discover":
+        def remove_units(names):
+            services = manager.select_services(None, "sys", names)
+            manager.remove_services(services)
+            return [s.name for s in services]
+
+        try:
+            return run_discover(args, repo.load_all(),
+                                lambda entries: [s.name for s in manager.register_services(entries)],
+                                remove_units)
+        except (ValueError, OSError) as e:
+            print(f"Error: {str(e)}")
+            return 1
+
+    elif args.command == "status":
+        # 批量查询服务状态
+        services = None
+        if args.selector or args.tag:
+            try:
+                indexes, names = parse_selectors(args.selector)
+                services = manager.select_services(indexes, args.tag, names)
+            except (ValueError, IndexError) as e:
+                print(f"Error: {str(e)}")
+                return 1
+        print_status(manager.status(services, refresh=args.refresh), args.json)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
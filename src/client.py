@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import json
+import socket
+from typing import Any, Dict, List, Optional
+
+
+class DaemonUnavailable(ConnectionError):
+    """Raised when no manager daemon is listening on the socket."""
+
+
+class DaemonError(Exception):
+    """Error returned by the manager daemon.
+    
+    Attributes:
+        error_type: Name of the exception raised inside the daemon
+    """
+
+    def __init__(self, message: str, error_type: Optional[str] = None):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+class DaemonClient:
+    """Client for the manager daemon's line-delimited JSON-RPC socket.
+    
+    The connection is opened on the first call and reused afterwards.
+    """
+
+    def __init__(self, socket_path: str = 'data/manager.sock', timeout: Optional[float] = None):
+        """Initialize a client.
+        
+        Args:
+            socket_path: Path of the daemon's Unix socket
+            timeout: Seconds to wait for a response, None to wait indefinitely
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._next_id = 1
+
+    @classmethod
+    def connect(cls, socket_path: str = 'data/manager.sock', timeout: Optional[float] = None) -> Optional['DaemonClient']:
+        """Connect to a running daemon.
+        
+        Args:
+            socket_path: Path of the daemon's Unix socket
+            timeout: Seconds to wait for a response, None to wait indefinitely
+            
+        Returns:
+            Connected client, or None if no daemon is running
+        """
+        client = cls(socket_path, timeout)
+        try:
+            client._open()
+        except DaemonUnavailable:
+            return None
+        return client
+
+    def call(self, method: str, **params: Any) -> Any:
+        """Call a daemon method and wait for its result.
+        
+        Args:
+            method: Method name ('register', 'list', 'operate', 'remove', 'status')
+            **params: Method parameters
+            
+        Returns:
+            The method's result
+            
+        Raises:
+            DaemonUnavailable: If the daemon cannot be reached
+            DaemonError: If the daemon reports an error
+        """
+        if self._sock is None:
+            self._open()
+        request = {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params}
+        self._next_id += 1
+        try:
+            self._sock.sendall((json.dumps(request) + "\n").encode())
+            line = self._reader.readline()
+        except OSError as e:
+            self.close()
+            raise DaemonUnavailable(f"Lost connection to daemon: {str(e)}")
+        if not line:
+            self.close()
+            raise DaemonUnavailable("Daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            error = response["error"]
+            raise DaemonError(error.get("message", "Unknown error"), (error.get("data") or {}).get("type"))
+        return response.get("result")
+
+    def mismatched_settings(self, settings: Dict[str, Any]) -> List[str]:
+        """Compare settings with those the daemon was started with.
+        
+        Args:
+            settings: Setting name -> value the caller would use
+            
+        Returns:
+            Names of the settings the daemon uses differently
+            
+        Raises:
+            DaemonUnavailable: If the daemon cannot be reached
+            DaemonError: If the daemon reports an error
+        """
+        daemon = self.call("status")["daemon"].get("settings") or {}
+        return [name for name, value in settings.items() if daemon.get(name) != value]
+
+    def close(self) -> None:
+        """Close the connection."""
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = None
+            self._reader = None
+
+    def _open(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            sock.close()
+            raise DaemonUnavailable(f"No daemon listening on {self.socket_path}: {str(e)}")
+        sock.settimeout(self.timeout)
+        self._sock = sock
+        self._reader = sock.makefile('rb')
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+
+from src.manager import Manager, parse_selectors
+from src.services import parse_operation
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serve line-delimited JSON-RPC requests on one client connection."""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                response = _error(None, PARSE_ERROR, f"Parse error: {str(e)}")
+            else:
+                response = self.server.daemon.handle_request(request)
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, daemon: 'ManagerDaemon'):
+        self.daemon = daemon
+        super().__init__(socket_path, _RequestHandler)
+
+
+def _error(request_id: Any, code: int, message: str, error_type: Optional[str] = None) -> Dict:
+    error = {"code": code, "message": message}
+    if error_type:
+        error["data"] = {"type": error_type}
+    return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+
+class ManagerDaemon:
+    """Long-running manager serving requests over a Unix socket.
+    
+    The Manager and its repository stay in memory between requests. Reads
+    are answered directly; register, operate and remove requests run one at
+    a time on an internal worker queue, so conflicting changes never overlap.
+    """
+
+    def __init__(self,
+                 manager: Manager,
+                 socket_path: str = 'data/manager.sock',
+                 settings: Optional[Dict[str, Any]] = None):
+        """Initialize the daemon.
+        
+        Args:
+            manager: Manager used to serve requests
+            socket_path: Path of the Unix socket to listen on
+            settings: Options the daemon was started with, reported by
+                status() so clients can tell whether it serves their request
+                as they asked (optional)
+        """
+        self.manager = manager
+        self.socket_path = socket_path
+        self.settings = settings or {}
+        self.started_at = time.time()
+        self._jobs: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._busy = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._server: Optional[_UnixServer] = None
+        self.methods: Dict[str, Callable[..., Any]] = {
+            "register": self.register,
+            "register_many": self.register_many,
+            "list": self.list_services,
+            "operate": self.operate,
+            "remove": self.remove,
+            "status": self.status,
+        }
+
+    def serve_forever(self) -> None:
+        """Bind the socket and serve requests until shutdown() is called."""
+        self.start()
+        logger.info(f"Manager daemon listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._cleanup()
+
+    def start(self) -> None:
+        """Bind the socket and start the worker without serving yet."""
+        self._remove_stale_socket()
+        self._server = _UnixServer(self.socket_path, self)
+        os.chmod(self.socket_path, 0o600)
+        self._worker = threading.Thread(target=self._work, name="manager-worker", daemon=True)
+        self._worker.start()
+
+    def shutdown(self) -> None:
+        """Stop serving requests; safe to call from another thread or a signal handler."""
+        if self._server is not None:
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def handle_request(self, request: Any) -> Dict:
+        """Dispatch one JSON-RPC request.
+        
+        Args:
+            request: Decoded request object
+            
+        Returns:
+            JSON-RPC response object
+        """
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return _error(None, INVALID_REQUEST, "Invalid request")
+        request_id = request.get("id")
+        method = self.methods.get(request["method"])
+        if method is None:
+            return _error(request_id, METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+        params = request.get("params") or {}
+        if not isinstance(params, dict):
+            return _error(request_id, INVALID_PARAMS, "Params must be an object")
+        try:
+            result = method(**params)
+        except TypeError as e:
+            return _error(request_id, INVALID_PARAMS, f"Invalid params: {str(e)}")
+        except Exception as e:
+            logger.error(f"Request {request['method']} failed: {str(e)}")
+            return _error(request_id, SERVER_ERROR, str(e), type(e).__name__)
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def register(self, tag: str, name: str, path: Optional[str] = None,
+                 depends_on: Optional[List[str]] = None) -> Dict:
+        """Register a service on the worker queue."""
+        service = self._submit(self.manager.register_service, tag, name, path, depends_on)
+        return service.to_dict()
+
+    def register_many(self, services: List[Dict], max_parallel: int = 8) -> List[Dict]:
+        """Register manifest entries with a single write on the worker queue."""
+        registered = self._submit(self.manager.register_services, services, max_parallel)
+        return [s.to_dict() for s in registered]
+
+    def list_services(self) -> List[Dict]:
+        """List all registered services."""
+        return self.manager.repository.load_all()
+
+    def operate(self,
+                operation: Union[int, str],
+                selectors: Optional[List[str]] = None,
+                tag: Optional[str] = None,
+                all: bool = False,
+                max_parallel: int = 4,
+                coalesce: bool = True,
+                ordered: bool = False,
+                rolling: bool = False,
+                batch_size: int = 1,
+                health_cmd: Optional[str] = None,
+                health_url: Optional[str] = None,
+                health_tcp: Optional[str] = None,
+                health_timeout: float = 60.0,
+                on_failure: str = "abort",
+                if_changed: bool = False) -> List[Dict]:
+        """Run an operation on the selected services on the worker queue.
+        
+        Args:
+            operation: 0=stop, 1=restart, 2=start, 3=reload, or the action name
+            selectors: Indexes, ranges, names or glob patterns
+            tag: Only select services with this tag (optional)
+            all: Select every service
+            max_parallel: Maximum number of operations running at once
+            coalesce: Merge systemd units into a single systemctl call
+            ordered: Respect dependencies between the services
+            rolling: Operate in waves of batch_size services gated on health probes
+            batch_size: Number of services per rolling wave
+            health_cmd: Health command for rolling waves (optional)
+            health_url: URL expected to answer HTTP 200 for rolling waves (optional)
+            health_tcp: 'host:port' expected to accept connections for rolling waves (optional)
+            health_timeout: Seconds a service may take to become healthy
+            on_failure: 'abort' or 'continue' after a failed rolling wave
+            if_changed: Only operate on docker services whose compose
+                configuration changed since the last if_changed run
+            
+        Returns:
+            List of operation results
+            
+        Raises:
+            ValueError: If nothing is selected, if_changed is set for a stop
+                or reload, or a health check is given without rolling
+        """
+        operation = parse_operation(operation)
+        if if_changed and operation not in (1, 2):
+            raise ValueError("--if-changed only applies to start and restart")
+        if not rolling and (health_cmd or health_url or health_tcp):
+            raise ValueError("--health-cmd, --health-url and --health-tcp require --rolling")
+
+        def run() -> List[Dict]:
+            services = self._select(selectors, tag, all)
+            if if_changed:
+                services = self.manager.changed_services(services, max_parallel)
+            if rolling:
+                from src.health import make_probes
+                results = self.manager.execute_rolling_operation(
+                    services, operation, batch_size, make_probes(health_cmd, health_url, health_tcp),
+                    on_failure, health_timeout, max_parallel)
+            elif ordered:
+                results = self.manager.execute_ordered_operation(services, operation, max_parallel)
+            else:
+                results = self.manager.execute_bulk_operation(services, operation, max_parallel, coalesce=coalesce)
+            if if_changed:
+                self.manager.record_fingerprints(services, results, max_parallel)
+            return [r.to_dict() for r in results]
+        return self._submit(run)
+
+    def remove(self, selectors: Optional[List[str]] = None, tag: Optional[str] = None) -> List[str]:
+        """Remove the selected services on the worker queue.
+        
+        Returns:
+            Names of the removed services
+        """
+        def run() -> List[str]:
+            services = self._select(selectors, tag, False)
+            self.manager.remove_services(services)
+            return [s.name for s in services]
+        return self._submit(run)
+
+    def status(self,
+               services: bool = False,
+               selectors: Optional[List[str]] = None,
+               tag: Optional[str] = None,
+               refresh: bool = False) -> Dict:
+        """Report the daemon's own state and optionally the services' states.
+        
+        Service states are read from the manager's cache, so this does not
+        wait behind queued operations.
+        
+        Args:
+            services: Include the state of the selected services
+            selectors: Indexes, ranges, names or glob patterns (all services by default)
+            tag: Only select services with this tag (optional)
+            refresh: Query every state again instead of using cached ones
+        """
+        status = {
+            "daemon": {
+                "pid": os.getpid(),
+                "socket": self.socket_path,
+                "uptime": round(time.time() - self.started_at, 3),
+                "queued": self._jobs.qsize(),
+                "busy": self._busy.is_set(),
+                "settings": self.settings,
+            }
+        }
+        if services:
+            selected = self._select(selectors, tag, False) if selectors or tag else self.manager.list_services()
+            status["services"] = [s.to_dict() for s in self.manager.status(selected, refresh)]
+        return status
+
+    def _select(self, selectors: Optional[List[str]], tag: Optional[str], all: bool) -> list:
+        if not (all or tag or selectors):
+            raise ValueError("No services selected")
+        indexes, names = parse_selectors(selectors or []) if not all else (None, [])
+        services = self.manager.select_services(indexes, tag, names)
+        if not services:
+            raise ValueError("No services matched")
+        return services
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func on the worker thread and wait for its result."""
+        future: Future = Future()
+        self._jobs.put((future, func, args))
+        return future.result()
+
+    def _work(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            future, func, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            self._busy.set()
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._busy.clear()
+
+    def _remove_stale_socket(self) -> None:
+        """Remove a socket left behind by a daemon that is no longer running.
+        
+        Raises:
+            RuntimeError: If another daemon is still listening
+        """
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except ConnectionRefusedError:
+            os.unlink(self.socket_path)
+        else:
+            raise RuntimeError(f"Another daemon is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    def _cleanup(self) -> None:
+        self._jobs.put(None)
+        if self._server is not None:
+            self._server.server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        logger.info("Manager daemon stopped")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+import time
+from queue import Empty, Queue
+from typing import Any, List, Optional, Sequence, Tuple
+
+BUS_NAME = 'org.freedesktop.DBus'
+BUS_PATH = '/org/freedesktop/DBus'
+
+SYSTEMD_NAME = 'org.freedesktop.systemd1'
+SYSTEMD_PATH = '/org/freedesktop/systemd1'
+SYSTEMD_MANAGER = 'org.freedesktop.systemd1.Manager'
+
+# Unit suffixes systemctl accepts without appending '.service'
+UNIT_SUFFIXES = ('.service', '.socket', '.target', '.timer', '.mount', '.automount', '.path',
+                 '.swap', '.slice', '.scope', '.device')
+
+# Seconds between checks that the connection is still alive while waiting for signals
+POLL_INTERVAL = 0.5
+
+
+class DBusError(Exception):
+    """Error reply to a D-Bus method call.
+
+    Attributes:
+        name: D-Bus error name, such as 'org.freedesktop.systemd1.NoSuchUnit'
+    """
+
+    def __init__(self, name: str, message: str = ''):
+        super().__init__(message or name)
+        self.name = name
+
+
+def unit_name(service_name: str) -> str:
+    """Return the full unit name, appending '.service' like systemctl does."""
+    if service_name.endswith(UNIT_SUFFIXES):
+        return service_name
+    return service_name + '.service'
+
+
+class DBusConnection:
+    """Connection to a D-Bus message bus, built on jeepney.
+
+    A jeepney router reads incoming messages on a background thread and
+    hands each reply to the call waiting for it, so several threads can
+    share one socket. A reply that arrives after its call timed out is
+    dropped.
+    """
+
+    def __init__(self, address: Optional[str] = None):
+        """Connect, authenticate and register with the bus.
+
+        Args:
+            address: D-Bus server address such as 'unix:path=/run/dbus/system_bus_socket';
+                defaults to $DBUS_SYSTEM_BUS_ADDRESS or the standard system bus
+
+        Raises:
+            ValueError: If jeepney is not installed
+            OSError: If the bus cannot be reached
+            ConnectionError: If authentication fails
+        """
+        try:
+            from jeepney.io.threading import DBusRouter, open_dbus_connection
+        except ImportError:
+            raise ValueError("The native systemd transport requires jeepney (uv sync --extra native)")
+        self._connection = open_dbus_connection(address or 'SYSTEM')
+        self._router = DBusRouter(self._connection)
+        self._closed = False
+        self.unique_name = self._connection.unique_name
+
+    @property
+    def closed(self) -> bool:
+        """Whether the connection has been closed or lost."""
+        # The router's receiver thread exits when the socket is closed or fails
+        return self._closed or not self._router._rcv_thread.is_alive()
+
+    def call(self, destination: str, path: str, interface: str, member: str,
+             signature: str = '', *args: Any, timeout: Optional[float] = None) -> Tuple[Any, ...]:
+        """Call a method and wait for its reply.
+
+        Returns:
+            Body of the reply
+
+        Raises:
+            DBusError: If the method returns an error
+            TimeoutError: If no reply arrives in time
+            ConnectionError: If the connection is lost
+        """
+        from jeepney import DBusAddress, HeaderFields, MessageType, new_method_call
+        from jeepney.io.common import RouterClosed
+
+        message = new_method_call(DBusAddress(path, destination, interface), member, signature or None, args)
+        try:
+            reply = self._router.send_and_get_reply(message, timeout=timeout)
+        except TimeoutError:
+            raise TimeoutError(f"Timed out waiting for the reply to {member}")
+        except (RouterClosed, OSError) as e:
+            self._closed = True
+            raise ConnectionError(f"D-Bus connection closed: {str(e)}")
+        if reply.header.message_type == MessageType.error:
+            raise DBusError(reply.header.fields.get(HeaderFields.error_name, ''),
+                            reply.body[0] if reply.body else '')
+        return reply.body
+
+    def signals(self, interface: str, member: str, path: Optional[str] = None):
+        """Collect matching signals while the returned context manager is open.
+
+        Usage::
+
+            with connection.signals(SYSTEMD_MANAGER, 'JobRemoved') as queue:
+                message = queue.get()
+
+        Matching is done locally; the bus only forwards signals a match
+        rule was added for (see add_match()).
+        """
+        from jeepney import MatchRule
+        return self._router.filter(MatchRule(type='signal', interface=interface, member=member, path=path),
+                                   queue=Queue())
+
+    def add_match(self, sender: str, path: str, interface: str, member: str) -> None:
+        """Ask the bus to forward a signal to this connection."""
+        self.call(BUS_NAME, BUS_PATH, BUS_NAME, 'AddMatch', 's',
+                  f"type='signal',sender='{sender}',path='{path}',interface='{interface}',member='{member}'")
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._closed = True
+        self._router.close()
+        self._connection.close()
+
+
+class SystemdClient:
+    """Runs systemd jobs over a D-Bus connection and waits for them to finish.
+
+    Job completion is tracked through the manager's JobRemoved signal.
+    """
+
+    def __init__(self, connection: DBusConnection):
+        """Subscribe to job completion signals on a connection.
+
+        Args:
+            connection: Connected bus
+        """
+        self.connection = connection
+        connection.add_match(SYSTEMD_NAME, SYSTEMD_PATH, SYSTEMD_MANAGER, 'JobRemoved')
+        connection.call(SYSTEMD_NAME, SYSTEMD_PATH, SYSTEMD_MANAGER, 'Subscribe')
+
+    def run_jobs(self, jobs: Sequence[Tuple[str, str]], timeout: Optional[float] = None) -> List[Optional[str]]:
+        """Start several unit jobs at once and wait for all of them.
+
+        Each call returns as soon as systemd has queued the job, so the
+        jobs run concurrently.
+
+        Args:
+            jobs: (method, unit) pairs, e.g. ('RestartUnit', 'nginx.service')
+            timeout: Seconds to wait for all jobs (optional)
+
+        Returns:
+            One entry per job: None on success, otherwise an error message
+
+        Raises:
+            TimeoutError: If the jobs do not finish in time
+            ConnectionError: If the connection is lost
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        remaining = lambda: None if deadline is None else max(deadline - time.monotonic(), 0)
+
+        errors: List[Optional[str]] = [None] * len(jobs)
+        # Listen before queueing the jobs so no completion signal is missed
+        with self.connection.signals(SYSTEMD_MANAGER, 'JobRemoved', SYSTEMD_PATH) as queue:
+            paths = {}
+            for i, (method, unit) in enumerate(jobs):
+                try:
+                    paths[self.connection.call(SYSTEMD_NAME, SYSTEMD_PATH, SYSTEMD_MANAGER, method, 'ss',
+                                               unit, 'replace', timeout=remaining())[0]] = i
+                except DBusError as e:
+                    errors[i] = f"{method} {unit} failed: {str(e)}"
+
+            while paths:
+                wait = remaining()
+                if wait == 0:
+                    raise TimeoutError(f"Timed out waiting for {len(paths)} systemd jobs")
+                try:
+                    message = queue.get(timeout=POLL_INTERVAL if wait is None else min(wait, POLL_INTERVAL))
+                except Empty:
+                    if self.connection.closed:
+                        raise ConnectionError("D-Bus connection closed while waiting for jobs")
+                    continue
+                _, job, _, result = message.body
+                i = paths.pop(job, None)
+                if i is not None and result != 'done':
+                    errors[i] = f"Job for {jobs[i][1]} failed with result '{result}'"
+        return errors
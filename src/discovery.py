@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.storage import FileLock, atomic_write, name_key
+
+logger = logging.getLogger(__name__)
+
+# A directory holding one of these is a compose project
+PROJECT_FILES = ("compose.yaml", "compose.yml", "docker-compose.yaml", "docker-compose.yml")
+
+
+class DirectoryCache:
+    """Listing of scanned directories, reused while their mtime is unchanged.
+
+    A directory's mtime changes when entries are added, removed or renamed
+    in it, so an unchanged directory still has the same subdirectories and
+    compose files. Entries map the absolute path to its mtime in
+    nanoseconds, whether it is a compose project and its subdirectories.
+    """
+
+    def __init__(self, file_path: str = 'data/discovery-cache.json'):
+        self.file_path = file_path
+        self.lock = FileLock(file_path + '.lock')
+        self.entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Read the cache file; a missing or corrupted file leaves the cache empty."""
+        try:
+            with open(self.file_path) as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            logger.warning(f"Discovery cache {self.file_path} is corrupted, ignoring it")
+            return
+        if isinstance(data, dict):
+            self.entries = data
+
+    def save(self) -> None:
+        """Write the cache file atomically."""
+        dir_path = os.path.dirname(self.file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        with self.lock.hold():
+            atomic_write(self.file_path, json.dumps(self.entries, sort_keys=True))
+
+    def get(self, path: str, mtime_ns: int) -> Optional[Tuple[bool, List[str]]]:
+        """Return (is_project, subdirectories) if path was scanned at this mtime."""
+        with self._lock:
+            entry = self.entries.get(path)
+            if entry is None or entry.get("mtime_ns") != mtime_ns:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry["project"], entry["subdirs"]
+
+    def put(self, path: str, mtime_ns: int, project: bool, subdirs: List[str]) -> None:
+        with self._lock:
+            self.entries[path] = {"mtime_ns": mtime_ns, "project": project, "subdirs": subdirs}
+
+    def prune(self, roots: Iterable[str], scanned: Iterable[str]) -> None:
+        """Forget directories under the roots that the last walk did not reach."""
+        prefixes = tuple(os.path.join(root, "") for root in roots)
+        scanned = set(scanned)
+        self.entries = {path: entry for path, entry in self.entries.items()
+                        if path in scanned or not path.startswith(prefixes)}
+
+
+def _scan(path: str, cache: Optional[DirectoryCache]) -> Tuple[bool, List[str]]:
+    """List one directory: whether it is a compose project and its subdirectories.
+
+    Hidden directories and symlinks are not followed.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError as e:
+        logger.warning(f"Cannot scan {path}: {str(e)}")
+        return False, []
+    if cache is not None:
+        cached = cache.get(path, mtime_ns)
+        if cached is not None:
+            return cached
+
+    project = False
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name in PROJECT_FILES:
+                    project = project or entry.is_file()
+                elif not entry.name.startswith(".") and entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+    except OSError as e:
+        logger.warning(f"Cannot scan {path}: {str(e)}")
+        return False, []
+    subdirs.sort()
+    if cache is not None:
+        cache.put(path, mtime_ns, project, subdirs)
+    return project, subdirs
+
+
+def find_compose_projects(roots: Iterable[str],
+                          max_depth: int = 3,
+                          max_workers: int = 8,
+                          cache: Optional[DirectoryCache] = None) -> List[str]:
+    """Find directories holding a compose file under the given roots.
+
+    The trees are walked level by level, each level's directories being
+    scanned concurrently on a thread pool. The walk does not descend into
+    compose projects.
+
+    Args:
+        roots: Directories to search
+        max_depth: Levels below a root to search; 0 only checks the roots
+        max_workers: Maximum number of directories scanned at once
+        cache: Listings of earlier walks; updated with this walk (optional)
+
+    Returns:
+        Sorted absolute paths of the compose projects
+
+    Raises:
+        ValueError: If max_depth is negative or max_workers is not positive
+    """
+    if max_depth < 0:
+        raise ValueError(f"max_depth must not be negative: {max_depth}")
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1: {max_workers}")
+    from concurrent.futures import ThreadPoolExecutor
+
+    roots = sorted({os.path.abspath(os.path.expanduser(root)) for root in roots})
+    frontier = roots
+    scanned: List[str] = []
+    projects: List[str] = []
+    depth = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while frontier:
+            scanned.extend(frontier)
+            next_frontier = []
+            for path, (project, subdirs) in zip(frontier, executor.map(lambda p: _scan(p, cache), frontier)):
+                if project:
+                    projects.append(path)
+                elif depth < max_depth:
+                    next_frontier.extend(subdirs)
+            frontier = next_frontier
+            depth += 1
+    if cache is not None:
+        cache.prune(roots, scanned)
+        logger.info(f"Scanned {len(scanned)} directories ({cache.misses} read, {cache.hits} cached), "
+                    f"found {len(projects)} compose projects")
+    else:
+        logger.info(f"Scanned {len(scanned)} directories, found {len(projects)} compose projects")
+    return sorted(projects)
+
+
+def compose_entries(projects: Iterable[str], registered: Iterable[Dict]) -> List[Dict]:
+    """Build register entries for compose projects that are not registered yet.
+
+    A project is named after its directory, like docker compose names it.
+    Projects whose path or name is already registered are left out, as are
+    later projects sharing a directory name with an earlier one.
+
+    Args:
+        projects: Project directories
+        registered: Registered service records
+
+    Returns:
+        Entries for Manager.register_services()
+    """
+    registered = list(registered)
+    paths = {os.path.abspath(os.path.expanduser(s["path"])) for s in registered if s.get("path")}
+    names = {name_key(s["name"]) for s in registered}
+    entries = []
+    for path in projects:
+        name = os.path.basename(path.rstrip(os.sep))
+        if path in paths:
+            continue
+        if name_key(name) in names:
+            logger.warning(f"Skipping {path}: a service named '{name}' is already registered")
+            continue
+        names.add(name_key(name))
+        entries.append({"tag": "docker", "name": name, "path": path, "depends_on": None})
+    return entries
+
+
+def list_systemd_units(timeout: float = 30.0) -> List[str]:
+    """List the loaded systemd service units with a single ``systemctl list-units`` call.
+
+    The JSON output is used when systemctl supports it; older versions are
+    read from the plain-text table instead. Units whose unit file does not
+    exist (load state 'not-found', such as units only named as a
+    dependency) are left out.
+
+    Args:
+        timeout: Seconds to wait for systemctl
+
+    Returns:
+        Unit names without the '.service' suffix, sorted
+
+    Raises:
+        ValueError: If systemctl cannot be run or fails
+    """
+    import subprocess
+
+    command = ["systemctl", "list-units", "--type=service", "--all", "--no-pager"]
+    try:
+        result = subprocess.run(command + ["--output=json"], capture_output=True, text=True, timeout=timeout)
+        # (unit, load state) pairs
+        units = None
+        if result.returncode == 0:
+            try:
+                units = [(unit["unit"], unit.get("load")) for unit in json.loads(result.stdout)]
+            except (ValueError, TypeError, KeyError, AttributeError):
+                logger.info("systemctl cannot print JSON, reading the plain unit list")
+        if units is None:
+            result = subprocess.run(command + ["--plain", "--no-legend"], capture_output=True, text=True,
+                                    timeout=timeout, check=True)
+            units = [_parse_unit_row(line) for line in result.stdout.splitlines()]
+    except (OSError, subprocess.SubprocessError) as e:
+        raise ValueError(f"Cannot list systemd units: {str(e)}")
+    return sorted({unit[:-len(".service")] for unit, load in units
+                   if unit.endswith(".service") and load != "not-found"})
+
+
+def _parse_unit_row(line: str) -> Tuple[str, Optional[str]]:
+    """Read the UNIT and LOAD columns of a ``list-units --plain`` row."""
+    fields = line.split()
+    # Skip the status bullet older versions print even in plain mode
+    for i, field in enumerate(fields):
+        if field.endswith(".service"):
+            return field, fields[i + 1] if i + 1 < len(fields) else None
+    return "", None
+
+
+def matches_patterns(name: str, patterns: Optional[Iterable[str]]) -> bool:
+    """Whether a unit name matches any glob pattern (case insensitive).
+
+    Patterns may include the '.service' suffix. Every name matches when
+    there are no patterns.
+    """
+    from fnmatch import fnmatchcase
+
+    patterns = [name_key(p) for p in patterns or ()]
+    if not patterns:
+        return True
+    key = name_key(name)
+    return any(fnmatchcase(key, p) or fnmatchcase(key + ".service", p) for p in patterns)
+
+
+def systemd_entries(units: Iterable[str],
+                    registered: Iterable[Dict],
+                    patterns: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Build register entries for matching units that are not registered yet.
+
+    Args:
+        units: Unit names from list_systemd_units()
+        registered: Registered service records
+        patterns: Glob patterns the unit names must match (optional)
+
+    Returns:
+        Entries for Manager.register_services()
+    """
+    patterns = list(patterns or ())
+    names = {name_key(s["name"]) for s in registered}
+    return [{"tag": "sys", "name": unit, "path": None, "depends_on": None}
+            for unit in units if name_key(unit) not in names and matches_patterns(unit, patterns)]
+
+
+def stale_systemd_services(units: Iterable[str],
+                           registered: Iterable[Dict],
+                           patterns: Optional[Iterable[str]] = None) -> List[str]:
+    """Find registered systemd services whose unit no longer exists.
+
+    list-units only shows loaded units, so registered services missing from
+    it are confirmed with one ``systemctl show`` call; stopped units that
+    are merely unloaded are kept.
+
+    Args:
+        units: Unit names from list_systemd_units()
+        registered: Registered service records
+        patterns: Only consider services matching these glob patterns (optional)
+
+    Returns:
+        Names of the services to remove
+
+    Raises:
+        ValueError: If the units cannot be queried
+    """
+    patterns = list(patterns or ())
+    listed = {name_key(unit) for unit in units}
+    candidates = [s["name"] for s in registered
+                  if s["tag"] == "sys" and name_key(s["name"]) not in listed and matches_patterns(s["name"], patterns)]
+    if not candidates:
+        return []
+    import subprocess
+    from src.strategies import SystemServiceStrategy
+
+    try:
+        states = SystemServiceStrategy().show_units(candidates, ["LoadState"])
+    except (OSError, subprocess.SubprocessError) as e:
+        raise ValueError(f"Cannot query systemd units: {str(e)}")
+    return [name for name, state in zip(candidates, states) if state.get("LoadState") == "not-found"]
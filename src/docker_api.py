@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import http.client
+import json
+import logging
+import re
+import socket
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+logger = logging.getLogger(__name__)
+
+DOCKER_SOCKET = '/var/run/docker.sock'
+
+# Label docker compose puts on every container of a project
+PROJECT_LABEL = 'com.docker.compose.project'
+
+
+class DockerAPIError(Exception):
+    """Error response from the Docker Engine API.
+
+    Attributes:
+        status: HTTP status code
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def project_name(path: str) -> str:
+    """Return the default compose project name for a project directory.
+
+    Mirrors docker compose: the directory name, lowercased, keeping only
+    letters, digits, '-' and '_'.
+    """
+    return re.sub(r'[^a-z0-9_-]', '', path.rstrip('/').rsplit('/', 1)[-1].lower())
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class DockerClient:
+    """Minimal Docker Engine API client with a keep-alive connection pool.
+
+    Connections are opened on demand and returned to the pool after each
+    request, so routine calls reuse an established socket. The client is
+    safe to share between threads.
+    """
+
+    def __init__(self, socket_path: str = DOCKER_SOCKET, pool_size: int = 4, timeout: Optional[float] = 60):
+        """Initialize a client.
+
+        Args:
+            socket_path: Path of the Docker daemon's Unix socket
+            pool_size: Maximum number of idle connections kept open
+            timeout: Seconds to wait on the socket, None to wait indefinitely
+        """
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle: List[UnixHTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None) -> Tuple[int, Any]:
+        """Send a request and return its status and decoded JSON body.
+
+        Args:
+            method: HTTP method
+            path: API path such as '/containers/json'
+            params: Query parameters (optional)
+
+        Returns:
+            (status, body); body is None when the response is empty
+
+        Raises:
+            DockerAPIError: For error responses (status >= 400)
+            OSError: If the daemon cannot be reached
+        """
+        url = path + ('?' + urlencode(params) if params else '')
+        conn, reused = self._acquire()
+        try:
+            response = self._send(conn, method, url)
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            conn.close()
+            if not reused:
+                raise
+            # The daemon closed an idle keep-alive connection; retry on a fresh one
+            conn = UnixHTTPConnection(self.socket_path, self.timeout)
+            response = self._send(conn, method, url)
+        except Exception:
+            conn.close()
+            raise
+        data = response.read()
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+        body = json.loads(data) if data else None
+        if response.status >= 400:
+            message = body.get('message') if isinstance(body, dict) else None
+            raise DockerAPIError(response.status, message or f"Docker API returned {response.status} for {method} {path}")
+        return response.status, body
+
+    def containers(self, project: str, all: bool = True) -> List[Dict[str, Any]]:
+        """List the containers of a compose project.
+
+        Args:
+            project: Compose project name
+            all: Include stopped containers
+
+        Returns:
+            Container summaries as returned by the API
+        """
+        filters = json.dumps({'label': [f'{PROJECT_LABEL}={project}']})
+        return self.request('GET', '/containers/json', {'all': int(all), 'filters': filters})[1]
+
+    def stop_container(self, container_id: str) -> None:
+        """Stop a container; stopping a stopped container is not an error."""
+        self.request('POST', f'/containers/{quote(container_id)}/stop')
+
+    def start_container(self, container_id: str) -> None:
+        """Start a container; starting a running container is not an error."""
+        self.request('POST', f'/containers/{quote(container_id)}/start')
+
+    def restart_container(self, container_id: str) -> None:
+        """Restart a container."""
+        self.request('POST', f'/containers/{quote(container_id)}/restart')
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _acquire(self) -> Tuple[UnixHTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return UnixHTTPConnection(self.socket_path, self.timeout), False
+
+    def _release(self, conn: UnixHTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @staticmethod
+    def _send(conn: UnixHTTPConnection, method: str, url: str) -> http.client.HTTPResponse:
+        conn.request(method, url, headers={'Host': 'docker'})
+        return conn.getresponse()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+from src.storage import FileLock, atomic_write, name_key
+
+logger = logging.getLogger(__name__)
+
+# Files docker compose reads from a project directory
+COMPOSE_FILES = ("compose.yaml", "compose.yml", "docker-compose.yaml", "docker-compose.yml",
+                 "compose.override.yaml", "compose.override.yml",
+                 "docker-compose.override.yaml", "docker-compose.override.yml", ".env")
+
+
+def image_ids(path: str, timeout: float = 30.0) -> Optional[List[str]]:
+    """Return the local IDs of the images a compose project references.
+
+    Images that are not pulled yet have no ID and are left out, so pulling
+    them changes the result.
+
+    Args:
+        path: Compose project directory
+        timeout: Seconds to wait for each docker command
+
+    Returns:
+        Sorted image references and IDs, None if docker cannot be queried
+    """
+    import subprocess
+    try:
+        config = subprocess.run(["docker", "compose", "config", "--images"], cwd=path, capture_output=True,
+                                text=True, timeout=timeout)
+        if config.returncode != 0:
+            logger.warning(f"Cannot list images of {path}: {config.stderr.strip()}")
+            return None
+        images = sorted(set(config.stdout.split()))
+        if not images:
+            return []
+        inspect = subprocess.run(["docker", "image", "inspect", "--format", "{{.Id}}", *images],
+                                 capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Cannot list images of {path}: {str(e)}")
+        return None
+    # Missing images make inspect fail, but the IDs of the others are still printed
+    return images + sorted(inspect.stdout.split())
+
+
+def compose_fingerprint(path: str) -> Optional[str]:
+    """Hash what ``docker compose up`` would create for a project.
+
+    Covers the compose files, the .env file and the IDs of the referenced
+    images.
+
+    Args:
+        path: Compose project directory
+
+    Returns:
+        Hex digest, None if the project cannot be inspected
+    """
+    path = os.path.expanduser(path)
+    digest = hashlib.sha256()
+    found = False
+    for name in COMPOSE_FILES:
+        try:
+            with open(os.path.join(path, name), 'rb') as file:
+                content = file.read()
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        except OSError as e:
+            logger.warning(f"Cannot read {name} in {path}: {str(e)}")
+            return None
+        found = found or name != ".env"
+        digest.update(f"{name}\0{len(content)}\0".encode())
+        digest.update(content)
+    if not found:
+        return None
+    images = image_ids(path)
+    if images is None:
+        return None
+    digest.update("\0".join(images).encode())
+    return digest.hexdigest()
+
+
+class FingerprintStore:
+    """Fingerprints of the compose configuration each service was last brought up with.
+
+    Kept in a JSON file next to the registry, keyed by normalized service
+    name. Updates replace the file atomically under a lock file.
+    """
+
+    def __init__(self, file_path: str = 'data/fingerprints.json'):
+        self.file_path = file_path
+        self.lock = FileLock(file_path + '.lock')
+
+    def load(self) -> Dict[str, str]:
+        """Return all fingerprints by normalized service name."""
+        try:
+            with open(self.file_path) as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            logger.warning(f"Fingerprint file {self.file_path} is corrupted, ignoring it")
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, service_name: str) -> Optional[str]:
+        """Return the recorded fingerprint of a service, None if there is none."""
+        return self.load().get(name_key(service_name))
+
+    def update(self, fingerprints: Dict[str, Optional[str]]) -> None:
+        """Record or forget fingerprints with a single write.
+
+        Args:
+            fingerprints: Service name -> fingerprint, None to forget it
+        """
+        if not fingerprints:
+            return
+        dir_path = os.path.dirname(self.file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        with self.lock.hold():
+            data = self.load()
+            for name, fingerprint in fingerprints.items():
+                if fingerprint is None:
+                    data.pop(name_key(name), None)
+                else:
+                    data[name_key(name)] = fingerprint
+            atomic_write(self.file_path, json.dumps(data, indent=4, sort_keys=True))
+
+    def forget(self, service_names: Iterable[str]) -> None:
+        """Drop the fingerprints of services; the file is only written if any was recorded."""
+        recorded = self.load()
+        self.update({name: None for name in service_names if name_key(name) in recorded})
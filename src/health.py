@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional
+
+from src.services import Service
+
+logger = logging.getLogger(__name__)
+
+
+class Probe(ABC):
+    """Health probe for a service.
+
+    Probe targets may contain ``{name}``, which is replaced with the
+    service name.
+    """
+
+    @abstractmethod
+    def check(self, service: Service) -> Optional[str]:
+        """Probe a service once.
+
+        Args:
+            service: Service to probe
+
+        Returns:
+            None if the service is healthy, otherwise the reason it is not
+        """
+        pass
+
+
+class StateProbe(Probe):
+    """Healthy when the service manager reports the service as running."""
+
+    def __init__(self, status: Callable[[List[Service]], list]):
+        """Initialize the probe.
+
+        Args:
+            status: Function returning fresh ServiceStatus objects, such as
+                ``lambda services: manager.status(services, refresh=True)``
+        """
+        self.status = status
+
+    def check(self, service: Service) -> Optional[str]:
+        status = self.status([service])[0]
+        if status.running:
+            return None
+        return f"state is {status.state}" + (f" ({status.detail})" if status.detail else "")
+
+
+class CommandProbe(Probe):
+    """Healthy when a command exits with status 0."""
+
+    def __init__(self, command: str, timeout: float = 5.0):
+        self.command = command
+        self.timeout = timeout
+
+    def check(self, service: Service) -> Optional[str]:
+        import shlex
+        import subprocess
+        command = shlex.split(self.command.format(name=service.name))
+        try:
+            result = subprocess.run(command, capture_output=True, timeout=self.timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return f"health command failed: {str(e)}"
+        if result.returncode != 0:
+            return f"health command exited with status {result.returncode}"
+        return None
+
+
+class HttpProbe(Probe):
+    """Healthy when a URL answers with HTTP 200."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def check(self, service: Service) -> Optional[str]:
+        import urllib.error
+        import urllib.request
+        url = self.url.format(name=service.name)
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (OSError, ValueError) as e:
+            return f"{url} unreachable: {str(e)}"
+        return None if status == 200 else f"{url} returned HTTP {status}"
+
+
+class TcpProbe(Probe):
+    """Healthy when a TCP port accepts connections."""
+
+    def __init__(self, address: str, timeout: float = 5.0):
+        """Initialize the probe.
+
+        Args:
+            address: 'host:port', or just 'port' for localhost
+            timeout: Seconds to wait for the connection
+
+        Raises:
+            ValueError: If the port is not a number
+        """
+        host, _, port = address.rpartition(':')
+        self.host = host or 'localhost'
+        self.port = int(port)
+        self.timeout = timeout
+
+    def check(self, service: Service) -> Optional[str]:
+        import socket
+        host = self.host.format(name=service.name)
+        try:
+            socket.create_connection((host, self.port), timeout=self.timeout).close()
+        except OSError as e:
+            return f"{host}:{self.port} not accepting connections: {str(e)}"
+        return None
+
+
+def make_probes(command: Optional[str] = None,
+                url: Optional[str] = None,
+                tcp: Optional[str] = None) -> Optional[List[Probe]]:
+    """Build probes from command line style options.
+
+    Args:
+        command: Health command (optional)
+        url: URL expected to answer HTTP 200 (optional)
+        tcp: 'host:port' expected to accept connections (optional)
+
+    Returns:
+        List of probes, or None when no option is given
+
+    Raises:
+        ValueError: If the TCP address is invalid
+    """
+    probes: List[Probe] = []
+    if command:
+        probes.append(CommandProbe(command))
+    if url:
+        probes.append(HttpProbe(url))
+    if tcp:
+        probes.append(TcpProbe(tcp))
+    return probes or None
+
+
+def wait_until_healthy(service: Service,
+                       probes: List[Probe],
+                       timeout: float = 60.0,
+                       interval: float = 1.0) -> Optional[str]:
+    """Probe a service until every probe passes or the timeout expires.
+
+    Args:
+        service: Service to probe
+        probes: Probes that must all pass
+        timeout: Seconds to keep trying
+        interval: Seconds between attempts
+
+    Returns:
+        None once the service is healthy, otherwise the last failure reason
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        reason = next(filter(None, (probe.check(service) for probe in probes)), None)
+        if reason is None:
+            logger.info(f"Service {service.name} is healthy")
+            return None
+        if time.monotonic() + interval > deadline:
+            logger.error(f"Service {service.name} did not become healthy: {reason}")
+            return reason
+        logger.debug(f"Waiting for {service.name}: {reason}")
+        time.sleep(interval)
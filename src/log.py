@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Parent of every module logger in this package
+PACKAGE_LOGGER = "src"
+
+# Socket of the journald native protocol
+JOURNAL_SOCKET = "/run/systemd/journal/socket"
+
+# Queue handler on the package logger and the listener draining its queue
+_pipeline = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Drop INFO and DEBUG records beyond a rate, per call site.
+
+    Each logging call site gets a token bucket holding ``burst`` records,
+    refilled at ``rate`` records per second. Warnings and errors always
+    pass. When a call site is allowed to log again, the next record notes
+    how many records were suppressed in the meantime.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 20):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        # (pathname, lineno) -> (tokens, last refill time, suppressed records)
+        self._buckets: Dict[Tuple[str, int], Tuple[float, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1, now, 0)
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        import json
+        data = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data)
+
+
+class JournaldHandler(logging.Handler):
+    """Send records to systemd-journald over its native datagram protocol."""
+
+    PRIORITIES = {
+        logging.DEBUG: 7,
+        logging.INFO: 6,
+        logging.WARNING: 4,
+        logging.ERROR: 3,
+        logging.CRITICAL: 2,
+    }
+
+    def __init__(self, identifier: str = "wsm", socket_path: str = JOURNAL_SOCKET):
+        """Initialize the handler.
+
+        Args:
+            identifier: SYSLOG_IDENTIFIER of the entries
+            socket_path: Path of the journald socket
+
+        Raises:
+            OSError: If journald is not listening on the socket
+        """
+        import socket
+        super().__init__()
+        self.identifier = identifier
+        self.socket_path = socket_path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            self.sock.connect(socket_path)
+        except OSError:
+            self.sock.close()
+            raise
+
+    @staticmethod
+    def encode_field(name: str, value: str) -> bytes:
+        """Encode one journal field; values with newlines carry an explicit length."""
+        data = value.encode("utf-8", "replace")
+        if b"\n" not in data:
+            return name.encode() + b"=" + data + b"\n"
+        return name.encode() + b"\n" + len(data).to_bytes(8, "little") + data + b"\n"
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            fields = {
+                "MESSAGE": self.format(record),
+                "PRIORITY": str(self.PRIORITIES.get(record.levelno, 6)),
+                "SYSLOG_IDENTIFIER": self.identifier,
+                "LOGGER": record.name,
+                "CODE_FILE": record.pathname,
+                "CODE_LINE": str(record.lineno),
+                "CODE_FUNC": record.funcName or "",
+            }
+            self.sock.send(b"".join(self.encode_field(k, v) for k, v in fields.items()))
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        self.sock.close()
+        super().close()
+
+
+def make_handler(sink: str = "console", path: Optional[str] = None) -> logging.Handler:
+    """Create the handler writing records to a sink.
+
+    Args:
+        sink: 'console' (colored stderr), 'json' (JSON lines appended to a
+            file) or 'journald'
+        path: Log file of the json sink
+
+    Returns:
+        Configured handler
+
+    Raises:
+        ValueError: For an unknown sink, or the json sink without a path
+        OSError: If the sink cannot be opened
+    """
+    if sink == "console":
+        import colorlog
+        handler = colorlog.StreamHandler()
+        handler.setFormatter(colorlog.ColoredFormatter(
+            '%(log_color)s%(asctime)s - %(levelname)s - %(message)s',
+            log_colors={
+                'DEBUG':    'cyan',
+                'INFO':     'green',
+                'WARNING':  'yellow',
+                'ERROR':    'red',
+                'CRITICAL': 'bold_red',
+            }
+        ))
+        return handler
+    if sink == "json":
+        if not path:
+            raise ValueError("The json log sink requires a file path")
+        import os
+        dir_path = os.path.dirname(path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        handler = logging.FileHandler(path)
+        handler.setFormatter(JsonFormatter())
+        return handler
+    if sink == "journald":
+        return JournaldHandler()
+    raise ValueError(f"Invalid log sink: {sink}")
+
+
+def setup_logging(level: int = logging.INFO,
+                  sink: str = "console",
+                  path: Optional[str] = None,
+                  rate: Optional[float] = 10.0,
+                  burst: int = 20) -> None:
+    """Route the package logger through a queue to a single sink.
+
+    Logging calls only put the record on a queue; a background listener
+    thread writes it to the sink, so operations never wait for the
+    terminal or the log file. Safe to call more than once; only the first
+    call installs the pipeline, later calls just set the level.
+
+    Args:
+        level: Minimum level of records to emit
+        sink: 'console', 'json' or 'journald'; falls back to the console if
+            the sink cannot be opened
+        path: Log file of the json sink
+        rate: INFO records per second allowed per call site, None to log everything
+        burst: INFO records a call site may log at once before being limited
+    """
+    global _pipeline
+    logger = logging.getLogger(PACKAGE_LOGGER)
+    logger.setLevel(level)
+    if _pipeline is not None:
+        return
+
+    import atexit
+    import queue
+    from logging.handlers import QueueHandler, QueueListener
+
+    try:
+        handler = make_handler(sink, path)
+    except (OSError, ValueError) as e:
+        handler = make_handler("console")
+        fallback = f"Cannot log to {sink} sink, using the console instead: {str(e)}"
+    else:
+        fallback = None
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(records)
+    if rate is not None:
+        queue_handler.addFilter(RateLimitFilter(rate, burst))
+    logger.addHandler(queue_handler)
+    listener = QueueListener(records, handler)
+    listener.start()
+    _pipeline = (queue_handler, listener)
+    atexit.register(shutdown_logging)
+    if fallback:
+        logger.warning(fallback)
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the listener thread."""
+    global _pipeline
+    pipeline, _pipeline = _pipeline, None
+    if pipeline is None:
+        return
+    queue_handler, listener = pipeline
+    logging.getLogger(PACKAGE_LOGGER).removeHandler(queue_handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
@@ -1,28 +1,64 @@
 #!/usr/bin/env python3
 
-from src.services import Service
+from src.services import Service, OperationResult
+from src.storage import ServiceRepository, is_pattern, name_key
 import logging
-import json
 import os
-import colorlog
-from typing import Optional, List, Dict
-
-# Initialize color logging
-handler = colorlog.StreamHandler()
-handler.setFormatter(colorlog.ColoredFormatter(
-    '%(log_color)s%(asctime)s - %(levelname)s - %(message)s',
-    log_colors={
-        'DEBUG':    'cyan',
-        'INFO':     'green',
-        'WARNING':  'yellow',
-        'ERROR':    'red',
-        'CRITICAL': 'bold_red',
-    }
-))
-
-logger = colorlog.getLogger(__name__)
-logger.setLevel(logging.INFO)
-logger.addHandler(handler)
+import time
+from typing import Optional, List, Iterable, Callable, Tuple, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def parse_index_ranges(tokens: Iterable[str]) -> List[int]:
+    """Parse index selectors such as ``0 3 5-20`` into a list of indexes.
+    
+    Args:
+        tokens: Index tokens, either single integers or inclusive ranges
+        
+    Returns:
+        Sorted list of unique indexes
+        
+    Raises:
+        ValueError: For malformed tokens or reversed ranges
+    """
+    indexes = set()
+    for token in tokens:
+        start, sep, end = token.partition("-")
+        try:
+            if not sep:
+                indexes.add(int(token))
+                continue
+            first, last = int(start), int(end)
+        except ValueError:
+            raise ValueError(f"Invalid index selector: {token}")
+        if first > last:
+            raise ValueError(f"Invalid index range: {token}")
+        indexes.update(range(first, last + 1))
+    return sorted(indexes)
+
+
+def parse_selectors(tokens: Iterable[str]) -> Tuple[Optional[List[int]], List[str]]:
+    """Split CLI selectors into indexes/ranges and service names or glob patterns.
+    
+    Args:
+        tokens: Selectors such as ``0``, ``5-20``, ``nginx`` or ``web-*``
+        
+    Returns:
+        (indexes, names) where indexes is None when no index selector was given
+        
+    Raises:
+        ValueError: For reversed index ranges
+    """
+    index_tokens, names = [], []
+    for token in tokens:
+        start, _, end = token.partition("-")
+        if start.isdigit() and (not end or end.isdigit()):
+            index_tokens.append(token)
+        else:
+            names.append(token)
+    indexes = parse_index_ranges(index_tokens) if index_tokens else None
+    return indexes, names
 
 
 class ServiceFactory:
@@ -31,13 +67,17 @@ class ServiceFactory:
     """
     
     @staticmethod
-    def create_service(tag: str, name: str, path: Optional[str] = None) -> Service:
+    def create_service(tag: str,
+                       name: str,
+                       path: Optional[str] = None,
+                       depends_on: Optional[List[str]] = None) -> Service:
         """Create a Service instance with validation.
         
         Args:
             tag: Service type ('sys' or 'docker')
             name: Service name
             path: Configuration path (required for docker services)
+            depends_on: Names of the services this one depends on (optional)
             
         Returns:
             Service instance
@@ -53,94 +93,15 @@ class ServiceFactory:
             if not os.path.isdir(path):
                 raise ValueError(f"Service path must be a directory: {path}")
             logger.info(f"Validated docker service path: {path}")
-        return Service(tag=tag, name=name, path=path)
-
-
-class ServiceRepository:
-    """Repository for service persistence.
-
-    """
-    
-    def __init__(self, file_path: str = 'data/services.json'):
-        self.file_path = file_path
-        # Make sure the path has existed
-        dir_path = os.path.dirname(file_path)
-        if dir_path:
-            os.makedirs(dir_path, exist_ok=True)
-        
-    def save(self, service: Service) -> None:
-        """Save a service to the repository.
-        
-        Args:
-            service: Service instance to save
-        """
-        # Load existing services
-        services = self.load_all()
-        
-        # Add new service
-        services.append(service.to_dict())
-        
-        # Save back to file
-        with open(self.file_path, 'w') as file:
-            json.dump(services, file, indent=4)
-        logger.info(f"Saved service to repository: {service.name}")
-            
-    def load_all(self) -> List[Dict]:
-        """Load all services from repository.
-        
-        Returns:
-            List of service dictionaries
-        """
-        if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, 'r') as file:
-                    return json.load(file)
-            except (json.JSONDecodeError, FileNotFoundError):
-                logger.warning("Service repository file corrupted or missing")
-                return []
-        logger.info("Service repository file not found, starting fresh")
-        return []
-        
-    def remove(self, service_name: str) -> None:
-        """Remove a service by name.
-        
-        Args:
-            service_name: Name of the service to remove
-            
-        Raises:
-            ValueError: If service not found
-        """
-        try:
-            # Load all servives
-            services = self.load_all()
-            
-            # Search for matching services (case insensitive)
-            original_count = len(services)
-            services = [s for s in services
-                       if s['name'].strip().lower() != service_name.strip().lower()]
-            
-            # Check and remove
-            if len(services) == original_count:
-                raise ValueError(f"Service '{service_name}' not found")
-            
-            # Update services,json
-            with open(self.file_path, 'w') as file:
-                json.dump(services, file, indent=4)
-                
-            logger.info(f"Removed service: {service_name}")
-            
-        except FileNotFoundError:
-            logger.warning("Services file not found, nothing to remove")
-            raise ValueError("Services file does not exist")
-        except json.JSONDecodeError:
-            logger.error("Invalid JSON format in services file")
-            raise ValueError("Invalid services data format")
-        except PermissionError:
-            logger.error("Permission denied when writing services file")
-            raise
-        except Exception as e:
-            logger.error(f"Error removing service: {str(e)}")
-            raise
+        if depends_on and name_key(name) in {name_key(d) for d in depends_on}:
+            raise ValueError(f"Service '{name}' cannot depend on itself")
+        if depends_on:
+            # Keep the first spelling of dependencies named more than once
+            unique = {}
+            for dependency in depends_on:
+                unique.setdefault(name_key(dependency), dependency)
+            depends_on = list(unique.values())
+        return Service(tag=tag, name=name, path=path, depends_on=depends_on)
 
 
 class Manager:
@@ -148,29 +109,76 @@ class Manager:
     
     """
     
+    TRANSPORTS = ("cli", "native")
+
     def __init__(self,
                  repository: Optional[ServiceRepository] = None,
-                 factory: Optional[ServiceFactory] = None):
+                 factory: Optional[ServiceFactory] = None,
+                 transport: str = "cli",
+                 status_ttl: float = 5.0,
+                 status_cache: Optional[str] = None,
+                 metrics_textfile: Optional[str] = None,
+                 fingerprints: Optional[str] = None):
         """Initialize Manager with dependencies.
         
         Args:
             repository: Service repository instance (optional)
             factory: Service factory instance (optional)
+            transport: How services are operated: 'cli' spawns systemctl and
+                docker compose, 'native' talks to systemd over D-Bus and to
+                the Docker Engine API
+            status_ttl: Seconds a queried service state is reused
+            status_cache: File persisting service states between runs (optional)
+            metrics_textfile: node_exporter textfile-collector '.prom' file that
+                operation metrics are written to after every operation (optional)
+            fingerprints: File recording the compose configuration docker
+                services were last brought up with by ``--if-changed`` runs,
+                used to skip unchanged stacks (optional)
+                
+        Raises:
+            ValueError: For an unknown transport
         """
+        if transport not in self.TRANSPORTS:
+            raise ValueError(f"Invalid transport: {transport}")
         self.repository = repository or ServiceRepository()
         self.factory = factory or ServiceFactory()
+        self.transport = transport
+        self.status_ttl = status_ttl
+        self.status_cache = status_cache
+        self._status = None
+        self._docker = None
+        self._metrics = None
+        if metrics_textfile:
+            from src.metrics import TextfileExporter
+            self._metrics = TextfileExporter(metrics_textfile)
+        self._fingerprints = None
+        if fingerprints:
+            from src.fingerprint import FingerprintStore
+            self._fingerprints = FingerprintStore(fingerprints)
+        # Strategy builders by tag, given the service path; native strategies
+        # share one D-Bus connection or Docker API connection pool
+        self._strategies: Dict[str, Callable[[Optional[str]], object]] = {}
+        if transport == "native":
+            from src.docker_api import DockerClient
+            from src.strategies import SystemdDBusStrategy, DockerEngineStrategy
+            systemd = SystemdDBusStrategy()
+            self._docker = DockerClient()
+            self._strategies["sys"] = lambda path: systemd
+            self._strategies["docker"] = lambda path: DockerEngineStrategy(path, client=self._docker)
         logger.info("Manager initialized")
 
     def register_service(self,
                          service_tag: str,
                          service_name: str,
-                         service_path: Optional[str] = None) -> Service:
+                         service_path: Optional[str] = None,
+                         depends_on: Optional[List[str]] = None) -> Service:
         """Register and persist a new service.
         
         Args:
             service_tag: Service type ('sys' or 'docker')
             service_name: Service name
             service_path: Configuration path (required for docker)
+            depends_on: Names of the services this one depends on (optional)
             
         Returns:
             Registered service instance
@@ -180,7 +188,7 @@ class Manager:
         """
         try:
             # Create service via factory
-            service = self.factory.create_service(service_tag, service_name, service_path)
+            service = self.factory.create_service(service_tag, service_name, service_path, depends_on)
             
             # Persist service
             self.repository.save(service)
@@ -192,6 +200,68 @@ class Manager:
             logger.error(f"Service registration failed: {str(e)}")
             raise
 
+    def register_services(self, entries: List[Dict], max_parallel: int = 8) -> List[Service]:
+        """Register many services with a single repository write.
+        
+        Every entry is validated before anything is written, docker paths
+        concurrently. Either all services are registered or none.
+        
+        Args:
+            entries: Dictionaries with 'tag', 'name' and optionally 'path'
+                and 'depends_on', as returned by load_manifest()
+            max_parallel: Maximum number of paths checked at once
+            
+        Returns:
+            Registered service instances, in the order of entries
+            
+        Raises:
+            ValueError: If any entry is invalid, a name appears twice or is
+                already registered; the message lists every problem
+        """
+        if max_parallel < 1:
+            raise ValueError(f"max_parallel must be at least 1: {max_parallel}")
+        if not entries:
+            return []
+
+        def create(entry: Dict) -> Service:
+            return self.factory.create_service(entry["tag"], entry["name"], entry.get("path"),
+                                               entry.get("depends_on"))
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        errors = []
+        services: List[Service] = []
+        with ThreadPoolExecutor(max_workers=min(max_parallel, len(entries))) as executor:
+            futures = [executor.submit(create, entry) for entry in entries]
+            for entry, future in zip(entries, futures):
+                try:
+                    services.append(future.result())
+                except ValueError as e:
+                    errors.append(f"{entry['name']}: {str(e)}")
+
+        seen = set()
+        unique = []
+        for entry in entries:
+            key = name_key(entry["name"])
+            if key in seen:
+                errors.append(f"{entry['name']}: listed more than once")
+            else:
+                unique.append(entry)
+            seen.add(key)
+
+        # Check registered names under the repository lock, so a concurrent
+        # registration cannot slip in between the check and the write
+        with self.repository.transaction() as transaction:
+            errors += [f"{entry['name']}: already registered" for entry in unique
+                       if transaction.contains(entry["name"])]
+            if errors:
+                logger.error(f"Service registration failed: {'; '.join(errors)}")
+                raise ValueError(f"{len(errors)} invalid services: {'; '.join(errors)}")
+            for service in services:
+                transaction.save(service)
+        logger.info(f"Successfully registered {len(services)} services")
+        return services
+
     def remove_service(self, index: int) -> None:
         """Remove a service by index.
         
@@ -207,6 +277,8 @@ class Manager:
             raise IndexError(f"Invalid service index: {index}")
         service_name = services[index].name
         self.repository.remove(service_name)
+        if self._fingerprints is not None:
+            self._fingerprints.forget([service_name])
 
     def list_services(self) -> List[Service]:
         """List all registered services.
@@ -219,23 +291,72 @@ class Manager:
             logger.info("No services registered")
             return []
             
+        services = self._to_services(services_data)
+        logger.info(f"Registered services: {len(services)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Registered services: {', '.join(s.name for s in services)}")
+        return services
+
+    def find_service(self, service_name: str) -> Service:
+        """Look up a single service by name without loading every service.
+        
+        Args:
+            service_name: Name of the service (case insensitive)
+            
+        Returns:
+            Service instance
+            
+        Raises:
+            ValueError: If service not found
+        """
+        record = self.repository.find(service_name)
+        if record is None:
+            raise ValueError(f"Service '{service_name}' not found")
+        return self._make_service(record)
+
+    def remove_services(self, services: List[Service]) -> None:
+        """Remove several services with a single repository write.
+        
+        Args:
+            services: Services to remove
+            
+        Raises:
+            ValueError: If any service is not found; nothing is removed then
+        """
+        with self.repository.transaction() as transaction:
+            for service in services:
+                transaction.remove(service.name)
+        logger.info(f"Removed services: {', '.join(s.name for s in services)}")
+        if self._fingerprints is not None:
+            self._fingerprints.forget([s.name for s in services])
+
+    def _make_service(self, record: Dict) -> Service:
+        """Build a Service from a repository record using the manager's transport."""
+        build = self._strategies.get(record["tag"])
+        path = record.get("path")
+        return Service(tag=record["tag"], name=record["name"], path=path,
+                       strategy=build(path) if build else None, depends_on=record.get("depends_on"))
+
+    def _to_services(self, records: List[Dict]) -> List[Service]:
+        """Build Service objects from repository records, skipping invalid ones."""
         services = []
-        for s in services_data:
+        for s in records:
             try:
-                service = Service(tag=s["tag"], name=s["name"], path=s["path"])
-                services.append(service)
+                services.append(self._make_service(s))
             except Exception as e:
                 logger.error(f"Invalid service data: {s}, error: {str(e)}")
-                
-        service_names = [s.name for s in services]
-        logger.info(f"Registered services ({len(services)}): {', '.join(service_names)}")
         return services
         
-    def execute_service_operation(self, index: int) -> None:
+    def execute_service_operation(self, index: int, operation: Optional[int] = None) -> Optional[OperationResult]:
         """Execute service operation for the service at the given index.
         
         Args:
             index: Index of the service in the list returned by list_services()
+            operation: 0=stop, 1=restart, 2=start, 3=reload; the user is
+                asked when omitted
+            
+        Returns:
+            OperationResult describing the outcome, None if the user cancelled
             
         Raises:
             IndexError: If index is out of bounds
@@ -245,10 +366,509 @@ class Manager:
             logger.error(f"Invalid service index: {index}")
             raise IndexError(f"Invalid service index: {index}")
             
-        service = services[index]
-        service.service_operation()
+        return self._operate_one(services[index], operation)
+
+    def execute_named_operation(self, service_name: str, operation: Optional[int] = None) -> Optional[OperationResult]:
+        """Execute service operation for the service with the given name.
+        
+        Args:
+            service_name: Name of the service (case insensitive)
+            operation: 0=stop, 1=restart, 2=start, 3=reload; the user is
+                asked when omitted
+            
+        Returns:
+            OperationResult describing the outcome, None if the user cancelled
+            
+        Raises:
+            ValueError: If service not found
+        """
+        return self._operate_one(self.find_service(service_name), operation)
+
+    def _operate_one(self, service: Service, operation: Optional[int]) -> Optional[OperationResult]:
+        """Operate on a single service and run the post-operation bookkeeping."""
+        result = service.service_operation(operation)
+        if result is not None:
+            self._operations_finished([service], [result])
+        return result
+
+    def select_services(self,
+                        indexes: Optional[Iterable[int]] = None,
+                        tag: Optional[str] = None,
+                        names: Optional[Iterable[str]] = None) -> List[Service]:
+        """Select services by index, name/glob pattern and/or tag.
+        
+        Names and patterns are resolved by the repository, so selecting by
+        name never builds every Service object.
+        
+        Args:
+            indexes: Indexes in the list returned by list_services()
+            tag: Only keep services with this tag (optional)
+            names: Service names or glob patterns such as ``web-*`` (optional)
+            
+        Returns:
+            List of selected Service objects; all services (with the tag)
+            when neither indexes nor names are given
+            
+        Raises:
+            IndexError: If any index is out of bounds
+            ValueError: If a plain name (not a pattern) matches no service
+        """
+        names = list(names or ())
+        selected: List[Service] = []
+        if names:
+            selected = self._to_services(self.repository.select(names, tag))
+            found = {name_key(s.name) for s in selected}
+            missing = list(dict.fromkeys(n for n in names if not is_pattern(n) and name_key(n) not in found))
+            if missing:
+                where = f" with tag '{tag}'" if tag is not None else ""
+                if len(missing) == 1:
+                    raise ValueError(f"Service '{missing[0]}' not found{where}")
+                raise ValueError(f"Services not found{where}: {', '.join(missing)}")
+            if indexes is None:
+                return selected
+
+        services = self.list_services()
+        if indexes is not None:
+            by_index = []
+            for index in indexes:
+                if index < 0 or index >= len(services):
+                    logger.error(f"Invalid service index: {index}")
+                    raise IndexError(f"Invalid service index: {index}")
+                by_index.append(services[index])
+            services = by_index
+        if tag is not None:
+            services = [s for s in services if s.tag == tag]
+        if selected:
+            seen = {s.name for s in services}
+            services += [s for s in selected if s.name not in seen]
+        return services
+
+    def execute_bulk_operation(self,
+                               services: List[Service],
+                               operation: int,
+                               max_parallel: int = 4,
+                               coalesce: bool = True) -> List[OperationResult]:
+        """Execute one operation on many services using a bounded worker pool.
+        
+        Args:
+            services: Services to operate on
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            max_parallel: Maximum number of operations running at once
+            coalesce: Merge services whose strategy supports batching (such as
+                systemd units) into a single command
+            
+        Returns:
+            List of OperationResult, in the same order as services
+            
+        Raises:
+            ValueError: If max_parallel is not positive
+        """
+        if max_parallel < 1:
+            raise ValueError(f"max_parallel must be at least 1: {max_parallel}")
+        if not services:
+            return []
+
+        def run(batch: List[Service]) -> List[OperationResult]:
+            if len(batch) > 1:
+                return self._run_batch(batch, operation)
+            return [self._run_one(batch[0], operation)]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        batches = self.plan_batches(services) if coalesce else [[s] for s in services]
+        workers = min(max_parallel, len(batches))
+        logger.info(f"Running operation {operation} on {len(services)} services in {len(batches)} "
+                    f"commands (max parallel: {workers})")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            by_service = {}
+            for batch, batch_results in zip(batches, executor.map(run, batches)):
+                for service, result in zip(batch, batch_results):
+                    by_service[id(service)] = result
+        results = [by_service[id(s)] for s in services]
+
+        failed = [r.name for r in results if not r.ok]
+        if failed:
+            logger.error(f"{len(failed)} of {len(results)} operations failed: {', '.join(failed)}")
+        else:
+            logger.info(f"All {len(results)} operations completed")
+        self._operations_finished(services, results)
+        return results
+
+    def execute_ordered_operation(self,
+                                  services: List[Service],
+                                  operation: int,
+                                  max_parallel: int = 4) -> List[OperationResult]:
+        """Execute one operation on many services in dependency order.
+        
+        Services start once the services they depend on are done; stopping
+        runs in reverse, dependents first. Independent services run
+        concurrently, and a service is skipped if one it waits for failed.
+        
+        Args:
+            services: Services to operate on
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            max_parallel: Maximum number of operations running at once
+            
+        Returns:
+            List of OperationResult, in the same order as services
+            
+        Raises:
+            ValueError: If max_parallel is not positive
+            DependencyCycleError: If the services depend on each other in a cycle
+        """
+        if max_parallel < 1:
+            raise ValueError(f"max_parallel must be at least 1: {max_parallel}")
+        if not services:
+            return []
+        from src.scheduler import run_in_order
+
+        results = run_in_order(services, lambda s: self._run_one(s, operation), operation,
+                               reverse=operation == 0, max_parallel=max_parallel)
+        failed = [r.name for r in results if not r.ok]
+        if failed:
+            logger.error(f"{len(failed)} of {len(results)} operations failed: {', '.join(failed)}")
+        else:
+            logger.info(f"All {len(results)} operations completed")
+        self._operations_finished(services, results)
+        return results
+
+    ROLLING_POLICIES = ("abort", "continue")
+
+    def execute_rolling_operation(self,
+                                  services: List[Service],
+                                  operation: int,
+                                  batch_size: int = 1,
+                                  probes: Optional[List['Probe']] = None,
+                                  policy: str = "abort",
+                                  health_timeout: float = 60.0,
+                                  max_parallel: int = 4) -> List[OperationResult]:
+        """Execute one operation on services in waves, gated on health probes.
+        
+        Each wave runs as a bulk operation; after a restart every service of
+        the wave must pass the probes (by default, a running state) before the
+        next wave starts. A failed wave either aborts the rollout, skipping
+        the remaining services, or lets it roll forward.
+        
+        Args:
+            services: Services to operate on
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            batch_size: Number of services per wave
+            probes: Health probes every restarted service must pass (optional)
+            policy: 'abort' or 'continue' after a failed wave
+            health_timeout: Seconds a service may take to become healthy
+            max_parallel: Maximum number of operations running at once
+            
+        Returns:
+            List of OperationResult, in the same order as services
+            
+        Raises:
+            ValueError: For an invalid batch size, policy or parallelism
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1: {batch_size}")
+        if policy not in self.ROLLING_POLICIES:
+            raise ValueError(f"Invalid rolling policy: {policy}")
+        from src.health import StateProbe
+
+        if probes is None:
+            probes = [StateProbe(lambda selected: self.status(selected, refresh=True))]
+        waves = [services[i:i + batch_size] for i in range(0, len(services), batch_size)]
+        results: List[OperationResult] = []
+        for number, wave in enumerate(waves, 1):
+            logger.info(f"Rolling wave {number}/{len(waves)}: {', '.join(s.name for s in wave)}")
+            wave_results = self.execute_bulk_operation(wave, operation, max_parallel)
+            if operation != 0:
+                wave_results = self._gate_on_health(wave, wave_results, probes, health_timeout)
+            results.extend(wave_results)
+            if policy == "abort" and not all(r.ok for r in wave_results):
+                rest = services[len(results):]
+                if rest:
+                    logger.error(f"Rolling operation aborted after wave {number}; "
+                                 f"{len(rest)} services left untouched")
+                results.extend(OperationResult(s.name, s.tag, operation, None, "Skipped: rolling operation aborted")
+                               for s in rest)
+                break
+        return results
+
+    @staticmethod
+    def _gate_on_health(wave: List[Service],
+                        results: List[OperationResult],
+                        probes: List['Probe'],
+                        timeout: float) -> List[OperationResult]:
+        """Probe the successfully operated services of a wave concurrently."""
+        from concurrent.futures import ThreadPoolExecutor
+        from src.health import wait_until_healthy
+
+        healthy = [(s, r) for s, r in zip(wave, results) if r.ok]
+        if not healthy:
+            return results
+        with ThreadPoolExecutor(max_workers=len(healthy)) as executor:
+            reasons = dict(zip((id(s) for s, _ in healthy),
+                               executor.map(lambda pair: wait_until_healthy(pair[0], probes, timeout), healthy)))
+        gated = []
+        for service, result in zip(wave, results):
+            reason = reasons.get(id(service))
+            if reason is not None:
+                result = OperationResult(service.name, service.tag, result.operation, result.returncode,
+                                         f"Health check failed: {reason}")
+            gated.append(result)
+        return gated
+
+    @staticmethod
+    def _run_one(service: Service, operation: int) -> OperationResult:
+        """Run an operation on one service, turning unexpected errors into a failed result."""
+        try:
+            return service.run_operation(operation)
+        except Exception as e:
+            logger.error(f"Unexpected error operating {service.name}: {str(e)}")
+            return OperationResult(service.name, service.tag, operation, None, str(e))
+
+    @staticmethod
+    def plan_batches(services: List[Service]) -> List[List[Service]]:
+        """Group services into units of work for a bulk operation.
+        
+        Services whose strategy provides ``execute_batch`` (systemd units)
+        are merged into one batch per strategy type; every other service
+        forms a batch of its own.
+        
+        Args:
+            services: Services to operate on
+            
+        Returns:
+            List of batches
+        """
+        batches: List[List[Service]] = []
+        groups: Dict[type, List[Service]] = {}
+        for service in services:
+            strategy_type = type(service.strategy)
+            if callable(getattr(strategy_type, "execute_batch", None)):
+                if strategy_type not in groups:
+                    groups[strategy_type] = []
+                    batches.append(groups[strategy_type])
+                groups[strategy_type].append(service)
+            else:
+                batches.append([service])
+        return batches
+
+    @staticmethod
+    def _run_batch(batch: List[Service], operation: int) -> List[OperationResult]:
+        """Run one coalesced command for a batch and attribute results per service.
+        
+        Every unit of the batch is recorded with the duration of the shared
+        command, and failed units carry the tail of its output.
+        """
+        from src.metrics import OperationTimer
+        from src.output import OutputCapture
+        names = [s.name for s in batch]
+        timers = [OperationTimer(s.name, s.tag, operation) for s in batch]
+        capture = OutputCapture(", ".join(names))
+        started = time.perf_counter()
+        try:
+            outcome = batch[0].strategy.execute_batch(operation, names, on_output=capture)
+        except Exception as e:
+            logger.error(f"Batch operation failed for {', '.join(names)}: {str(e)}")
+            outcome = {s.name: (None, str(e)) for s in batch}
+        elapsed = time.perf_counter() - started
+        results = []
+        for service, timer in zip(batch, timers):
+            returncode, error = outcome.get(service.name, (None, "No result reported"))
+            if error:
+                logger.error(f"Service operation failed: {error}")
+            timer.observe('execute', elapsed)
+            results.append(timer.finish(OperationResult(service.name, service.tag, operation, returncode, error,
+                                                        capture.tail() if error else None)))
+        return results
+
+    async def execute_operations_async(self,
+                                       services: List[Service],
+                                       operation: int,
+                                       max_concurrency: Optional[int] = None,
+                                       timeout: Optional[float] = None,
+                                       on_output: Optional[Callable[[str, str], None]] = None
+                                       ) -> List[OperationResult]:
+        """Execute one operation on many services from the running event loop.
+        
+        Cancelling the awaiting task kills every command still running.
+        
+        Args:
+            services: Services to operate on
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            max_concurrency: Maximum number of commands running at once (optional)
+            timeout: Per-command timeout in seconds (optional)
+            on_output: Callback receiving (service name, output line) (optional)
+            
+        Returns:
+            List of OperationResult, in the same order as services
+            
+        Raises:
+            ValueError: If max_concurrency is not positive
+        """
+        import asyncio
+
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1: {max_concurrency}")
+        semaphore = asyncio.Semaphore(max_concurrency or max(len(services), 1))
+
+        async def run(service: Service) -> OperationResult:
+            async with semaphore:
+                try:
+                    return await service.run_operation_async(operation, timeout=timeout, on_output=on_output)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Unexpected error operating {service.name}: {str(e)}")
+                    return OperationResult(service.name, service.tag, operation, None, str(e))
+
+        results = await asyncio.gather(*(run(s) for s in services))
+        failed = [r.name for r in results if not r.ok]
+        if failed:
+            logger.error(f"{len(failed)} of {len(results)} operations failed: {', '.join(failed)}")
+        self._operations_finished(services, results)
+        return list(results)
+
+    @property
+    def status_collector(self) -> 'StatusCollector':
+        """Collector of service states, created on first use."""
+        if self._status is None:
+            from src.status import StatusCollector
+            self._status = StatusCollector(self.status_ttl, self.status_cache, docker_client=self._docker)
+        return self._status
+
+    def status(self, services: Optional[List[Service]] = None, refresh: bool = False) -> List['ServiceStatus']:
+        """Report whether services are running.
+        
+        States are queried in one batch per service type and cached for
+        ``status_ttl`` seconds.
+        
+        Args:
+            services: Services to report on (all registered services by default)
+            refresh: Query every state again instead of using cached ones
+            
+        Returns:
+            List of ServiceStatus, in the same order as services
+        """
+        if services is None:
+            services = self.list_services()
+        return self.status_collector.collect(services, refresh)
+
+    def changed_services(self, services: List[Service], max_parallel: int = 4) -> List[Service]:
+        """Select the services whose configuration changed since they were brought up.
+        
+        Docker services are compared by the fingerprint of their compose
+        files, .env file and image IDs with the one record_fingerprints()
+        stored; services without a recorded or computable fingerprint count
+        as changed. Systemd services are always selected.
+        
+        Args:
+            services: Candidate services
+            max_parallel: Maximum number of projects inspected at once
+            
+        Returns:
+            Changed services, in the same order as services
+            
+        Raises:
+            ValueError: If the manager records no fingerprints
+        """
+        if self._fingerprints is None:
+            raise ValueError("Fingerprints are not enabled for this manager")
+        recorded = self._fingerprints.load()
+        current = self._compute_fingerprints(services, max_parallel)
+        changed = []
+        for service in services:
+            if service.tag != "docker":
+                changed.append(service)
+                continue
+            fingerprint = current.get(service.name)
+            if fingerprint is None or fingerprint != recorded.get(name_key(service.name)):
+                changed.append(service)
+            else:
+                logger.info(f"Skipping {service.name}: compose configuration unchanged")
+        return changed
+
+    @staticmethod
+    def _compute_fingerprints(services: List[Service], max_parallel: int = 4) -> Dict[str, Optional[str]]:
+        """Fingerprint the compose projects of docker services concurrently."""
+        from src.fingerprint import compose_fingerprint
+
+        docker = [s for s in services if s.tag == "docker"]
+        if not docker:
+            return {}
+        if len(docker) == 1:
+            return {docker[0].name: compose_fingerprint(docker[0].path)}
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_parallel, len(docker))) as executor:
+            fingerprints = executor.map(lambda s: compose_fingerprint(s.path), docker)
+            return {s.name: f for s, f in zip(docker, fingerprints)}
+
+    def record_fingerprints(self,
+                            services: List[Service],
+                            results: Iterable[OperationResult],
+                            max_parallel: int = 4) -> None:
+        """Remember the configuration docker services were brought up with.
+        
+        Only ``up -d`` (start and restart) applies the configuration; a stop
+        forgets the fingerprint so the next run brings the stack up again.
+        Fingerprinting runs docker twice per stack, so this is only called
+        for ``--if-changed`` runs.
+        
+        Args:
+            services: Operated services
+            results: Their operation results
+            max_parallel: Maximum number of projects inspected at once
+            
+        Raises:
+            ValueError: If the manager records no fingerprints
+        """
+        if self._fingerprints is None:
+            raise ValueError("Fingerprints are not enabled for this manager")
+        by_name = {r.name: r for r in results}
+        applied, stopped = [], []
+        for service in services:
+            result = by_name.get(service.name)
+            if service.tag != "docker" or result is None or not result.ok:
+                continue
+            if result.operation in (1, 2):
+                applied.append(service)
+            elif result.operation == 0:
+                stopped.append(service)
+        updates: Dict[str, Optional[str]] = {s.name: None for s in stopped}
+        updates.update(self._compute_fingerprints(applied, max_parallel))
+        try:
+            self._fingerprints.update(updates)
+        except OSError as e:
+            logger.error(f"Failed to write fingerprints to {self._fingerprints.file_path}: {str(e)}")
+
+    def _forget_stopped(self, services: List[Service], results: Iterable[OperationResult]) -> None:
+        """Drop the fingerprints of docker services that were stopped."""
+        by_name = {r.name: r for r in results}
+        stopped = [s.name for s in services if s.tag == "docker" and s.name in by_name
+                   and by_name[s.name].ok and by_name[s.name].operation == 0]
+        if not stopped:
+            return
+        try:
+            self._fingerprints.forget(stopped)
+        except OSError as e:
+            logger.error(f"Failed to write fingerprints to {self._fingerprints.file_path}: {str(e)}")
+
+    def _operations_finished(self, services: List[Service], results: Iterable[OperationResult]) -> None:
+        """Forget cached states and fingerprints of operated services and export metrics."""
+        self._invalidate_status(services)
+        if self._fingerprints is not None:
+            self._forget_stopped(services, results)
+        if self._metrics is not None:
+            try:
+                self._metrics.export()
+            except OSError as e:
+                logger.error(f"Failed to write metrics to {self._metrics.path}: {str(e)}")
+
+    def _invalidate_status(self, services: List[Service]) -> None:
+        """Forget cached states of services that were just operated on."""
+        if self._status is not None or (self.status_cache and os.path.exists(self.status_cache)):
+            self.status_collector.invalidate(services)
 
 if __name__ == "__main__":
+    from src.log import setup_logging
+    setup_logging()
     # 测试服务移除功能
     manager = Manager()
     try:
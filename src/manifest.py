@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sys
+from typing import Dict, List, Optional, TextIO
+
+# Keys a manifest entry may have
+ENTRY_KEYS = ("tag", "name", "path", "depends_on")
+
+
+def parse_manifest(text: str, fmt: Optional[str] = None) -> List[Dict]:
+    """Parse the services listed in a manifest.
+
+    A manifest is either a list of entries or an object with a ``services``
+    list. Each entry has a ``tag`` and a ``name``, and optionally a ``path``
+    and a ``depends_on`` list, like the arguments of ``register``.
+
+    Args:
+        text: Manifest content
+        fmt: 'json' or 'yaml'; JSON is tried first, then YAML, when omitted
+
+    Returns:
+        Entries with every key of ENTRY_KEYS present
+
+    Raises:
+        ValueError: If the manifest cannot be parsed or an entry is malformed
+    """
+    if fmt not in (None, "json", "yaml"):
+        raise ValueError(f"Invalid manifest format: {fmt}")
+    data = None
+    if fmt != "yaml":
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            if fmt == "json":
+                raise ValueError(f"Invalid JSON manifest: {str(e)}")
+    if data is None:
+        data = _load_yaml(text)
+
+    if isinstance(data, dict):
+        data = data.get("services")
+    if not isinstance(data, list):
+        raise ValueError("Manifest must be a list of services or an object with a 'services' list")
+    return [_normalize_entry(i, entry) for i, entry in enumerate(data)]
+
+
+def load_manifest(source: str, stdin: Optional[TextIO] = None) -> List[Dict]:
+    """Read and parse a manifest file, '-' reading from stdin.
+
+    The format follows the file extension (.json, .yaml or .yml).
+
+    Raises:
+        ValueError: If the manifest is malformed
+        OSError: If the file cannot be read
+    """
+    if source == "-":
+        return parse_manifest((stdin or sys.stdin).read())
+    extension = os.path.splitext(source)[1].lower()
+    fmt = {".json": "json", ".yaml": "yaml", ".yml": "yaml"}.get(extension)
+    with open(source) as file:
+        return parse_manifest(file.read(), fmt)
+
+
+def _load_yaml(text: str):
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("Reading YAML manifests requires PyYAML (uv sync --extra yaml)")
+    try:
+        return yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML manifest: {str(e)}")
+
+
+def _normalize_entry(index: int, entry) -> Dict:
+    if not isinstance(entry, dict):
+        raise ValueError(f"Manifest entry {index} must be an object")
+    unknown = set(entry) - set(ENTRY_KEYS)
+    if unknown:
+        raise ValueError(f"Manifest entry {index} has unknown keys: {', '.join(sorted(unknown))}")
+    for key in ("tag", "name"):
+        if not isinstance(entry.get(key), str) or not entry[key].strip():
+            raise ValueError(f"Manifest entry {index} requires a '{key}'")
+    path = entry.get("path")
+    if path is not None and not isinstance(path, str):
+        raise ValueError(f"Manifest entry {index}: 'path' must be a string")
+    depends_on = entry.get("depends_on")
+    if depends_on is not None and (not isinstance(depends_on, list)
+                                   or not all(isinstance(d, str) for d in depends_on)):
+        raise ValueError(f"Manifest entry {index}: 'depends_on' must be a list of names")
+    return {"tag": entry["tag"], "name": entry["name"], "path": path, "depends_on": depends_on or None}
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+
+import logging
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the operation latency buckets, in seconds
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)')
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+Labels = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), value)
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    """Base class of a labelled metric family.
+
+    Attributes:
+        name: Metric name
+        help: Description written to the HELP line
+        labelnames: Names of the labels every sample carries
+    """
+
+    TYPE = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {', '.join(self.labelnames)}, got {', '.join(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        """Yield (sample name, label pairs, value) for every labelled series."""
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, list(zip(self.labelnames, key)), value
+
+    def merge(self, suffix: str, labels: Dict[str, str], value: float) -> None:
+        """Fold a sample read back from an exported file into the metric."""
+        pass
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.TYPE}']
+        for name, pairs, value in self.samples():
+            lines.append(f'{name}{_format_labels(pairs)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    TYPE = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def merge(self, suffix: str, labels: Dict[str, str], value: float) -> None:
+        if suffix == '':
+            self.inc(value, **labels)
+
+
+class Gauge(Metric):
+    """Value that can go up and down, such as the last exit code."""
+
+    TYPE = 'gauge'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._updates: Dict[Labels, int] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+            self._updates[key] = self._updates.get(key, 0) + 1
+
+    def updates(self) -> Dict[str, int]:
+        """Return how often each series was set, keyed by its rendered name and labels."""
+        with self._lock:
+            items = list(self._updates.items())
+        return {f'{self.name}{_format_labels(list(zip(self.labelnames, key)))}': count for key, count in items}
+
+    def value(self, **labels) -> Optional[float]:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def merge(self, suffix: str, labels: Dict[str, str], value: float) -> None:
+        # Values recorded by this process are newer than exported ones
+        key = self._key(labels)
+        with self._lock:
+            if suffix == '' and key not in self._values:
+                self._values[key] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values over cumulative buckets."""
+
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            total[0] += value
+            total[1] += 1
+            self._values[key] = (counts, total)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+        return state[1][1] if state else 0
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        with self._lock:
+            items = sorted((key, (list(counts), list(total))) for key, (counts, total) in self._values.items())
+        for key, (counts, (total, count)) in items:
+            pairs = list(zip(self.labelnames, key))
+            for bound, bucket in zip(self.buckets, counts):
+                yield f'{self.name}_bucket', pairs + [('le', _format_value(bound))], bucket
+            yield f'{self.name}_bucket', pairs + [('le', '+Inf')], count
+            yield f'{self.name}_sum', pairs, total
+            yield f'{self.name}_count', pairs, count
+
+    def merge(self, suffix: str, labels: Dict[str, str], value: float) -> None:
+        bound = labels.pop('le', None)
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), [0.0, 0])
+            if suffix == '_bucket' and bound is not None and bound != '+Inf':
+                if float(bound) in self.buckets:
+                    counts[self.buckets.index(float(bound))] += int(value)
+            elif suffix == '_sum':
+                total[0] += value
+            elif suffix == '_count':
+                total[1] += int(value)
+            self._values[key] = (counts, total)
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Return the counter with this name, creating it on first use."""
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Return the gauge with this name, creating it on first use."""
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Return the histogram with this name, creating it on first use."""
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def _get(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} is already registered as a {metric.TYPE}")
+            return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return ''.join(m.render() for m in metrics)
+
+    def merge_text(self, text: str) -> None:
+        """Add samples from an exported file to the registered metrics.
+
+        Counters and histograms are summed, gauges only fill series this
+        registry has not recorded. Samples of unknown metrics are ignored.
+
+        Args:
+            text: Metrics in the Prometheus text format
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        for line in text.splitlines():
+            match = _SAMPLE.match(line)
+            if not match:
+                continue
+            name, label_text, raw_value = match.groups()
+            metric, suffix = metrics.get(name), ''
+            if metric is None:
+                for candidate in ('_bucket', '_sum', '_count'):
+                    base = metrics.get(name[:-len(candidate)]) if name.endswith(candidate) else None
+                    if isinstance(base, Histogram):
+                        metric, suffix = base, candidate
+                        break
+            if metric is None:
+                continue
+            labels = {k: _unescape(v) for k, v in _LABEL.findall(label_text or '')}
+            try:
+                metric.merge(suffix, labels, float(raw_value))
+            except ValueError:
+                logger.debug(f"Ignoring malformed metric sample: {line}")
+
+    def gauge_updates(self) -> Dict[str, int]:
+        """Return how often each gauge series was set, keyed like rendered samples."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        updates = {}
+        for metric in metrics:
+            if isinstance(metric, Gauge):
+                updates.update(metric.updates())
+        return updates
+
+    def empty_copy(self) -> 'MetricsRegistry':
+        """Return a registry with the same metric families and no samples."""
+        copy = MetricsRegistry()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            kwargs = {'buckets': metric.buckets} if isinstance(metric, Histogram) else {}
+            copy._get(type(metric), metric.name, metric.help, metric.labelnames, **kwargs)
+        return copy
+
+
+def _samples(text: str) -> Dict[str, float]:
+    """Map every sample of an exposition text, keyed by its name and labels, to its value."""
+    samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match:
+            samples[line[:match.start(3)].rstrip()] = float(match.group(3))
+    return samples
+
+
+# Process-wide registry that service operations report to
+REGISTRY = MetricsRegistry()
+
+
+def operation_metrics(registry: MetricsRegistry) -> Tuple[Histogram, Counter, Gauge, Gauge]:
+    """Return the operation metric families of a registry."""
+    labels = ('service', 'tag', 'action')
+    return (
+        registry.histogram('wsm_operation_duration_seconds',
+                           'Wall time of service operations by phase (generate, execute, total)',
+                           labels + ('phase',)),
+        registry.counter('wsm_operations_total', 'Service operations by result (ok, failed)',
+                         labels + ('result',)),
+        registry.gauge('wsm_operation_last_exit_code',
+                       'Exit code of the last operation, -1 if the command never ran', labels),
+        registry.gauge('wsm_operation_last_timestamp_seconds',
+                       'Unix time the last operation finished', labels),
+    )
+
+
+class OperationTimer:
+    """Record the duration and outcome of one service operation."""
+
+    def __init__(self, service: str, tag: str, operation: int, registry: Optional[MetricsRegistry] = None):
+        """Start timing an operation.
+
+        Args:
+            service: Service name
+            tag: Service type ('sys' or 'docker')
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            registry: Registry to record into (default: REGISTRY)
+        """
+        from src.services import operation_name
+        self.labels = {'service': service, 'tag': tag, 'action': operation_name(operation)}
+        self.registry = registry if registry is not None else REGISTRY
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the with block as the given phase, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, phase: str, seconds: float) -> None:
+        """Record the duration of a phase measured elsewhere."""
+        operation_metrics(self.registry)[0].observe(seconds, phase=phase, **self.labels)
+
+    def finish(self, result):
+        """Record the total duration and the outcome of the operation.
+
+        Args:
+            result: OperationResult of the operation
+
+        Returns:
+            The same result, so callers can ``return timer.finish(...)``
+        """
+        elapsed = time.perf_counter() - self.started
+        durations, operations, exit_code, finished = operation_metrics(self.registry)
+        durations.observe(elapsed, phase='total', **self.labels)
+        operations.inc(result='ok' if result.ok else 'failed', **self.labels)
+        if result.returncode is not None:
+            exit_code.set(result.returncode, **self.labels)
+        else:
+            exit_code.set(0 if result.ok else -1, **self.labels)
+        finished.set(time.time(), **self.labels)
+        logger.debug(f"Service {self.labels['service']} {self.labels['action']} took {elapsed:.3f}s")
+        return result
+
+
+class TextfileExporter:
+    """Write a registry to a node_exporter textfile-collector ``.prom`` file.
+
+    Every export re-reads the file under a lock file and adds what the
+    registry recorded since the previous export, so counters keep growing
+    across separate CLI runs and processes writing the same file at once
+    neither lose nor double count operations. Gauges this process set since
+    its previous export replace the file's. The file is replaced atomically.
+    """
+
+    def __init__(self, path: str, registry: Optional[MetricsRegistry] = None):
+        """Initialize an exporter.
+
+        Args:
+            path: Target file; node_exporter only reads files ending in '.prom'
+            registry: Registry to export (default: REGISTRY)
+        """
+        from src.storage import FileLock
+        self.path = path
+        self.registry = registry if registry is not None else REGISTRY
+        self.lock = FileLock(path + '.lock')
+        # Samples and gauge updates of the registry as of the previous export
+        self._exported: Dict[str, float] = {}
+        self._gauge_updates: Dict[str, int] = {}
+
+    def export(self) -> None:
+        """Merge the metrics recorded since the previous export into the file.
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        import os
+        from src.storage import atomic_write
+        dir_path = os.path.dirname(self.path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        with self.lock.hold():
+            operation_metrics(self.registry)
+            # Read before rendering: a gauge set in between is exported again next time
+            gauge_updates = self.registry.gauge_updates()
+            current = _samples(self.registry.render())
+            changes = []
+            for key, value in current.items():
+                if key in gauge_updates:
+                    if gauge_updates[key] != self._gauge_updates.get(key):
+                        changes.append(f'{key} {_format_value(value)}')
+                elif value != self._exported.get(key, 0):
+                    changes.append(f'{key} {_format_value(value - self._exported.get(key, 0))}')
+            # Gauges keep the first value merged, so this process's changes go first
+            merged = self.registry.empty_copy()
+            merged.merge_text('\n'.join(changes))
+            try:
+                with open(self.path) as file:
+                    merged.merge_text(file.read())
+            except FileNotFoundError:
+                pass
+            atomic_write(self.path, merged.render())
+            self._exported = current
+            self._gauge_updates = gauge_updates
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import sys
+import threading
+from collections import deque
+from typing import Callable, Deque, Optional, TextIO
+
+# Bytes of output kept per service for failure reports
+DEFAULT_TAIL_BYTES = 64 * 1024
+
+_write_lock = threading.Lock()
+
+
+class OutputBuffer:
+    """Ring buffer keeping the last lines of a command's output.
+
+    Memory stays bounded by about ``limit`` characters however much the
+    command prints; the oldest lines are dropped first.
+    """
+
+    def __init__(self, limit: int = DEFAULT_TAIL_BYTES):
+        self.limit = limit
+        self.dropped = 0
+        self._lines: Deque[str] = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def append(self, line: str) -> None:
+        """Add a line, dropping old lines beyond the limit."""
+        if len(line) >= self.limit:
+            line = line[-(self.limit - 1):]
+        with self._lock:
+            self._lines.append(line)
+            self._size += len(line) + 1
+            while self._size > self.limit:
+                self._size -= len(self._lines.popleft()) + 1
+                self.dropped += 1
+
+    def text(self) -> str:
+        """Return the kept lines, noting how many earlier lines were dropped."""
+        with self._lock:
+            lines = list(self._lines)
+            dropped = self.dropped
+        if dropped:
+            lines.insert(0, f"... ({dropped} earlier lines dropped)")
+        return "\n".join(lines)
+
+
+def echo(name: str, line: str, stream: Optional[TextIO] = None) -> None:
+    """Write a line of command output prefixed with the service name.
+
+    Whole lines are written under a lock, so output of concurrent commands
+    never interleaves within a line.
+    """
+    stream = stream or sys.stderr
+    with _write_lock:
+        stream.write(f"[{name}] {line}\n")
+        stream.flush()
+
+
+class OutputCapture:
+    """Line callback that records a service's output and passes it on.
+
+    Attributes:
+        name: Service name
+        buffer: Tail of the output
+    """
+
+    def __init__(self,
+                 name: str,
+                 forward: Optional[Callable[[str, str], None]] = echo,
+                 limit: int = DEFAULT_TAIL_BYTES):
+        """Initialize a capture.
+
+        Args:
+            name: Service name
+            forward: Callback receiving (service name, line) for every line,
+                None to only keep the tail (default: print with a prefix)
+            limit: Bytes of output to keep
+        """
+        self.name = name
+        self.forward = forward
+        self.buffer = OutputBuffer(limit)
+
+    def __call__(self, line: str) -> None:
+        self.buffer.append(line)
+        if self.forward is not None:
+            self.forward(self.name, line)
+
+    def tail(self) -> Optional[str]:
+        """Return the kept output, None if the command printed nothing."""
+        return self.buffer.text() or None
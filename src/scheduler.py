@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import logging
+from typing import Callable, Dict, List
+
+from src.services import Service, OperationResult
+from src.storage import name_key
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyCycleError(ValueError):
+    """The selected services depend on each other in a cycle.
+
+    Attributes:
+        cycle: Names along the cycle, starting and ending with the same service
+    """
+
+    def __init__(self, cycle: List[str]):
+        super().__init__(f"Dependency cycle: {' -> '.join(cycle)}")
+        self.cycle = cycle
+
+
+def dependency_graph(services: List[Service], reverse: bool = False) -> List[List[int]]:
+    """Map each service to the services it has to wait for.
+
+    Dependencies on services outside the selection are ignored, since those
+    are not being operated on, and each one is listed once even if it is
+    named several times.
+
+    Args:
+        services: Selected services
+        reverse: Wait for dependents instead of dependencies (for stopping)
+
+    Returns:
+        For each service index, the indexes of the services it waits for
+    """
+    index = {name_key(s.name): i for i, s in enumerate(services)}
+    waits: List[List[int]] = [[] for _ in services]
+    for i, service in enumerate(services):
+        for dependency in service.depends_on:
+            j = index.get(name_key(dependency))
+            if j is None or j == i:
+                continue
+            waiter, waited = (j, i) if reverse else (i, j)
+            if waited not in waits[waiter]:
+                waits[waiter].append(waited)
+    return waits
+
+
+def dependency_levels(services: List[Service], reverse: bool = False) -> List[List[Service]]:
+    """Sort services topologically into levels that can run concurrently.
+
+    Args:
+        services: Selected services
+        reverse: Order for stopping: dependents come before their dependencies
+
+    Returns:
+        Levels of services; every service only waits for earlier levels
+
+    Raises:
+        DependencyCycleError: If the services depend on each other in a cycle
+    """
+    waits = dependency_graph(services, reverse)
+    remaining = {i: set(w) for i, w in enumerate(waits)}
+    levels: List[List[Service]] = []
+    while remaining:
+        ready = [i for i, w in remaining.items() if not w]
+        if not ready:
+            raise DependencyCycleError(_find_cycle(services, remaining))
+        levels.append([services[i] for i in ready])
+        for i in ready:
+            del remaining[i]
+        for w in remaining.values():
+            w.difference_update(ready)
+    return levels
+
+
+def _find_cycle(services: List[Service], remaining: Dict[int, set]) -> List[str]:
+    """Follow unresolved waits from any service until one repeats."""
+    path: List[int] = []
+    seen: Dict[int, int] = {}
+    node = next(iter(remaining))
+    while node not in seen:
+        seen[node] = len(path)
+        path.append(node)
+        node = min(remaining[node])
+    cycle = path[seen[node]:] + [node]
+    return [services[i].name for i in cycle]
+
+
+def run_in_order(services: List[Service],
+                 run: Callable[[Service], OperationResult],
+                 operation: int,
+                 reverse: bool = False,
+                 max_parallel: int = 4) -> List[OperationResult]:
+    """Run an operation on services, respecting their dependencies.
+
+    Each service starts as soon as everything it waits for has finished,
+    so independent chains proceed side by side and the whole run takes
+    about as long as the longest chain. Services whose dependency failed
+    are skipped.
+
+    Args:
+        services: Services to operate on
+        run: Function performing the operation on one service
+        operation: Operation code, recorded in skipped results
+        reverse: Stop order: dependents before their dependencies
+        max_parallel: Maximum number of operations running at once
+
+    Returns:
+        List of OperationResult, in the same order as services
+
+    Raises:
+        DependencyCycleError: If the services depend on each other in a cycle
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    # Validates the graph before anything runs
+    levels = dependency_levels(services, reverse)
+    logger.info(f"Dependency levels: {' | '.join(', '.join(s.name for s in level) for level in levels)}")
+
+    waits = dependency_graph(services, reverse)
+    blocking = [set(w) for w in waits]
+    dependents: List[List[int]] = [[] for _ in services]
+    for i, w in enumerate(waits):
+        for j in w:
+            dependents[j].append(i)
+
+    results: List[OperationResult] = [None] * len(services)
+
+    def skip(i: int, cause: str) -> None:
+        if results[i] is not None:
+            return
+        service = services[i]
+        logger.warning(f"Skipping {service.name}: {cause} did not complete")
+        results[i] = OperationResult(service.name, service.tag, operation, None, f"Skipped: {cause} did not complete")
+        for k in dependents[i]:
+            skip(k, cause)
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        running = {executor.submit(run, services[i]): i for i, b in enumerate(blocking) if not b}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                results[i] = future.result()
+                for k in dependents[i]:
+                    if not results[i].ok:
+                        skip(k, services[i].name)
+                        continue
+                    blocking[k].discard(i)
+                    if not blocking[k] and results[k] is None:
+                        running[executor.submit(run, services[k])] = k
+    return results
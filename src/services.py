@@ -1,149 +1,181 @@
 #!/usr/bin/env python3
 
-import subprocess
-import os
 import logging
-import colorlog
-from abc import ABC, abstractmethod
-from typing import Optional, Tuple, List, Callable
-
-# Initialize color logging
-handler = colorlog.StreamHandler()
-handler.setFormatter(colorlog.ColoredFormatter(
-    '%(log_color)s%(asctime)s - %(levelname)s - %(message)s',
-    log_colors={
-        'DEBUG':    'cyan',
-        'INFO':     'green',
-        'WARNING':  'yellow',
-        'ERROR':    'red',
-        'CRITICAL': 'bold_red',
-    }
-))
+from typing import Optional, List, Callable
+
+logger = logging.getLogger(__name__)
+
+# Strategy classes live in src.strategies, which pulls in subprocess and
+# asyncio; they are imported on first use to keep CLI startup fast.
+_STRATEGY_EXPORTS = (
+    'OutputCallback',
+    'run_command',
+    'run_command_async',
+    'ServiceStrategy',
+    'SystemServiceStrategy',
+    'DockerServiceStrategy',
+    'SystemdDBusStrategy',
+    'DockerEngineStrategy',
+)
+
+
+def __getattr__(name: str):
+    if name in _STRATEGY_EXPORTS:
+        from src import strategies
+        return getattr(strategies, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-logger = colorlog.getLogger(__name__)
-logger.setLevel(logging.INFO)
-logger.addHandler(handler)
+
+# Operation codes
+STOP = 0
+RESTART = 1
+START = 2
+RELOAD = 3
+
+OPERATIONS = {
+    'stop': STOP,
+    'restart': RESTART,
+    'start': START,
+    'reload': RELOAD,
+}
+
+
+def operation_name(operation: int) -> str:
+    """Return the action name of an operation code, e.g. 'restart' for 1."""
+    for name, code in OPERATIONS.items():
+        if code == operation:
+            return name
+    return str(operation)
+
+
+def parse_operation(value) -> int:
+    """Convert an action name ('stop', 'restart', 'start', 'reload') or code to an operation code.
+    
+    Args:
+        value: Action name (case insensitive) or operation code
+        
+    Returns:
+        Operation code
+        
+    Raises:
+        ValueError: For an unknown operation
+    """
+    if isinstance(value, str) and value.strip().lower() in OPERATIONS:
+        return OPERATIONS[value.strip().lower()]
+    if isinstance(value, int) and not isinstance(value, bool) and value in OPERATIONS.values():
+        return value
+    raise ValueError(f"Invalid operation: {value!r} (expected one of: {', '.join(OPERATIONS)})")
 
 
 def get_operation() -> Optional[int]:
     """Get service operation from user input.
     
     Returns:
-        0: stop, 1: restart, None: quit
+        0: stop, 1: restart, 2: start, 3: reload, None: quit
     """
     while True:
-        choice = input("Please select an operation (0 to stop, 1 to restart, q to quit): ").strip().lower()
+        choice = input("Please select an operation (0 to stop, 1 to restart, 2 to start, 3 to reload, "
+                       "q to quit): ").strip().lower()
         if choice == 'q':
             return None
         try:
             op = int(choice)
-            if op in (0, 1):
+            if op in OPERATIONS.values():
                 return op
         except ValueError:
-            pass
-        logger.warning("Invalid input, please enter 0, 1, or q.")
+            if choice in OPERATIONS:
+                return OPERATIONS[choice]
+        logger.warning("Invalid input, please enter 0, 1, 2, 3, or q.")
 
 
-class ServiceStrategy(ABC):
-    """Abstract base class for service operation strategies."""
-    
-    @abstractmethod
-    def generate_command(self, operation: int, service_name: str, path: Optional[str] = None) -> List[str]:
-        """Generate command for service operation.
-        
-        Args:
-            operation: 0=stop, 1=restart
-            service_name: Name of the service
-            path: Service path (for docker)
-            
-        Returns:
-            Command list for subprocess
-        """
-        pass
-    
-    @abstractmethod
-    def execute(self, command: List[str]) -> None:
-        """Execute the service command.
-        
-        Args:
-            command: Command to execute
-            
-        Raises:
-            subprocess.CalledProcessError: If command fails
-        """
-        pass
+class OperationResult:
+    """Outcome of a single service operation.
 
+    Attributes:
+        name: Service name
+        tag: Service type ('sys' or 'docker')
+        operation: 0=stop, 1=restart, 2=start, 3=reload
+        returncode: Exit code of the command, None if it never ran
+        error: Error message if the operation failed
+        output: Last lines the command printed, kept for failed operations
+    """
 
-class SystemServiceStrategy(ServiceStrategy):
-    """Strategy for systemd services."""
-    
-    def __init__(self, path: Optional[str] = None):
-        pass
-    
-    def generate_command(self, operation: int, service_name: str, path: Optional[str] = None) -> List[str]:
-        if operation == 0:
-            return ["sudo", "systemctl", "stop", service_name]
-        elif operation == 1:
-            return ["sudo", "systemctl", "restart", service_name]
-        raise ValueError(f"Invalid operation for system service: {operation}")
-    
-    def execute(self, command: List[str]) -> None:
-        subprocess.run(command, check=True)
+    __slots__ = ('name', 'tag', 'operation', 'returncode', 'error', 'output')
+
+    def __init__(self,
+                 name: str,
+                 tag: str,
+                 operation: int,
+                 returncode: Optional[int] = 0,
+                 error: Optional[str] = None,
+                 output: Optional[str] = None):
+        self.name = name
+        self.tag = tag
+        self.operation = operation
+        self.returncode = returncode
+        self.error = error
+        self.output = output
 
+    def __repr__(self) -> str:
+        return (f"OperationResult(name={self.name!r}, tag={self.tag!r}, operation={self.operation!r}, "
+                f"returncode={self.returncode!r}, error={self.error!r})")
 
-class DockerServiceStrategy(ServiceStrategy):
-    """Strategy for docker-compose services."""
-    
-    def __init__(self, path: str):
-        self.path = path
-    
-    def generate_command(self, operation: int, service_name: str, path: Optional[str] = None) -> List[str]:
-        if not self.path:
-            raise ValueError("Docker service requires a path")
-        
-        expanded_path = os.path.expanduser(self.path)
-        if not os.path.exists(expanded_path):
-            raise FileNotFoundError(f"Docker path not found: {expanded_path}")
-        if not os.path.isdir(expanded_path):
-            raise NotADirectoryError(f"Docker path must be a directory: {expanded_path}")
-        
-        if operation == 0:
-            return ["docker", "compose", "down"]
-        elif operation == 1:
-            return ["docker", "compose", "up", "-d"]
-        raise ValueError(f"Invalid operation for docker service: {operation}")
-    
-    def execute(self, command: List[str]) -> None:
-        expanded_path = os.path.expanduser(self.path)
-        if not os.path.exists(expanded_path):
-            raise FileNotFoundError(f"Path not found: {expanded_path}")
-        if not os.path.isdir(expanded_path):
-            raise NotADirectoryError(f"Docker path must be directory: {expanded_path}")
-        subprocess.run(command, check=True, cwd=expanded_path)
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, OperationResult):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    @property
+    def ok(self) -> bool:
+        """Whether the operation completed successfully."""
+        return self.returncode == 0 and self.error is None
+
+    def to_dict(self) -> dict:
+        """Return dictionary representation of the result."""
+        return {a: getattr(self, a) for a in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'OperationResult':
+        """Build a result from its dictionary representation."""
+        return cls(**{a: data[a] for a in cls.__slots__ if a in data})
 
 
 class Service:
     """Management interface for web services.
     
+    Services are lightweight records; the operation strategy is only built
+    the first time it is needed.
+    
     Attributes:
         tag: Service type ('sys' or 'docker')
         name: Service name
         path: Configuration path (for docker services)
+        depends_on: Names of the services this service depends on
         strategy: Service operation strategy
     """
 
+    __slots__ = ('tag', 'name', 'path', 'depends_on', '_strategy')
+
+    # Strategy class names in src.strategies, resolved on first use
     STRATEGIES = {
-        'sys': SystemServiceStrategy,
-        'docker': DockerServiceStrategy
+        'sys': 'SystemServiceStrategy',
+        'docker': 'DockerServiceStrategy'
     }
 
-    def __init__(self, tag: str, name: str, path: Optional[str] = None):
+    def __init__(self,
+                 tag: str,
+                 name: str,
+                 path: Optional[str] = None,
+                 strategy: Optional['ServiceStrategy'] = None,
+                 depends_on: Optional[List[str]] = None):
         """Initialize a service instance.
         
         Args:
             tag: Service type ('sys' or 'docker')
             name: Service name
             path: Configuration path (required for docker)
+            strategy: Strategy to use instead of the default one for the tag (optional)
+            depends_on: Names of the services that must be up before this one (optional)
             
         Raises:
             ValueError: For invalid tag
@@ -154,40 +186,126 @@ class Service:
         self.tag = tag
         self.name = name
         self.path = path
-        self.strategy = self.STRATEGIES[tag](path=self.path)
-        logger.info(f"Initialized {tag} service: {name}")
+        self.depends_on = list(depends_on or [])
+        self._strategy = strategy
+
+    @property
+    def strategy(self) -> 'ServiceStrategy':
+        """Service operation strategy, created on first use."""
+        if self._strategy is None:
+            from src import strategies
+            self._strategy = getattr(strategies, self.STRATEGIES[self.tag])(path=self.path)
+            logger.debug(f"Initialized {self.tag} service: {self.name}")
+        return self._strategy
         
     def to_dict(self) -> dict:
         """Return dictionary representation of the service."""
-        return {
+        data = {
             "tag": self.tag,
             "name": self.name,
             "path": self.path
         }
+        if self.depends_on:
+            data["depends_on"] = list(self.depends_on)
+        return data
 
-    def service_operation(self) -> None:
-        """Perform service operation based on user input.
+    def service_operation(self, operation: Optional[int] = None) -> Optional[OperationResult]:
+        """Perform a service operation, asking the user when none is given.
         
+        Args:
+            operation: 0=stop, 1=restart, 2=start, 3=reload; prompts when omitted
+            
+        Returns:
+            OperationResult describing the outcome, None if the user cancelled
         """
-        operation = get_operation()
         if operation is None:
-            logger.info("Operation cancelled by user")
-            return
+            operation = get_operation()
+            if operation is None:
+                logger.info("Operation cancelled by user")
+                return None
+        return self.run_operation(operation)
+
+    def run_operation(self, operation: int) -> OperationResult:
+        """Perform the given service operation without prompting.
         
+        Args:
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            
+        Command output is printed prefixed with the service name, and its
+        tail is attached to the result if the operation fails.
+        
+        Returns:
+            OperationResult describing the outcome
+        """
+        import subprocess
+        from src.metrics import OperationTimer
+        from src.output import OutputCapture
+        timer = OperationTimer(self.name, self.tag, operation)
+        capture = OutputCapture(self.name)
         try:
             # Generate and execute command
-            if self.path is not None:
+            with timer.phase('generate'):
+                if self.path is not None:
+                    command = self.strategy.generate_command(operation, self.name, self.path)
+                else:
+                    command = self.strategy.generate_command(operation, self.name)
+            logger.info(f"Executing: {' '.join(command)}")
+            with timer.phase('execute'):
+                self.strategy.execute(command, on_output=capture)
+            logger.info(f"Service {self.name} operation completed")
+            return timer.finish(OperationResult(self.name, self.tag, operation))
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Service operation failed: {str(e)}")
+            return timer.finish(OperationResult(self.name, self.tag, operation, e.returncode, str(e),
+                                                capture.tail()))
+        except (ValueError, FileNotFoundError, NotADirectoryError) as e:
+            logger.error(f"Service operation failed: {str(e)}")
+            return timer.finish(OperationResult(self.name, self.tag, operation, None, str(e), capture.tail()))
+
+    async def run_operation_async(self,
+                                  operation: int,
+                                  timeout: Optional[float] = None,
+                                  on_output: Optional[Callable[[str, str], None]] = None) -> OperationResult:
+        """Perform the given service operation on the running event loop.
+        
+        Args:
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            timeout: Seconds to wait before killing the command (optional)
+            on_output: Callback receiving (service name, output line); output
+                is printed prefixed with the service name when omitted
+            
+        Returns:
+            OperationResult describing the outcome; failed results carry the
+            tail of the output
+            
+        Raises:
+            asyncio.CancelledError: If the awaiting task is cancelled
+        """
+        import subprocess
+        from src.metrics import OperationTimer
+        from src.output import OutputCapture, echo
+        stream = OutputCapture(self.name, on_output or echo)
+        timer = OperationTimer(self.name, self.tag, operation)
+        try:
+            with timer.phase('generate'):
                 command = self.strategy.generate_command(operation, self.name, self.path)
-            else:
-                command = self.strategy.generate_command(operation, self.name)
             logger.info(f"Executing: {' '.join(command)}")
-            self.strategy.execute(command)
+            with timer.phase('execute'):
+                await self.strategy.execute_async(command, timeout=timeout, on_output=stream)
             logger.info(f"Service {self.name} operation completed")
-        except (ValueError, FileNotFoundError, NotADirectoryError, subprocess.CalledProcessError) as e:
+            return timer.finish(OperationResult(self.name, self.tag, operation))
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Service operation failed: {str(e)}")
+            return timer.finish(OperationResult(self.name, self.tag, operation, e.returncode, str(e),
+                                                stream.tail()))
+        except (subprocess.TimeoutExpired, ValueError, FileNotFoundError, NotADirectoryError) as e:
             logger.error(f"Service operation failed: {str(e)}")
+            return timer.finish(OperationResult(self.name, self.tag, operation, None, str(e), stream.tail()))
 
 # Example usage
 if __name__ == "__main__":
+    from src.log import setup_logging
+    setup_logging()
     try:
         service = Service(tag="docker", name="homepage", path="~/projects/webservices/homepage")
         service.service_operation()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.services import Service
+from src.storage import atomic_write, name_key
+
+logger = logging.getLogger(__name__)
+
+# Properties read for systemd units
+UNIT_PROPERTIES = ("LoadState", "ActiveState", "SubState", "MainPID")
+
+
+class ServiceStatus:
+    """Runtime state of a service.
+
+    Attributes:
+        name: Service name
+        tag: Service type ('sys' or 'docker')
+        state: systemd ActiveState for units ('active', 'inactive', 'failed',
+            ...); 'running', 'partial' or 'stopped' for compose projects;
+            'not-found' or 'unknown' when the state cannot be determined
+        detail: Additional information, such as the unit's SubState or the
+            container counts of a compose project
+        pid: Main PID of a unit, if any
+        checked_at: Time the state was queried (seconds since the epoch)
+    """
+
+    __slots__ = ('name', 'tag', 'state', 'detail', 'pid', 'checked_at')
+
+    def __init__(self,
+                 name: str,
+                 tag: str,
+                 state: str,
+                 detail: str = '',
+                 pid: Optional[int] = None,
+                 checked_at: float = 0.0):
+        self.name = name
+        self.tag = tag
+        self.state = state
+        self.detail = detail
+        self.pid = pid
+        self.checked_at = checked_at
+
+    def __repr__(self) -> str:
+        return (f"ServiceStatus(name={self.name!r}, tag={self.tag!r}, state={self.state!r}, "
+                f"detail={self.detail!r}, pid={self.pid!r})")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ServiceStatus):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    @property
+    def running(self) -> bool:
+        """Whether the service is up."""
+        return self.state in ('active', 'running')
+
+    def to_dict(self) -> dict:
+        """Return dictionary representation of the status."""
+        return {a: getattr(self, a) for a in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ServiceStatus':
+        """Build a status from its dictionary representation."""
+        return cls(**{a: data[a] for a in cls.__slots__ if a in data})
+
+
+def summarize_containers(counts: Dict[str, int]) -> Tuple[str, str]:
+    """Reduce container state counts of a compose project to (state, detail).
+
+    Args:
+        counts: Number of containers by state, e.g. {'running': 2, 'exited': 1}
+
+    Returns:
+        ('running' | 'partial' | 'stopped', e.g. 'running(2), exited(1)')
+    """
+    detail = ', '.join(f"{state}({count})" for state, count in sorted(counts.items()))
+    running = counts.get('running', 0)
+    if running and running == sum(counts.values()):
+        return 'running', detail
+    return ('partial' if running else 'stopped'), detail
+
+
+def parse_compose_status(status: str) -> Dict[str, int]:
+    """Parse a ``docker compose ls`` status such as 'running(2), exited(1)'."""
+    return {state: int(count) for state, count in re.findall(r'(\w+)\((\d+)\)', status)}
+
+
+class StatusCollector:
+    """Queries service states in batches and caches them for a short time.
+
+    All systemd units are read with one ``systemctl show`` call and all
+    compose projects with one ``docker compose ls`` call (or one Docker
+    Engine API request), whatever the number of services. Results are kept
+    for ``ttl`` seconds, optionally in a file so that separate CLI runs
+    share them.
+    """
+
+    def __init__(self,
+                 ttl: float = 5.0,
+                 cache_path: Optional[str] = None,
+                 docker_client: Optional['DockerClient'] = None):
+        """Initialize a collector.
+
+        Args:
+            ttl: Seconds a queried state stays valid
+            cache_path: JSON file persisting the cache between runs (optional)
+            docker_client: Docker Engine API client; the compose CLI is used
+                when omitted
+        """
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self.docker_client = docker_client
+        self._cache: Dict[str, ServiceStatus] = {}
+        self._lock = threading.Lock()
+        if cache_path:
+            self._load()
+
+    def collect(self, services: Iterable[Service], refresh: bool = False) -> List[ServiceStatus]:
+        """Return the status of each service, querying only expired entries.
+
+        Args:
+            services: Services to report on
+            refresh: Ignore cached states
+
+        Returns:
+            One ServiceStatus per service, in the order given
+        """
+        services = list(services)
+        now = time.time()
+        with self._lock:
+            cached = {} if refresh else {
+                key: status for key, status in self._cache.items() if now - status.checked_at < self.ttl}
+        missing = [s for s in services if self._key(s) not in cached]
+
+        if missing:
+            fresh = self._query(missing, now)
+            with self._lock:
+                for key, status in fresh.items():
+                    if status.state != 'unknown':
+                        self._cache[key] = status
+                if self.cache_path:
+                    self._save()
+            cached.update(fresh)
+        return [cached[self._key(s)] for s in services]
+
+    def invalidate(self, services: Optional[Iterable[Service]] = None) -> None:
+        """Drop cached states, of the given services or all of them."""
+        with self._lock:
+            if self.cache_path:
+                self._load()
+            if services is None:
+                self._cache.clear()
+            else:
+                for service in services:
+                    self._cache.pop(self._key(service), None)
+            if self.cache_path and os.path.exists(self.cache_path):
+                self._save()
+
+    @staticmethod
+    def _key(service: Service) -> str:
+        return f"{service.tag}:{name_key(service.name)}"
+
+    def _query(self, services: List[Service], now: float) -> Dict[str, ServiceStatus]:
+        units = [s for s in services if s.tag == 'sys']
+        projects = [s for s in services if s.tag == 'docker']
+        results: Dict[str, ServiceStatus] = {}
+        if units and projects:
+            # Query both kinds at once
+            thread = threading.Thread(target=lambda: results.update(self._query_units(units, now)))
+            thread.start()
+            results.update(self._query_projects(projects, now))
+            thread.join()
+        elif units:
+            results.update(self._query_units(units, now))
+        elif projects:
+            results.update(self._query_projects(projects, now))
+        return results
+
+    def _query_units(self, services: List[Service], now: float) -> Dict[str, ServiceStatus]:
+        import subprocess
+        from src.strategies import SystemServiceStrategy
+        try:
+            units = SystemServiceStrategy().show_units([s.name for s in services], UNIT_PROPERTIES)
+        except (subprocess.CalledProcessError, ValueError, OSError) as e:
+            logger.error(f"Cannot query systemd units: {str(e)}")
+            return {self._key(s): ServiceStatus(s.name, s.tag, 'unknown', str(e), checked_at=now) for s in services}
+
+        results = {}
+        for service, unit in zip(services, units):
+            if unit.get('LoadState') == 'not-found':
+                status = ServiceStatus(service.name, service.tag, 'not-found', checked_at=now)
+            else:
+                pid = int(unit.get('MainPID') or 0)
+                status = ServiceStatus(service.name, service.tag, unit.get('ActiveState', 'unknown'),
+                                       unit.get('SubState', ''), pid or None, now)
+            results[self._key(service)] = status
+        return results
+
+    def _query_projects(self, services: List[Service], now: float) -> Dict[str, ServiceStatus]:
+        from src.docker_api import project_name
+        try:
+            by_dir, by_name = self._compose_projects()
+        except Exception as e:
+            logger.error(f"Cannot query compose projects: {str(e)}")
+            return {self._key(s): ServiceStatus(s.name, s.tag, 'unknown', str(e), checked_at=now) for s in services}
+
+        results = {}
+        for service in services:
+            path = os.path.realpath(os.path.expanduser(service.path or ''))
+            counts = by_dir.get(path) or by_name.get(project_name(path))
+            if counts:
+                state, detail = summarize_containers(counts)
+                status = ServiceStatus(service.name, service.tag, state, detail, checked_at=now)
+            else:
+                status = ServiceStatus(service.name, service.tag, 'not-found', 'no containers', checked_at=now)
+            results[self._key(service)] = status
+        return results
+
+    def _compose_projects(self) -> Tuple[Dict[str, Dict[str, int]], Dict[str, Dict[str, int]]]:
+        """Return container state counts by project directory and by project name."""
+        by_dir: Dict[str, Dict[str, int]] = {}
+        by_name: Dict[str, Dict[str, int]] = {}
+        if self.docker_client is not None:
+            from src.docker_api import PROJECT_LABEL
+            containers = self.docker_client.request(
+                'GET', '/containers/json', {'all': 1, 'filters': json.dumps({'label': [PROJECT_LABEL]})})[1]
+            for container in containers:
+                labels = container.get('Labels') or {}
+                counts = by_name.setdefault(labels[PROJECT_LABEL], {})
+                state = container.get('State', 'unknown')
+                counts[state] = counts.get(state, 0) + 1
+                working_dir = labels.get('com.docker.compose.project.working_dir')
+                if working_dir:
+                    by_dir[os.path.realpath(working_dir)] = counts
+            return by_dir, by_name
+
+        import subprocess
+        output = subprocess.run(["docker", "compose", "ls", "--all", "--format", "json"],
+                                check=True, capture_output=True, text=True).stdout
+        for project in json.loads(output or '[]'):
+            counts = parse_compose_status(project.get('Status', ''))
+            by_name[project['Name']] = counts
+            for config_file in filter(None, project.get('ConfigFiles', '').split(',')):
+                by_dir[os.path.dirname(os.path.realpath(config_file))] = counts
+        return by_dir, by_name
+
+    def _load(self) -> None:
+        try:
+            with open(self.cache_path) as file:
+                self._cache = {key: ServiceStatus.from_dict(data) for key, data in json.load(file).items()}
+        except FileNotFoundError:
+            self._cache = {}
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Ignoring invalid status cache {self.cache_path}: {str(e)}")
+            self._cache = {}
+
+    def _save(self) -> None:
+        try:
+            atomic_write(self.cache_path, json.dumps({key: s.to_dict() for key, s in self._cache.items()}))
+        except OSError as e:
+            logger.warning(f"Cannot write status cache {self.cache_path}: {str(e)}")
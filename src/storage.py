@@ -0,0 +1,781 @@
+#!/usr/bin/env python3
+
+from src.services import Service
+import logging
+import json
+import os
+import fcntl
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Tuple, Iterator, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+def name_key(name: str) -> str:
+    """Normalize a service name for case-insensitive comparison."""
+    return name.strip().lower()
+
+
+def is_pattern(selector: str) -> bool:
+    """Whether a name selector is a glob pattern rather than a plain name."""
+    return any(c in selector for c in '*?[')
+
+
+def atomic_write(file_path: str, data: str) -> None:
+    """Replace a file atomically with the given content.
+    
+    The data is written to a temporary file in the same directory, flushed
+    to disk and renamed over the target, so readers see either the old or
+    the new content and a crash never leaves a half-written file.
+    
+    Args:
+        file_path: Path of the file to replace
+        data: New file content
+    """
+    dir_path = os.path.dirname(file_path) or '.'
+    try:
+        mode = os.stat(file_path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    import tempfile
+
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    # Persist the rename itself
+    dir_fd = os.open(dir_path, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class FileLock:
+    """Re-entrant, cross-process advisory lock based on ``fcntl.flock``.
+    
+    Nested acquisitions from the same process only take the file lock once.
+    """
+
+    def __init__(self, lock_path: str):
+        self.lock_path = lock_path
+        self._mutex = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """Hold the lock for the duration of the with block."""
+        with self._mutex:
+            if self._depth == 0:
+                self._file = open(self.lock_path, 'a')
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._file, fcntl.LOCK_UN)
+                    self._file.close()
+                    self._file = None
+
+
+class RepositoryTransaction:
+    """Batch of register/remove operations applied with a single write.
+    
+    Attributes:
+        services: Service dictionaries as they will be after the batch
+        records: Journal-style records of the operations, in order
+    """
+
+    def __init__(self, services: List[Dict]):
+        self.services = services
+        self.records: List[Dict] = []
+        # Normalized names, built on the first contains() call
+        self._keys: Optional[set] = None
+
+    def save(self, service: Service) -> None:
+        """Add a service to the batch.
+        
+        Args:
+            service: Service instance to save
+        """
+        record = service.to_dict()
+        self.services.append(record)
+        self.records.append({"op": "register", "service": record})
+        if self._keys is not None:
+            self._keys.add(name_key(record['name']))
+
+    def contains(self, service_name: str) -> bool:
+        """Whether a service with this name (case insensitive) is in the batch."""
+        if self._keys is None:
+            self._keys = {name_key(s['name']) for s in self.services}
+        return name_key(service_name) in self._keys
+
+    def remove(self, service_name: str) -> None:
+        """Remove a service by name (case insensitive) in the batch.
+        
+        Args:
+            service_name: Name of the service to remove
+            
+        Raises:
+            ValueError: If service not found
+        """
+        target = name_key(service_name)
+        remaining = [s for s in self.services if name_key(s['name']) != target]
+        if len(remaining) == len(self.services):
+            raise ValueError(f"Service '{service_name}' not found")
+        self.services = remaining
+        self.records.append({"op": "remove", "name": service_name})
+        self._keys = None
+
+
+class ServiceRepository:
+    """Repository for service persistence.
+
+    Writes replace the file atomically while holding an advisory lock on
+    ``<file>.lock``, so concurrent invocations never lose updates.
+    """
+    
+    def __init__(self, file_path: str = 'data/services.json'):
+        self.file_path = file_path
+        # Make sure the path has existed
+        dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        self.lock = FileLock(file_path + '.lock')
+        # Parsed services, valid while the file keeps the same stat key
+        self._cache: Optional[List[Dict]] = None
+        self._cache_key: Optional[Tuple[int, int, int]] = None
+        # Normalized name -> record, rebuilt when the loaded list changes
+        self._index: Optional[Dict[str, Dict]] = None
+        self._index_source: Optional[List[Dict]] = None
+        
+    def save(self, service: Service) -> None:
+        """Save a service to the repository.
+        
+        Args:
+            service: Service instance to save
+            
+        Raises:
+            ValueError: If the existing services data is invalid
+        """
+        with self.transaction() as transaction:
+            transaction.save(service)
+        logger.info(f"Saved service to repository: {service.name}")
+
+    @contextmanager
+    def transaction(self) -> Iterator[RepositoryTransaction]:
+        """Apply several register/remove operations with a single write.
+        
+        The repository stays locked for the whole block. Nothing is written
+        if the block raises.
+        
+        Yields:
+            RepositoryTransaction collecting the operations
+            
+        Raises:
+            ValueError: If the existing services data is invalid
+        """
+        with self.lock.hold():
+            try:
+                services = self._load_for_update()
+            except json.JSONDecodeError:
+                logger.error("Invalid JSON format in services file")
+                raise ValueError("Invalid services data format")
+            transaction = RepositoryTransaction(services)
+            yield transaction
+            if transaction.records:
+                self._commit(transaction)
+            
+    def load_all(self) -> List[Dict]:
+        """Load all services from repository.
+        
+        The parsed file is cached in memory and reused until its mtime,
+        size or inode changes.
+        
+        Returns:
+            List of service dictionaries
+        """
+        services = list(self._services())
+        if not services and self._cache_key is None:
+            logger.info("Service repository file not found, starting fresh")
+        return services
+
+    def find(self, service_name: str) -> Optional[Dict]:
+        """Look up a service by name (case insensitive) through the name index.
+        
+        Args:
+            service_name: Name of the service
+            
+        Returns:
+            Service dictionary, or None if not found
+        """
+        record = self._name_index().get(name_key(service_name))
+        return dict(record) if record else None
+
+    def select(self, selectors: Iterable[str] = (), tag: Optional[str] = None) -> List[Dict]:
+        """Select services by name, glob pattern and/or tag.
+        
+        Plain names are resolved through the name index; only glob patterns
+        need to scan the registry.
+        
+        Args:
+            selectors: Service names or glob patterns such as ``web-*`` (case insensitive);
+                all services when empty
+            tag: Only keep services with this tag (optional)
+            
+        Returns:
+            Matching service dictionaries, without duplicates
+        """
+        from fnmatch import fnmatchcase
+
+        selectors = list(selectors)
+        globs = [name_key(s) for s in selectors if is_pattern(s)]
+        if not selectors:
+            matched = self._services()
+        elif not globs:
+            index = self._name_index()
+            keys = dict.fromkeys(name_key(s) for s in selectors)
+            matched = [index[k] for k in keys if k in index]
+        else:
+            names = {name_key(s) for s in selectors if not is_pattern(s)}
+            matched = []
+            for record in self._services():
+                key = name_key(record['name'])
+                if key in names or any(fnmatchcase(key, g) for g in globs):
+                    matched.append(record)
+        return [dict(r) for r in matched if tag is None or r['tag'] == tag]
+
+    def invalidate_cache(self) -> None:
+        """Drop the in-memory copy of the repository file."""
+        self._cache = None
+        self._cache_key = None
+        self._index = None
+
+    def _services(self) -> List[Dict]:
+        """Return the loaded services list itself, empty if the file is corrupted.
+        
+        Callers must not mutate the returned list.
+        """
+        try:
+            return self._current()
+        except json.JSONDecodeError:
+            logger.warning("Service repository file corrupted or missing")
+            return []
+
+    def _name_index(self) -> Dict[str, Dict]:
+        """Return the name index of the loaded services, rebuilding it if stale."""
+        services = self._services()
+        if self._index is None or self._index_source is not services:
+            index = {}
+            for record in services:
+                index.setdefault(name_key(record['name']), record)
+            self._index, self._index_source = index, services
+        return self._index
+
+    def _load_for_update(self) -> List[Dict]:
+        """Load all services, raising instead of hiding a corrupted file.
+        
+        Returns:
+            List of service dictionaries
+            
+        Raises:
+            json.JSONDecodeError: If the file is not valid JSON
+        """
+        return list(self._current())
+
+    def _current(self) -> List[Dict]:
+        """Return the cached services list, reloading it if the file changed.
+        
+        Raises:
+            json.JSONDecodeError: If the file is not valid JSON
+        """
+        key = self._stat_key()
+        if key is None:
+            self.invalidate_cache()
+            return []
+        if key == self._cache_key:
+            return self._cache
+        try:
+            with open(self.file_path, 'r') as file:
+                services = json.load(file)
+        except FileNotFoundError:
+            self.invalidate_cache()
+            return []
+        except json.JSONDecodeError:
+            self.invalidate_cache()
+            raise
+        self._cache, self._cache_key = services, key
+        return services
+
+    def _commit(self, transaction: RepositoryTransaction) -> None:
+        """Persist a finished transaction; called with the lock held."""
+        self._write(transaction.services)
+
+    def _stat_key(self) -> Optional[Tuple[int, int, int]]:
+        """Return (mtime, size, inode) of the repository file, None if missing."""
+        try:
+            st = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _write(self, services: List[Dict]) -> None:
+        """Atomically write services to the repository file and refresh the cache.
+        
+        Args:
+            services: Complete list of service dictionaries
+        """
+        self.invalidate_cache()
+        atomic_write(self.file_path, json.dumps(services, indent=4))
+        self._cache, self._cache_key = list(services), self._stat_key()
+        
+    def remove(self, service_name: str) -> None:
+        """Remove a service by name.
+        
+        Args:
+            service_name: Name of the service to remove
+            
+        Raises:
+            ValueError: If service not found
+        """
+        try:
+            with self.transaction() as transaction:
+                # Search for matching services (case insensitive)
+                transaction.remove(service_name)
+                
+            logger.info(f"Removed service: {service_name}")
+            
+        except PermissionError:
+            logger.error("Permission denied when writing services file")
+            raise
+        except Exception as e:
+            logger.error(f"Error removing service: {str(e)}")
+            raise
+
+
+class JournalServiceRepository(ServiceRepository):
+    """Repository storing changes in an append-only JSON-Lines journal.
+
+    Registrations and removals are appended to the journal, so each write
+    costs O(1). The journal is replayed on top of a snapshot, which uses the
+    same format as ServiceRepository, so an existing services.json is picked
+    up as the initial snapshot. Once the journal holds compact_threshold
+    records it is folded into a fresh snapshot.
+    """
+
+    def __init__(self,
+                 file_path: str = 'data/services.json',
+                 journal_path: Optional[str] = None,
+                 compact_threshold: int = 100):
+        """Initialize a journal repository.
+        
+        Args:
+            file_path: Path of the snapshot file
+            journal_path: Path of the journal file (defaults to <snapshot>.journal.jsonl)
+            compact_threshold: Number of journal records that triggers compaction
+        """
+        super().__init__(file_path)
+        self.journal_path = journal_path or os.path.splitext(file_path)[0] + '.journal.jsonl'
+        self.compact_threshold = compact_threshold
+        # Replayed services and the number of journal records behind them
+        self._state: Optional[List[Dict]] = None
+        self._state_key = None
+        self._journal_records = 0
+
+    def save(self, service: Service) -> None:
+        """Append a service registration to the journal.
+        
+        Args:
+            service: Service instance to save
+        """
+        with self.transaction() as transaction:
+            transaction.save(service)
+        logger.info(f"Saved service to repository: {service.name}")
+
+    def remove(self, service_name: str) -> None:
+        """Append a service removal to the journal.
+        
+        Args:
+            service_name: Name of the service to remove
+            
+        Raises:
+            ValueError: If service not found
+        """
+        with self.transaction() as transaction:
+            transaction.remove(service_name)
+        logger.info(f"Removed service: {service_name}")
+
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot and truncate it."""
+        with self.lock.hold():
+            services = self._load_for_update()
+            self._write(services)
+            with open(self.journal_path, 'w') as file:
+                os.fsync(file.fileno())
+            self._state, self._journal_records = services, 0
+            self._state_key = (self._stat_key(), self._journal_key())
+        logger.info(f"Compacted service journal into snapshot ({len(services)} services)")
+
+    def _current(self) -> List[Dict]:
+        """Load the snapshot and replay the journal on top of it.
+        
+        Returns:
+            List of service dictionaries
+            
+        Raises:
+            json.JSONDecodeError: If the snapshot is not valid JSON
+        """
+        key = (self._stat_key(), self._journal_key())
+        if self._state is not None and key == self._state_key:
+            return self._state
+
+        services = list(super()._current())
+        count = 0
+        for record in self._read_journal():
+            self._apply(services, record)
+            count += 1
+        self._state, self._state_key, self._journal_records = services, key, count
+        return services
+
+    def _commit(self, transaction: RepositoryTransaction) -> None:
+        """Append the transaction's records with a single write."""
+        self._current()
+        self._append(transaction.records)
+        for record in transaction.records:
+            self._apply(self._state, record)
+        self._index = None
+        if self._journal_records >= self.compact_threshold:
+            self.compact()
+
+    def _append(self, records: List[Dict]) -> None:
+        """Append records to the journal and keep the replay state current."""
+        data = ''.join(json.dumps(record) + '\n' for record in records).encode()
+        with open(self.journal_path, 'ab+') as file:
+            # Terminate a record left half-written by an interrupted append
+            if file.tell() > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':
+                    data = b'\n' + data
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        self._journal_records += len(records)
+        self._state_key = (self._state_key[0], self._journal_key())
+
+    def _journal_key(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read_journal(self) -> List[Dict]:
+        """Read journal records, skipping lines that cannot be parsed."""
+        records = []
+        try:
+            with open(self.journal_path, 'r') as file:
+                for number, line in enumerate(file, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping corrupted journal record at line {number}")
+        except FileNotFoundError:
+            pass
+        return records
+
+    @staticmethod
+    def _apply(services: List[Dict], record: Dict) -> None:
+        """Apply one journal record to a list of services in place.
+
+        A registration replaces an existing service of the same name, which
+        keeps replaying the journal over a freshly compacted snapshot harmless.
+        """
+        if record.get("op") == "register":
+            service = record["service"]
+            name = name_key(service['name'])
+            for i, existing in enumerate(services):
+                if name_key(existing['name']) == name:
+                    services[i] = service
+                    return
+            services.append(service)
+        elif record.get("op") == "remove":
+            name = name_key(record["name"])
+            services[:] = [s for s in services if name_key(s['name']) != name]
+
+
+def _encode_depends_on(depends_on: Optional[List[str]]) -> Optional[str]:
+    """Store dependency names as a JSON array, NULL when there are none."""
+    return json.dumps(depends_on) if depends_on else None
+
+
+class SqliteTransaction:
+    """Batch of register/remove operations inside one SQLite transaction."""
+
+    def __init__(self, conn: 'sqlite3.Connection'):
+        self._conn = conn
+
+    def save(self, service: Service) -> None:
+        """Insert a service.
+        
+        Args:
+            service: Service instance to save
+            
+        Raises:
+            ValueError: If a service with the same name exists
+        """
+        import sqlite3
+
+        record = service.to_dict()
+        try:
+            self._conn.execute(
+                "INSERT INTO services (tag, name, name_key, path, depends_on) VALUES (?, ?, ?, ?, ?)",
+                (record["tag"], record["name"], name_key(record["name"]), record["path"],
+                 _encode_depends_on(record.get("depends_on"))))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Service '{record['name']}' already exists")
+
+    def contains(self, service_name: str) -> bool:
+        """Whether a service with this name (case insensitive) exists."""
+        return self._conn.execute("SELECT 1 FROM services WHERE name_key = ?",
+                                  (name_key(service_name),)).fetchone() is not None
+
+    def remove(self, service_name: str) -> None:
+        """Delete a service by name (case insensitive).
+        
+        Args:
+            service_name: Name of the service to remove
+            
+        Raises:
+            ValueError: If service not found
+        """
+        cursor = self._conn.execute("DELETE FROM services WHERE name_key = ?", (name_key(service_name),))
+        if cursor.rowcount == 0:
+            raise ValueError(f"Service '{service_name}' not found")
+
+
+class SqliteServiceRepository:
+    """Repository backed by an SQLite database in WAL mode.
+
+    Names are unique regardless of case and surrounding whitespace, and tag
+    and path are indexed, so lookups stay fast for large registries. WAL
+    mode lets concurrent CLI and cron invocations read while one writes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS services (
+            id       INTEGER PRIMARY KEY AUTOINCREMENT,
+            tag      TEXT NOT NULL,
+            name     TEXT NOT NULL,
+            name_key TEXT NOT NULL,
+            path     TEXT,
+            depends_on TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_services_name_key ON services (name_key);
+        CREATE INDEX IF NOT EXISTS idx_services_tag ON services (tag);
+        CREATE INDEX IF NOT EXISTS idx_services_path ON services (path);
+    """
+
+    def __init__(self, file_path: str = 'data/services.db', import_path: Optional[str] = None):
+        """Open (and create if needed) the database.
+        
+        Args:
+            file_path: Path of the SQLite database
+            import_path: JSON registry imported into a newly created database (optional)
+        """
+        self.file_path = file_path
+        dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        self._lock = threading.RLock()
+        import sqlite3
+
+        created = not os.path.exists(file_path)
+        self._conn = sqlite3.connect(file_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(services)")}
+            if "depends_on" not in columns:
+                # Databases created before dependencies were tracked
+                self._conn.execute("ALTER TABLE services ADD COLUMN depends_on TEXT")
+        if import_path and created and os.path.exists(import_path):
+            self._import(ServiceRepository(import_path).load_all())
+
+    def save(self, service: Service) -> None:
+        """Save a service to the database.
+        
+        Args:
+            service: Service instance to save
+            
+        Raises:
+            ValueError: If a service with the same name exists
+        """
+        with self.transaction() as transaction:
+            transaction.save(service)
+        logger.info(f"Saved service to repository: {service.name}")
+
+    @contextmanager
+    def transaction(self) -> Iterator["SqliteTransaction"]:
+        """Apply several register/remove operations in one database transaction.
+        
+        The write lock is taken up front (BEGIN IMMEDIATE) and nothing is
+        committed if the block raises.
+        
+        Yields:
+            SqliteTransaction collecting the operations
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield SqliteTransaction(self._conn)
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def load_all(self) -> List[Dict]:
+        """Load all services in registration order.
+        
+        Returns:
+            List of service dictionaries
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT tag, name, path, depends_on FROM services ORDER BY id").fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def find(self, service_name: str) -> Optional[Dict]:
+        """Look up a service by name (case insensitive).
+        
+        Args:
+            service_name: Name of the service
+            
+        Returns:
+            Service dictionary, or None if not found
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT tag, name, path, depends_on FROM services WHERE name_key = ?",
+                                     (name_key(service_name),)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def load_by_tag(self, tag: str) -> List[Dict]:
+        """Load all services with the given tag.
+        
+        Args:
+            tag: Service type ('sys' or 'docker')
+            
+        Returns:
+            List of service dictionaries
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT tag, name, path, depends_on FROM services WHERE tag = ? ORDER BY id",
+                                      (tag,)).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def select(self, selectors: Iterable[str] = (), tag: Optional[str] = None) -> List[Dict]:
+        """Select services by name, glob pattern and/or tag using the indexes.
+        
+        Args:
+            selectors: Service names or glob patterns such as ``web-*`` (case insensitive);
+                all services when empty
+            tag: Only keep services with this tag (optional)
+            
+        Returns:
+            Matching service dictionaries in registration order
+        """
+        selectors = list(selectors)
+        clauses, params = [], []
+        if selectors:
+            names = [name_key(s) for s in selectors if not is_pattern(s)]
+            # SQLite GLOB negates character classes with ^ instead of !
+            globs = [name_key(s).replace('[!', '[^') for s in selectors if is_pattern(s)]
+            parts = []
+            if names:
+                parts.append(f"name_key IN ({', '.join('?' * len(names))})")
+                params.extend(names)
+            for pattern in globs:
+                parts.append("name_key GLOB ?")
+                params.append(pattern)
+            clauses.append(f"({' OR '.join(parts)})")
+        if tag is not None:
+            clauses.append("tag = ?")
+            params.append(tag)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT tag, name, path, depends_on FROM services{where} ORDER BY id",
+                                      params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def remove(self, service_name: str) -> None:
+        """Remove a service by name (case insensitive).
+        
+        Args:
+            service_name: Name of the service to remove
+            
+        Raises:
+            ValueError: If service not found
+        """
+        with self.transaction() as transaction:
+            transaction.remove(service_name)
+        logger.info(f"Removed service: {service_name}")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def _import(self, services: List[Dict]) -> None:
+        """Import services from a JSON registry, skipping duplicate names."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO services (tag, name, name_key, path, depends_on) VALUES (?, ?, ?, ?, ?)",
+                [(s["tag"], s["name"], name_key(s["name"]), s.get("path"), _encode_depends_on(s.get("depends_on")))
+                 for s in services])
+        logger.info(f"Imported {len(services)} services into {self.file_path}")
+
+    @staticmethod
+    def _row_to_dict(row: Tuple) -> Dict:
+        record = {"tag": row[0], "name": row[1], "path": row[2]}
+        if row[3]:
+            record["depends_on"] = json.loads(row[3])
+        return record
+
+
+def make_repository(storage: str = 'json', file_path: str = 'data/services.json'):
+    """Create a service repository for the given storage backend.
+    
+    The SQLite database lives next to the JSON registry (services.db) and
+    imports it when first created.
+    
+    Args:
+        storage: Backend name ('json', 'journal' or 'sqlite')
+        file_path: Path of the JSON registry file
+        
+    Returns:
+        Repository instance
+        
+    Raises:
+        ValueError: For unknown backends
+    """
+    if storage == 'json':
+        return ServiceRepository(file_path)
+    if storage == 'journal':
+        return JournalServiceRepository(file_path)
+    if storage == 'sqlite':
+        return SqliteServiceRepository(os.path.splitext(file_path)[0] + '.db', import_path=file_path)
+    raise ValueError(f"Invalid storage backend: {storage}")
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+
+import asyncio
+import subprocess
+import os
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional, List, Callable, Dict, Sequence, Tuple
+
+# Callback receiving one line of command output
+OutputCallback = Callable[[str], None]
+
+logger = logging.getLogger(__name__)
+
+# Longest line passed to an output callback; longer lines are split
+MAX_LINE_BYTES = 64 * 1024
+
+
+def _decode_line(line: bytes) -> str:
+    """Decode an output line, keeping only the last redraw of progress lines."""
+    segments = [s for s in line.rstrip(b"\r\n").split(b"\r") if s]
+    return segments[-1].decode(errors="replace") if segments else ""
+
+
+def run_command(command: List[str],
+                cwd: Optional[str] = None,
+                on_output: Optional[OutputCallback] = None,
+                timeout: Optional[float] = None) -> None:
+    """Run a command, passing its combined stdout/stderr on line by line.
+    
+    Stderr is merged into stdout, so a single pipe is drained and the child
+    can never block on a full pipe.
+    
+    Args:
+        command: Command to execute
+        cwd: Working directory of the command (optional)
+        on_output: Callback receiving each line of output; output is
+            inherited from the terminal when omitted
+        timeout: Seconds to wait before killing the command (optional)
+            
+    Raises:
+        subprocess.CalledProcessError: If command exits with a non-zero code
+        subprocess.TimeoutExpired: If command does not finish in time
+    """
+    if on_output is None:
+        subprocess.run(command, check=True, cwd=cwd, timeout=timeout)
+        return
+    expired = threading.Event()
+    with subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT) as process:
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, lambda: (expired.set(), process.kill()))
+            timer.start()
+        try:
+            for line in iter(lambda: process.stdout.readline(MAX_LINE_BYTES), b""):
+                on_output(_decode_line(line))
+        finally:
+            if timer is not None:
+                timer.cancel()
+    if expired.is_set():
+        raise subprocess.TimeoutExpired(command, timeout)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+
+
+async def run_command_async(command: List[str],
+                            cwd: Optional[str] = None,
+                            timeout: Optional[float] = None,
+                            on_output: Optional[OutputCallback] = None) -> None:
+    """Run a command on the event loop without blocking it.
+    
+    The child is killed if the timeout expires or the awaiting task is cancelled.
+    
+    Args:
+        command: Command to execute
+        cwd: Working directory of the command (optional)
+        timeout: Seconds to wait before killing the command (optional)
+        on_output: Callback receiving each line of combined stdout/stderr;
+            output is inherited from the terminal when omitted
+            
+    Raises:
+        subprocess.CalledProcessError: If command exits with a non-zero code
+        subprocess.TimeoutExpired: If command does not finish in time
+    """
+    pipe = asyncio.subprocess.PIPE if on_output else None
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        cwd=cwd,
+        stdout=pipe,
+        stderr=asyncio.subprocess.STDOUT if on_output else None,
+    )
+
+    async def communicate() -> None:
+        if on_output:
+            async for line in process.stdout:
+                on_output(_decode_line(line))
+        await process.wait()
+
+    try:
+        await asyncio.wait_for(communicate(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise subprocess.TimeoutExpired(command, timeout)
+        raise
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+
+
+class ServiceStrategy(ABC):
+    """Abstract base class for service operation strategies."""
+    
+    @abstractmethod
+    def generate_command(self, operation: int, service_name: str, path: Optional[str] = None) -> List[str]:
+        """Generate command for service operation.
+        
+        Args:
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            service_name: Name of the service
+            path: Service path (for docker)
+            
+        Returns:
+            Command list for subprocess
+        """
+        pass
+    
+    @abstractmethod
+    def execute(self, command: List[str], on_output: Optional[OutputCallback] = None) -> None:
+        """Execute the service command.
+        
+        Args:
+            command: Command to execute
+            on_output: Callback receiving each line of output; output is
+                inherited from the terminal when omitted
+            
+        Raises:
+            subprocess.CalledProcessError: If command fails
+        """
+        pass
+
+    async def execute_async(self,
+                            command: List[str],
+                            timeout: Optional[float] = None,
+                            on_output: Optional[OutputCallback] = None) -> None:
+        """Execute the service command without blocking the event loop.
+        
+        Args:
+            command: Command to execute
+            timeout: Seconds to wait before killing the command (optional)
+            on_output: Callback receiving each line of output (optional)
+            
+        Raises:
+            subprocess.CalledProcessError: If command fails
+            subprocess.TimeoutExpired: If command does not finish in time
+        """
+        await run_command_async(command, timeout=timeout, on_output=on_output)
+
+
+class SystemServiceStrategy(ServiceStrategy):
+    """Strategy for systemd services."""
+    
+    # Seconds a batch systemctl call may take; systemctl waits for every
+    # job, and systemd's default start and stop timeouts are 90 seconds
+    BATCH_TIMEOUT = 300.0
+
+    def __init__(self, path: Optional[str] = None):
+        pass
+    
+    ACTIONS = {0: "stop", 1: "restart", 2: "start", 3: "reload"}
+
+    def generate_command(self, operation: int, service_name: str, path: Optional[str] = None) -> List[str]:
+        if operation not in self.ACTIONS:
+            raise ValueError(f"Invalid operation for system service: {operation}")
+        return ["sudo", "systemctl", self.ACTIONS[operation], service_name]
+    
+    def execute(self, command: List[str], on_output: Optional[OutputCallback] = None) -> None:
+        run_command(command, on_output=on_output)
+
+    def generate_batch_command(self, operation: int, service_names: Sequence[str]) -> List[str]:
+        """Generate one systemctl command operating on several units.
+        
+        Args:
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            service_names: Names of the units
+            
+        Returns:
+            Command list for subprocess
+        """
+        if not service_names:
+            raise ValueError("Batch command requires at least one service")
+        return self.generate_command(operation, service_names[0])[:-1] + list(service_names)
+
+    def show_units(self, service_names: Sequence[str], properties: Sequence[str]) -> List[Dict[str, str]]:
+        """Query unit properties with a single ``systemctl show`` call.
+        
+        Args:
+            service_names: Names of the units
+            properties: Properties to fetch, such as 'ActiveState'
+            
+        Returns:
+            One property dictionary per unit, in the order given
+            
+        Raises:
+            subprocess.CalledProcessError: If systemctl fails
+            ValueError: If the output does not match the requested units
+        """
+        output = subprocess.run(
+            ["systemctl", "show", "-p", ",".join(properties), "--", *service_names],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        units = []
+        for block in output.strip().split("\n\n"):
+            unit = {}
+            for line in block.splitlines():
+                key, sep, value = line.partition("=")
+                if sep:
+                    unit[key] = value
+            units.append(unit)
+        if len(units) != len(service_names):
+            raise ValueError(f"Expected {len(service_names)} units from systemctl show, got {len(units)}")
+        return units
+
+    def execute_batch(self,
+                      operation: int,
+                      service_names: Sequence[str],
+                      on_output: Optional[OutputCallback] = None) -> Dict[str, Tuple[Optional[int], Optional[str]]]:
+        """Operate on several units with one systemctl call.
+        
+        When the call fails, each unit's state is read back with
+        ``systemctl show`` to tell which of them actually failed. If the
+        call cannot be run or exceeds BATCH_TIMEOUT, every unit fails.
+        
+        Args:
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            service_names: Names of the units
+            on_output: Callback receiving each line of output (optional)
+            
+        Returns:
+            Mapping of unit name to (returncode or None if the command did
+            not finish, error message or None)
+        """
+        command = self.generate_batch_command(operation, service_names)
+        logger.info(f"Executing: {' '.join(command)}")
+        try:
+            run_command(command, on_output=on_output, timeout=self.BATCH_TIMEOUT)
+            return {name: (0, None) for name in service_names}
+        except subprocess.CalledProcessError as e:
+            returncode = e.returncode
+        except (subprocess.TimeoutExpired, OSError) as e:
+            return {name: (None, str(e)) for name in service_names}
+
+        batch_error = f"Command '{' '.join(command)}' returned non-zero exit status {returncode}."
+        try:
+            units = self.show_units(service_names, ("LoadState", "ActiveState", "SubState", "Result"))
+        except (subprocess.CalledProcessError, ValueError, OSError) as e:
+            logger.error(f"Cannot attribute batch failure to units: {str(e)}")
+            return {name: (returncode, batch_error) for name in service_names}
+
+        expected = ("inactive", "failed") if operation == 0 else ("active", "activating", "reloading")
+        outcome = {}
+        for name, unit in zip(service_names, units):
+            state = unit.get("ActiveState", "unknown")
+            if unit.get("LoadState") == "not-found":
+                outcome[name] = (returncode, f"Unit {name} not found")
+            elif state not in expected:
+                outcome[name] = (returncode, f"Unit {name} is {state} ({unit.get('SubState', 'unknown')}, "
+                                             f"result: {unit.get('Result', 'unknown')})")
+            else:
+                outcome[name] = (0, None)
+        return outcome
+
+
+class TransportError(subprocess.CalledProcessError):
+    """An operation carried out through a native API rather than a command failed.
+    
+    Subclasses CalledProcessError, with the exit code the CLI would
+    report, so callers handle every transport alike.
+    """
+
+    def __init__(self, command: List[str], message: str):
+        super().__init__(1, command)
+        self.message = message
+
+    def __str__(self) -> str:
+        return self.message
+
+
+class JobFailedError(TransportError):
+    """A systemd job run over D-Bus failed."""
+
+
+class SystemdDBusStrategy(ServiceStrategy):
+    """Strategy for systemd services talking to systemd over D-Bus.
+    
+    Instead of spawning ``sudo systemctl`` per operation, jobs are started
+    with StartUnit/StopUnit/RestartUnit calls on one persistent connection
+    and their completion is awaited through JobRemoved signals. A single
+    instance is meant to be shared by all systemd services; the connection
+    is opened on first use and reopened if it is lost. The caller needs
+    permission to manage units (root or a polkit rule).
+    """
+
+    METHODS = {0: 'StopUnit', 1: 'RestartUnit', 2: 'StartUnit', 3: 'ReloadUnit'}
+
+    def __init__(self, path: Optional[str] = None, address: Optional[str] = None, timeout: Optional[float] = None):
+        """Initialize the strategy.
+        
+        Args:
+            path: Unused, accepted for interface compatibility
+            address: D-Bus address of the system bus (optional)
+            timeout: Seconds to wait for jobs to finish (optional)
+        """
+        self.address = address
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+
+    def generate_command(self, operation: int, service_name: str, path: Optional[str] = None) -> List[str]:
+        if operation not in self.METHODS:
+            raise ValueError(f"Invalid operation for system service: {operation}")
+        from src.dbus import unit_name
+        return [self.METHODS[operation], unit_name(service_name)]
+
+    def execute(self, command: List[str], on_output: Optional[OutputCallback] = None) -> None:
+        self._run(command, self.timeout)
+
+    async def execute_async(self,
+                            command: List[str],
+                            timeout: Optional[float] = None,
+                            on_output: Optional[OutputCallback] = None) -> None:
+        await asyncio.to_thread(self._run, command, timeout if timeout is not None else self.timeout)
+        if on_output:
+            on_output(f"{' '.join(command)}: done")
+
+    def execute_batch(self,
+                      operation: int,
+                      service_names: Sequence[str],
+                      on_output: Optional[OutputCallback] = None) -> Dict[str, Tuple[int, Optional[str]]]:
+        """Start jobs for several units at once and wait for all of them.
+        
+        Args:
+            operation: 0=stop, 1=restart, 2=start, 3=reload
+            service_names: Names of the units
+            on_output: Unused; jobs print no output
+            
+        Returns:
+            Mapping of unit name to (returncode, error message or None)
+        """
+        jobs = [tuple(self.generate_command(operation, name)) for name in service_names]
+        logger.info(f"Starting {len(jobs)} systemd jobs over D-Bus: {', '.join(unit for _, unit in jobs)}")
+        errors = self._run_jobs([jobs[0][0]] + [unit for _, unit in jobs], jobs, self.timeout)
+        return {name: (0, None) if error is None else (1, error) for name, error in zip(service_names, errors)}
+
+    def client(self) -> 'SystemdClient':
+        """Return the systemd client, connecting on first use."""
+        from src.dbus import DBusConnection, SystemdClient
+        with self._lock:
+            if self._client is None or self._client.connection.closed:
+                self._client = None
+                connection = DBusConnection(self.address)
+                try:
+                    self._client = SystemdClient(connection)
+                except Exception:
+                    connection.close()
+                    raise
+            return self._client
+
+    def close(self) -> None:
+        """Close the D-Bus connection."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            try:
+                client.connection.close()
+            except OSError as e:
+                logger.debug(f"Error closing the D-Bus connection: {str(e)}")
+
+    def _run(self, command: List[str], timeout: Optional[float]) -> None:
+        error = self._run_jobs(command, [tuple(command)], timeout)[0]
+        if error is not None:
+            raise JobFailedError(command, error)
+
+    def _run_jobs(self,
+                  command: List[str],
+                  jobs: Sequence[Tuple[str, str]],
+                  timeout: Optional[float]) -> List[Optional[str]]:
+        """Run jobs, dropping the connection and raising TransportError if the bus fails."""
+        from src.dbus import DBusError
+        try:
+            return self.client().run_jobs(jobs, timeout)
+        except TimeoutError:
+            raise subprocess.TimeoutExpired(command, timeout)
+        except (OSError, ConnectionError, DBusError) as e:
+            self.close()
+            raise TransportError(command, f"Cannot run systemd jobs over D-Bus: {str(e)}")
+
+
+class DockerServiceStrategy(ServiceStrategy):
+    """Strategy for docker-compose services."""
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    def generate_command(self, operation: int, service_name: str, path: Optional[str] = None) -> List[str]:
+        if not self.path:
+            raise ValueError("Docker service requires a path")
+        
+        expanded_path = os.path.expanduser(self.path)
+        if not os.path.exists(expanded_path):
+            raise FileNotFoundError(f"Docker path not found: {expanded_path}")
+        if not os.path.isdir(expanded_path):
+            raise NotADirectoryError(f"Docker path must be a directory: {expanded_path}")
+        
+        if operation == 0:
+            return ["docker", "compose", "down"]
+        elif operation in (1, 2):
+            return ["docker", "compose", "up", "-d"]
+        elif operation == 3:
+            # Restart the containers in place, keeping them
+            return ["docker", "compose", "restart"]
+        raise ValueError(f"Invalid operation for docker service: {operation}")
+    
+    def execute(self, command: List[str], on_output: Optional[OutputCallback] = None) -> None:
+        run_command(command, cwd=self._working_dir(), on_output=on_output)
+
+    async def execute_async(self,
+                            command: List[str],
+                            timeout: Optional[float] = None,
+                            on_output: Optional[OutputCallback] = None) -> None:
+        await run_command_async(command, cwd=self._working_dir(), timeout=timeout, on_output=on_output)
+
+    def _working_dir(self) -> str:
+        """Return the validated, expanded compose directory."""
+        expanded_path = os.path.expanduser(self.path)
+        if not os.path.exists(expanded_path):
+            raise FileNotFoundError(f"Path not found: {expanded_path}")
+        if not os.path.isdir(expanded_path):
+            raise NotADirectoryError(f"Docker path must be directory: {expanded_path}")
+        return expanded_path
+
+
+class DockerEngineStrategy(ServiceStrategy):
+    """Strategy for docker-compose services using the Docker Engine API.
+    
+    Operates on the containers labelled with the compose project instead of
+    running the compose CLI. The API cannot create containers, so starting
+    or restarting a project without any containers falls back to
+    ``docker compose up -d``.
+    """
+
+    ACTIONS = {0: "stop", 1: "restart", 2: "start", 3: "restart"}
+
+    def __init__(self, path: str, client: Optional['DockerClient'] = None):
+        """Initialize the strategy.
+        
+        Args:
+            path: Compose project directory
+            client: Docker Engine API client, shared to reuse its connections (optional)
+        """
+        from src.docker_api import DockerClient
+        self.path = path
+        self.client = client or DockerClient()
+        self._cli = DockerServiceStrategy(path)
+
+    def generate_command(self, operation: int, service_name: str, path: Optional[str] = None) -> List[str]:
+        from src.docker_api import project_name
+        self._cli.generate_command(operation, service_name)
+        return ["docker-api", self.ACTIONS[operation], project_name(os.path.expanduser(self.path))]
+
+    def execute(self, command: List[str], on_output: Optional[OutputCallback] = None) -> None:
+        from src.docker_api import DockerAPIError
+        _, action, project = command
+        try:
+            containers = self.client.containers(project)
+            if action == "stop":
+                for container in containers:
+                    if container.get("State") == "running":
+                        self.client.stop_container(container["Id"])
+            elif containers and action == "start":
+                for container in containers:
+                    if container.get("State") != "running":
+                        self.client.start_container(container["Id"])
+            elif containers:
+                for container in containers:
+                    self.client.restart_container(container["Id"])
+            else:
+                logger.info(f"No containers for compose project {project}, falling back to the compose CLI")
+                self._cli.execute(self._cli.generate_command(1, project), on_output)
+        except DockerAPIError as e:
+            raise TransportError(command, f"Docker API error for project {project}: {str(e)}")
+        except (ConnectionError, PermissionError) as e:
+            raise TransportError(command, f"Cannot reach Docker Engine at {self.client.socket_path}: {str(e)}")
+
+    async def execute_async(self,
+                            command: List[str],
+                            timeout: Optional[float] = None,
+                            on_output: Optional[OutputCallback] = None) -> None:
+        try:
+            await asyncio.wait_for(asyncio.to_thread(self.execute, command), timeout)
+        except asyncio.TimeoutError:
+            raise subprocess.TimeoutExpired(command, timeout)
+        if on_output:
+            on_output(f"{' '.join(command)}: done")
+
+    def status(self) -> List[Dict[str, str]]:
+        """Return the name, state and status of the project's containers."""
+        from src.docker_api import project_name
+        containers = self.client.containers(project_name(os.path.expanduser(self.path)))
+        return [{"name": (c.get("Names") or ["?"])[0].lstrip("/"),
+                 "state": c.get("State", "unknown"),
+                 "status": c.get("Status", "")} for c in containers]
@@ -0,0 +1,207 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from src.client import DaemonClient, DaemonError
+from src.daemon import ManagerDaemon, METHOD_NOT_FOUND, INVALID_PARAMS
+from src.manager import Manager
+from src.services import OperationResult
+from src.status import ServiceStatus
+from src.storage import ServiceRepository
+import os
+import socket
+import tempfile
+import threading
+import time
+
+
+class TestManagerDaemon(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.temp_dir.name, "manager.sock")
+        self.manager = Manager(ServiceRepository(os.path.join(self.temp_dir.name, "services.json")))
+        self.daemon = ManagerDaemon(self.manager, self.socket_path, {"storage": "json", "transport": "cli"})
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+        for _ in range(100):
+            if os.path.exists(self.socket_path):
+                break
+            time.sleep(0.01)
+        self.client = DaemonClient.connect(self.socket_path, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.daemon.shutdown()
+        self.thread.join(timeout=5)
+        self.temp_dir.cleanup()
+
+    def test_register_list_remove(self):
+        """测试通过套接字注册、列出和移除服务"""
+        self.client.call("register", tag="sys", name="nginx")
+        self.client.call("register", tag="sys", name="redis")
+        self.assertEqual([s["name"] for s in self.client.call("list")], ["nginx", "redis"])
+        self.assertEqual(self.client.call("remove", selectors=["red*"]), ["redis"])
+        self.assertEqual([s["name"] for s in self.client.call("list")], ["nginx"])
+
+    def test_operate(self):
+        """测试通过套接字执行操作"""
+        self.client.call("register", tag="sys", name="nginx")
+        with patch.object(self.manager, "execute_bulk_operation",
+                          return_value=[OperationResult("nginx", "sys", 1)]) as mock_bulk:
+            results = self.client.call("operate", operation=1, selectors=["nginx"], max_parallel=2)
+        self.assertEqual(results[0]["name"], "nginx")
+        self.assertEqual(results[0]["returncode"], 0)
+        services, operation, max_parallel = mock_bulk.call_args.args
+        self.assertEqual([s.name for s in services], ["nginx"])
+        self.assertEqual((operation, max_parallel), (1, 2))
+
+    def test_operate_by_action_name(self):
+        """测试按操作名称执行"""
+        self.client.call("register", tag="sys", name="nginx")
+        with patch.object(self.manager, "execute_bulk_operation",
+                          return_value=[OperationResult("nginx", "sys", 3)]) as mock_bulk:
+            self.client.call("operate", operation="reload", selectors=["nginx"])
+        self.assertEqual(mock_bulk.call_args.args[1], 3)
+        with self.assertRaises(DaemonError) as ctx:
+            self.client.call("operate", operation="kill", selectors=["nginx"])
+        self.assertEqual(ctx.exception.error_type, "ValueError")
+
+    def test_operate_if_changed(self):
+        """测试只操作配置变化的服务"""
+        self.client.call("register", tag="sys", name="nginx")
+        with patch.object(self.manager, "changed_services", return_value=[]) as mock_changed, \
+                patch.object(self.manager, "execute_bulk_operation", return_value=[]) as mock_bulk, \
+                patch.object(self.manager, "record_fingerprints") as mock_record:
+            self.assertEqual(self.client.call("operate", operation="restart", selectors=["nginx"],
+                                              if_changed=True), [])
+        self.assertEqual([s.name for s in mock_changed.call_args.args[0]], ["nginx"])
+        self.assertEqual(mock_bulk.call_args.args[0], [])
+        self.assertEqual(mock_record.call_args.args[:2], ([], []))
+        with self.assertRaises(DaemonError):
+            self.client.call("operate", operation="stop", selectors=["nginx"], if_changed=True)
+
+    def test_operate_health_check_requires_rolling(self):
+        """测试未指定滚动操作时拒绝健康检查"""
+        self.client.call("register", tag="sys", name="nginx")
+        with patch.object(self.manager, "execute_bulk_operation") as mock_bulk:
+            with self.assertRaises(DaemonError) as ctx:
+                self.client.call("operate", operation="restart", selectors=["nginx"],
+                                 health_url="http://127.0.0.1:1/health")
+        self.assertEqual(ctx.exception.error_type, "ValueError")
+        mock_bulk.assert_not_called()
+
+    def test_mismatched_settings(self):
+        """测试检测与守护进程不同的设置"""
+        self.assertEqual(self.client.mismatched_settings({"storage": "json", "transport": "cli"}), [])
+        self.assertEqual(self.client.mismatched_settings({"storage": "sqlite", "transport": "cli"}), ["storage"])
+
+    def test_errors(self):
+        """测试错误响应"""
+        with self.assertRaises(DaemonError) as ctx:
+            self.client.call("remove", selectors=["missing"])
+        self.assertEqual(ctx.exception.error_type, "ValueError")
+        with self.assertRaises(DaemonError):
+            self.client.call("unknown")
+        self.assertEqual(self.daemon.handle_request({"id": 1, "method": "unknown"})["error"]["code"],
+                         METHOD_NOT_FOUND)
+        self.assertEqual(self.daemon.handle_request({"id": 1, "method": "list", "params": {"x": 1}})["error"]["code"],
+                         INVALID_PARAMS)
+
+    def test_status(self):
+        """测试守护进程状态"""
+        status = self.client.call("status")["daemon"]
+        self.assertEqual(status["pid"], os.getpid())
+        self.assertFalse(status["busy"])
+        self.assertNotIn("services", self.client.call("status"))
+
+    def test_service_status(self):
+        """测试通过守护进程查询服务状态"""
+        self.client.call("register", tag="sys", name="nginx")
+        with patch.object(self.manager, "status",
+                          return_value=[ServiceStatus("nginx", "sys", "active", "running", 42)]) as mock_status:
+            result = self.client.call("status", services=True, refresh=True)
+        self.assertEqual(result["services"][0]["state"], "active")
+        services, refresh = mock_status.call_args.args
+        self.assertEqual([s.name for s in services], ["nginx"])
+        self.assertTrue(refresh)
+
+    def test_worker_serializes_jobs(self):
+        """测试工作队列串行执行修改操作"""
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def job():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+
+        threads = [threading.Thread(target=self.daemon._submit, args=(job,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak, 1)
+
+    def test_refuses_second_daemon(self):
+        """测试拒绝在同一套接字上启动第二个守护进程"""
+        with self.assertRaises(RuntimeError):
+            ManagerDaemon(self.manager, self.socket_path).start()
+
+
+class TestDaemonClient(unittest.TestCase):
+    def test_connect_without_daemon(self):
+        """测试没有守护进程时返回 None"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertIsNone(DaemonClient.connect(os.path.join(temp_dir, "missing.sock")))
+
+    def test_stale_socket_removed(self):
+        """测试清理残留的套接字文件"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            socket_path = os.path.join(temp_dir, "manager.sock")
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(socket_path)
+            stale.close()
+            self.assertIsNone(DaemonClient.connect(socket_path))
+            daemon = ManagerDaemon(MagicMock(), socket_path)
+            daemon.start()
+            daemon._cleanup()
+            self.assertFalse(os.path.exists(socket_path))
+
+
+class TestDaemonCli(unittest.TestCase):
+    def test_daemon_lost_during_settings_check(self):
+        """测试检查设置时守护进程断开连接的报错"""
+        import subprocess
+        import sys
+        main = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            socket_path = os.path.join(temp_dir, "manager.sock")
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(socket_path)
+            server.listen()
+
+            def accept_and_close():
+                # 接受连接后立即关闭，模拟刚退出的守护进程
+                while True:
+                    try:
+                        conn, _ = server.accept()
+                    except OSError:
+                        return
+                    conn.close()
+
+            threading.Thread(target=accept_and_close, daemon=True).start()
+            try:
+                result = subprocess.run([sys.executable, main, "--socket", socket_path, "list"], cwd=temp_dir,
+                                        capture_output=True, text=True, timeout=60)
+            finally:
+                server.close()
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("daemon unavailable", result.stdout)
+        self.assertNotIn("Traceback", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
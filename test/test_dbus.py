@@ -0,0 +1,221 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from jeepney import DBusAddress, HeaderFields, new_error, new_method_return, new_signal
+from jeepney.low_level import Parser
+from src.dbus import DBusConnection, DBusError, SystemdClient, unit_name, SYSTEMD_MANAGER, SYSTEMD_PATH
+from src.manager import Manager
+from src.services import Service
+from src.strategies import SystemdDBusStrategy, JobFailedError, TransportError
+import os
+import socket
+import tempfile
+import threading
+
+
+class FakeSystemdBus:
+    """Stand-in system bus answering like systemd.
+
+    Units named 'broken*' finish with result 'failed', 'missing*' units
+    return NoSuchUnit and calls to 'Hang' are never answered; JobRemoved
+    signals are sent in reverse order once ``batch`` jobs have been queued.
+    """
+
+    def __init__(self, socket_path, batch=1):
+        self.socket_path = socket_path
+        self.batch = batch
+        self.calls = []
+        self.connections = 0
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(socket_path)
+        self._server.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.close()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        reader = conn.makefile('rb')
+        assert reader.read(1) == b'\0'
+        assert reader.readline().startswith(b'AUTH EXTERNAL ')
+        conn.sendall(b'OK 0123456789abcdef\r\n')
+        assert reader.readline() == b'BEGIN\r\n'
+        manager = DBusAddress(SYSTEMD_PATH, interface=SYSTEMD_MANAGER)
+        parser = Parser()
+        serial = 1000
+        pending = []
+        try:
+            while True:
+                data = reader.read1(4096)
+                if not data:
+                    return
+                parser.add_data(data)
+                while (call := parser.get_next_message()) is not None:
+                    member = call.header.fields[HeaderFields.member]
+                    self.calls.append((member, call.body))
+                    if member == 'Hang':
+                        continue
+                    if member == 'Hello':
+                        reply = new_method_return(call, 's', (':1.42',))
+                    elif member.endswith('Unit') and call.body[0].startswith('missing'):
+                        reply = new_error(call, 'org.freedesktop.systemd1.NoSuchUnit', 's',
+                                          (f"Unit {call.body[0]} not found.",))
+                    elif member.endswith('Unit'):
+                        job = f"/org/freedesktop/systemd1/job/{serial}"
+                        pending.append((serial, job, call.body[0]))
+                        reply = new_method_return(call, 'o', (job,))
+                    else:
+                        reply = new_method_return(call)
+                    serial += 1
+                    conn.sendall(reply.serialise(serial))
+                    if len(pending) >= self.batch:
+                        for job_id, job, unit in reversed(pending):
+                            serial += 1
+                            signal = new_signal(manager, 'JobRemoved', 'uoss',
+                                                (job_id, job, unit, 'failed' if unit.startswith('broken') else 'done'))
+                            conn.sendall(signal.serialise(serial))
+                        pending = []
+        finally:
+            reader.close()
+            conn.close()
+
+
+class TestUnitName(unittest.TestCase):
+    def test_unit_name(self):
+        """测试补全单元名称"""
+        self.assertEqual(unit_name('nginx'), 'nginx.service')
+        self.assertEqual(unit_name('backup.timer'), 'backup.timer')
+
+
+class TestSystemdClient(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.address = f"unix:path={os.path.join(self.temp_dir.name, 'bus')}"
+
+    def tearDown(self):
+        self.bus.close()
+        self.temp_dir.cleanup()
+
+    def _start_bus(self, batch=1):
+        self.bus = FakeSystemdBus(self.address[len('unix:path='):], batch)
+
+    def test_connect_and_subscribe(self):
+        """测试连接、认证并订阅任务信号"""
+        self._start_bus()
+        connection = DBusConnection(self.address)
+        SystemdClient(connection)
+        self.assertEqual(connection.unique_name, ':1.42')
+        self.assertEqual([member for member, _ in self.bus.calls], ['Hello', 'AddMatch', 'Subscribe'])
+        connection.close()
+
+    def test_run_jobs_concurrently(self):
+        """测试同时等待多个任务完成"""
+        self._start_bus(batch=3)
+        client = SystemdClient(DBusConnection(self.address))
+        errors = client.run_jobs([('RestartUnit', 'nginx.service'), ('RestartUnit', 'broken.service'),
+                                  ('StopUnit', 'redis.service')], timeout=5)
+        self.assertIsNone(errors[0])
+        self.assertIn("failed", errors[1])
+        self.assertIsNone(errors[2])
+        self.assertIn(('StopUnit', ('redis.service', 'replace')), self.bus.calls)
+        client.connection.close()
+
+    def test_error_reply(self):
+        """测试方法调用返回错误"""
+        self._start_bus()
+        client = SystemdClient(DBusConnection(self.address))
+        errors = client.run_jobs([('StopUnit', 'missing.service')], timeout=5)
+        self.assertIn("not found", errors[0])
+        with self.assertRaises(DBusError):
+            client.connection.call('org.freedesktop.systemd1', SYSTEMD_PATH, SYSTEMD_MANAGER,
+                                   'StopUnit', 'ss', 'missing.service', 'replace', timeout=5)
+        client.connection.close()
+
+    def test_call_timeout_drops_pending_reply(self):
+        """测试调用超时后不保留等待中的回复，连接仍可使用"""
+        self._start_bus()
+        connection = DBusConnection(self.address)
+        with self.assertRaises(TimeoutError):
+            connection.call('org.example', '/org/example', 'org.example.Iface', 'Hang', timeout=0.1)
+        self.assertEqual(connection._router._replies._futures, {})
+        self.assertEqual(connection.call('org.example', '/org/example', 'org.example.Iface', 'Ping', timeout=5), ())
+        self.assertFalse(connection.closed)
+        connection.close()
+        self.assertTrue(connection.closed)
+
+    def test_threads_share_connection(self):
+        """测试多个线程共用一个连接等待任务"""
+        self._start_bus(batch=4)
+        client = SystemdClient(DBusConnection(self.address))
+        results = {}
+
+        def run(unit):
+            results[unit] = client.run_jobs([('RestartUnit', unit)], timeout=5)[0]
+
+        threads = [threading.Thread(target=run, args=(f"web-{i}.service",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        self.assertEqual(results, {f"web-{i}.service": None for i in range(4)})
+        client.connection.close()
+
+    def test_strategy(self):
+        """测试 D-Bus 策略执行和批量执行"""
+        self._start_bus()
+        strategy = SystemdDBusStrategy(address=self.address, timeout=5)
+        command = strategy.generate_command(1, "nginx")
+        self.assertEqual(command, ["RestartUnit", "nginx.service"])
+        strategy.execute(command)
+        with self.assertRaises(JobFailedError) as context:
+            strategy.execute(strategy.generate_command(0, "broken"))
+        self.assertEqual(context.exception.returncode, 1)
+        with self.assertRaises(ValueError):
+            strategy.generate_command(9, "nginx")
+        self.assertEqual(self.bus.connections, 1)
+        strategy.close()
+
+    def test_bus_refuses_connection(self):
+        """测试总线拒绝连接时操作失败而不是抛出异常"""
+        self.bus = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # 绑定但不监听，连接会被拒绝
+        self.bus.bind(self.address[len('unix:path='):])
+        strategy = SystemdDBusStrategy(address=self.address, timeout=5)
+        with self.assertRaises(TransportError) as context:
+            strategy.execute(strategy.generate_command(1, "nginx"))
+        self.assertIn("Cannot run systemd jobs", str(context.exception))
+        self.assertIsNone(strategy._client)
+        result = Service("sys", "nginx", strategy=strategy).run_operation(1)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.returncode, 1)
+
+    def test_manager_native_transport(self):
+        """测试管理器使用原生传输批量操作"""
+        self._start_bus(batch=2)
+        repository = MagicMock()
+        repository.load_all.return_value = [{"tag": "sys", "name": "nginx"}, {"tag": "sys", "name": "broken"}]
+        with patch.dict(os.environ, {"DBUS_SYSTEM_BUS_ADDRESS": self.address}):
+            manager = Manager(repository, transport="native")
+            services = manager.list_services()
+            self.assertIs(services[0].strategy, services[1].strategy)
+
+            results = manager.execute_bulk_operation(services, 1)
+
+        self.assertTrue(results[0].ok)
+        self.assertFalse(results[1].ok)
+        self.assertEqual(results[1].returncode, 1)
+        self.assertEqual(self.bus.calls[-2:], [('RestartUnit', ('nginx.service', 'replace')),
+                                               ('RestartUnit', ('broken.service', 'replace'))])
+        services[0].strategy.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+from unittest.mock import patch
+from src.discovery import (DirectoryCache, compose_entries, find_compose_projects, list_systemd_units,
+                           stale_systemd_services, systemd_entries)
+import os
+import subprocess
+import tempfile
+
+
+class TestFindComposeProjects(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, "srv")
+        for project, file_name in (("a/web", "compose.yaml"), ("b/db", "docker-compose.yml"),
+                                   ("c/d/e/deep", "compose.yml"), (".hidden/h", "compose.yaml"),
+                                   ("a/web/nested", "compose.yaml")):
+            self.touch(os.path.join(project, file_name))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def touch(self, relative):
+        path = os.path.join(self.root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "w").close()
+
+    def project(self, relative):
+        return os.path.join(self.root, relative)
+
+    def test_find_projects(self):
+        """测试查找 compose 项目，跳过隐藏目录且不进入项目内部"""
+        self.assertEqual(find_compose_projects([self.root]), [self.project("a/web"), self.project("b/db")])
+
+    def test_max_depth(self):
+        """测试搜索深度"""
+        self.assertEqual(len(find_compose_projects([self.root], max_depth=4)), 3)
+        self.assertEqual(find_compose_projects([self.root], max_depth=0), [])
+        with self.assertRaises(ValueError):
+            find_compose_projects([self.root], max_depth=-1)
+
+    def test_cache_reused_until_mtime_changes(self):
+        """测试目录未变化时使用缓存，新增项目后只重新扫描变化的目录"""
+        cache = DirectoryCache(os.path.join(self.temp_dir.name, "cache.json"))
+        find_compose_projects([self.root], cache=cache)
+        cache.save()
+
+        cache = DirectoryCache(cache.file_path)
+        cache.load()
+        with patch("os.scandir", side_effect=AssertionError("scanned")):
+            self.assertEqual(len(find_compose_projects([self.root], cache=cache)), 2)
+
+        self.touch("b/cache/compose.yaml")
+        with patch("os.scandir", wraps=os.scandir) as mock_scandir:
+            projects = find_compose_projects([self.root], cache=cache)
+        self.assertIn(self.project("b/cache"), projects)
+        self.assertEqual([c.args[0] for c in mock_scandir.call_args_list],
+                         [self.project("b"), self.project("b/cache")])
+
+    def test_prune_keeps_other_roots(self):
+        """测试只清理本次搜索根目录下的缓存"""
+        cache = DirectoryCache(os.path.join(self.temp_dir.name, "cache.json"))
+        cache.put("/elsewhere", 1, False, [])
+        find_compose_projects([self.root], cache=cache)
+        self.assertIn("/elsewhere", cache.entries)
+        find_compose_projects([self.project("a")], max_depth=0, cache=cache)
+        self.assertNotIn(self.project("a/web"), cache.entries)
+        self.assertIn(self.project("b"), cache.entries)
+
+
+class TestComposeEntries(unittest.TestCase):
+    def test_skip_registered(self):
+        """测试跳过已注册的路径和名称"""
+        registered = [{"tag": "docker", "name": "web", "path": "/srv/a/web"},
+                      {"tag": "sys", "name": "DB"}]
+        entries = compose_entries(["/srv/a/web", "/srv/b/db", "/srv/c/cache", "/srv/d/cache"], registered)
+        self.assertEqual(entries, [{"tag": "docker", "name": "cache", "path": "/srv/c/cache", "depends_on": None}])
+
+
+class TestSystemdDiscovery(unittest.TestCase):
+    @patch("subprocess.run")
+    def test_list_units_json(self, mock_run):
+        """测试通过一次 JSON 调用列出服务单元"""
+        mock_run.return_value = subprocess.CompletedProcess(
+            [], 0, '[{"unit": "web-a.service", "load": "loaded"}, {"unit": "nginx.service", "load": "loaded"}, '
+                   '{"unit": "tmp.mount", "load": "loaded"}, {"unit": "gone.service", "load": "not-found"}]', "")
+        self.assertEqual(list_systemd_units(), ["nginx", "web-a"])
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertIn("--output=json", mock_run.call_args.args[0])
+
+    @patch("subprocess.run")
+    def test_list_units_plain_fallback(self, mock_run):
+        """测试不支持 JSON 输出时解析纯文本"""
+        mock_run.side_effect = [
+            subprocess.CompletedProcess([], 1, "", "Unknown output 'json'"),
+            subprocess.CompletedProcess([], 0, "\u25cf web-a.service loaded failed failed A\n"
+                                                "nginx.service loaded active running B\n"
+                                                "\u25cf gone.service not-found inactive dead gone.service\n", ""),
+        ]
+        self.assertEqual(list_systemd_units(), ["nginx", "web-a"])
+        self.assertIn("--plain", mock_run.call_args.args[0])
+
+    @patch("subprocess.run", side_effect=FileNotFoundError("systemctl"))
+    def test_list_units_without_systemctl(self, mock_run):
+        """测试 systemctl 不可用"""
+        with self.assertRaises(ValueError):
+            list_systemd_units()
+
+    def test_systemd_entries(self):
+        """测试按模式筛选并跳过已注册的单元"""
+        entries = systemd_entries(["nginx", "Web-a", "web-b"], [{"tag": "sys", "name": "web-a"}], ["web-*"])
+        self.assertEqual(entries, [{"tag": "sys", "name": "web-b", "path": None, "depends_on": None}])
+        self.assertEqual(len(systemd_entries(["nginx", "web-b"], [], ["*.service"])), 2)
+
+    @patch("src.strategies.SystemServiceStrategy.show_units")
+    def test_stale_services(self, mock_show):
+        """测试只移除已不存在的单元"""
+        mock_show.return_value = [{"LoadState": "not-found"}, {"LoadState": "loaded"}]
+        registered = [{"tag": "sys", "name": "web-old"}, {"tag": "sys", "name": "web-stopped"},
+                      {"tag": "sys", "name": "web-a"}, {"tag": "sys", "name": "db"},
+                      {"tag": "docker", "name": "web-x", "path": "/srv/web-x"}]
+        self.assertEqual(stale_systemd_services(["web-a"], registered, ["web-*"]), ["web-old"])
+        self.assertEqual(mock_show.call_args.args[0], ["web-old", "web-stopped"])
+
+
+if __name__ == "__main__":
+    unittest.main()
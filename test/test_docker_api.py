@@ -0,0 +1,144 @@
+import unittest
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler
+from src.docker_api import DockerClient, DockerAPIError, project_name
+from src.strategies import DockerEngineStrategy, TransportError
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeEngineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/containers/json":
+            return self._reply(404, {"message": "page not found"})
+        label = json.loads(parse_qs(url.query)["filters"][0])["label"][0]
+        project = label.split("=", 1)[1]
+        self._reply(200, [c for c in self.server.containers if c["Labels"]["com.docker.compose.project"] == project])
+
+    def do_POST(self):
+        self.server.actions.append(self.path)
+        container_id = self.path.split("/")[2]
+        if not any(c["Id"] == container_id for c in self.server.containers):
+            return self._reply(404, {"message": f"No such container: {container_id}"})
+        self._reply(204)
+
+    def _reply(self, status, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        return "docker.sock"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeEngine(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, containers):
+        super().__init__(socket_path, FakeEngineHandler)
+        self.containers = containers
+        self.actions = []
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+def container(container_id, project, state="running"):
+    return {"Id": container_id, "Names": [f"/{project}-{container_id}"], "State": state,
+            "Status": "Up 2 hours" if state == "running" else "Exited (0)",
+            "Labels": {"com.docker.compose.project": project}}
+
+
+class TestDockerClient(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.temp_dir.name, "docker.sock")
+        self.engine = FakeEngine(self.socket_path, [
+            container("a1", "homepage"), container("a2", "homepage", "exited"), container("b1", "blog"),
+        ])
+        threading.Thread(target=self.engine.serve_forever, daemon=True).start()
+        self.client = DockerClient(self.socket_path, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.engine.shutdown()
+        self.engine.server_close()
+        self.temp_dir.cleanup()
+
+    def test_project_name(self):
+        """测试计算 compose 项目名"""
+        self.assertEqual(project_name("/srv/My.Homepage/"), "myhomepage")
+
+    def test_connections_are_reused(self):
+        """测试连接池复用长连接"""
+        self.assertEqual([c["Id"] for c in self.client.containers("homepage")], ["a1", "a2"])
+        self.client.restart_container("b1")
+        self.client.containers("blog")
+        self.assertEqual(self.engine.connections, 1)
+        self.assertEqual(self.engine.actions, ["/containers/b1/restart"])
+
+    def test_error_response(self):
+        """测试错误响应"""
+        with self.assertRaises(DockerAPIError) as context:
+            self.client.stop_container("missing")
+        self.assertEqual(context.exception.status, 404)
+        self.assertIn("No such container", str(context.exception))
+
+    def test_strategy_stop_and_restart(self):
+        """测试通过 API 停止和重启项目容器"""
+        project_dir = os.path.join(self.temp_dir.name, "homepage")
+        os.mkdir(project_dir)
+        strategy = DockerEngineStrategy(project_dir, client=self.client)
+
+        command = strategy.generate_command(0, "homepage")
+        self.assertEqual(command, ["docker-api", "stop", "homepage"])
+        strategy.execute(command)
+        strategy.execute(strategy.generate_command(1, "homepage"))
+
+        self.assertEqual(self.engine.actions, ["/containers/a1/stop", "/containers/a1/restart",
+                                               "/containers/a2/restart"])
+        self.assertEqual(strategy.status()[0], {"name": "homepage-a1", "state": "running", "status": "Up 2 hours"})
+
+    @patch("subprocess.run")
+    def test_strategy_restart_without_containers(self, mock_run):
+        """测试项目没有容器时回退到 compose 命令"""
+        project_dir = os.path.join(self.temp_dir.name, "wiki")
+        os.mkdir(project_dir)
+        strategy = DockerEngineStrategy(project_dir, client=self.client)
+        strategy.execute(strategy.generate_command(1, "wiki"))
+        mock_run.assert_called_once_with(["docker", "compose", "up", "-d"], check=True, cwd=project_dir, timeout=None)
+        self.assertEqual(self.engine.actions, [])
+
+    def test_strategy_unreachable_engine(self):
+        """测试无法连接 Docker 时的错误"""
+        project_dir = os.path.join(self.temp_dir.name, "homepage")
+        os.mkdir(project_dir)
+        strategy = DockerEngineStrategy(project_dir, client=DockerClient(self.socket_path + ".missing"))
+        with self.assertRaises(FileNotFoundError):
+            strategy.execute(strategy.generate_command(0, "homepage"))
+        # Bound but not listening: connections are refused
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as closed:
+            closed.bind(self.socket_path + ".refused")
+            strategy = DockerEngineStrategy(project_dir, client=DockerClient(self.socket_path + ".refused"))
+            with self.assertRaises(TransportError):
+                strategy.execute(strategy.generate_command(0, "homepage"))
+
+
+if __name__ == '__main__':
+    unittest.main()
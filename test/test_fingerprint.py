@@ -0,0 +1,180 @@
+import unittest
+from unittest.mock import patch
+from src.fingerprint import FingerprintStore, compose_fingerprint, image_ids
+from src.manager import Manager
+from src.services import Service, OperationResult
+from src.storage import ServiceRepository
+import json
+import os
+import subprocess
+import tempfile
+
+
+def docker_run(images="nginx:1.25\n", ids="sha256:aaa\n"):
+    """模拟 docker compose config 与 docker image inspect 的输出"""
+    def run(command, **kwargs):
+        if command[:3] == ["docker", "compose", "config"]:
+            return subprocess.CompletedProcess(command, 0, images, "")
+        return subprocess.CompletedProcess(command, 0, ids, "")
+    return run
+
+
+class TestComposeFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = self.temp_dir.name
+        self.write("docker-compose.yml", "services:\n  web:\n    image: nginx:1.25\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, content):
+        with open(os.path.join(self.path, name), "w") as file:
+            file.write(content)
+
+    def fingerprint(self, **kwargs):
+        with patch("subprocess.run", side_effect=docker_run(**kwargs)):
+            return compose_fingerprint(self.path)
+
+    def test_stable(self):
+        """测试配置未变化时指纹相同"""
+        self.assertEqual(self.fingerprint(), self.fingerprint())
+
+    def test_compose_file_changed(self):
+        """测试 compose 文件变化时指纹变化"""
+        before = self.fingerprint()
+        self.write("docker-compose.yml", "services:\n  web:\n    image: nginx:1.26\n")
+        self.assertNotEqual(before, self.fingerprint())
+
+    def test_env_file_changed(self):
+        """测试 .env 文件变化时指纹变化"""
+        before = self.fingerprint()
+        self.write(".env", "PORT=8080\n")
+        self.assertNotEqual(before, self.fingerprint())
+
+    def test_image_changed(self):
+        """测试镜像更新后指纹变化"""
+        self.assertNotEqual(self.fingerprint(), self.fingerprint(ids="sha256:bbb\n"))
+
+    def test_no_compose_file(self):
+        """测试没有 compose 文件时无法计算指纹"""
+        os.remove(os.path.join(self.path, "docker-compose.yml"))
+        self.assertIsNone(self.fingerprint())
+
+    def test_docker_unavailable(self):
+        """测试 docker 不可用时无法计算指纹"""
+        with patch("subprocess.run", side_effect=FileNotFoundError("docker")):
+            self.assertIsNone(compose_fingerprint(self.path))
+
+    def test_image_ids_single_inspect(self):
+        """测试所有镜像通过一次 inspect 查询"""
+        with patch("subprocess.run",
+                   side_effect=docker_run(images="redis:7\nnginx:1.25\nredis:7\n")) as mock_run:
+            self.assertEqual(image_ids(self.path), ["nginx:1.25", "redis:7", "sha256:aaa"])
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertEqual(mock_run.call_args.args[0][-2:], ["nginx:1.25", "redis:7"])
+
+
+class TestFingerprintStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = FingerprintStore(os.path.join(self.temp_dir.name, "data", "fingerprints.json"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_update_and_forget(self):
+        """测试记录和删除指纹"""
+        self.assertIsNone(self.store.get("web"))
+        self.store.update({"Web": "abc", "db": "def"})
+        self.assertEqual(self.store.get("web"), "abc")
+        self.store.forget(["WEB"])
+        self.assertEqual(self.store.load(), {"db": "def"})
+
+    def test_corrupted_file(self):
+        """测试指纹文件损坏时视为空"""
+        os.makedirs(os.path.dirname(self.store.file_path))
+        with open(self.store.file_path, "w") as file:
+            file.write("{")
+        self.assertEqual(self.store.load(), {})
+
+
+class TestManagerFingerprints(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        data_dir = os.path.join(self.temp_dir.name, "data")
+        self.fingerprints = os.path.join(data_dir, "fingerprints.json")
+        self.manager = Manager(ServiceRepository(os.path.join(data_dir, "services.json")),
+                               fingerprints=self.fingerprints)
+        self.web = Service("docker", "web", self.temp_dir.name)
+        self.db = Service("docker", "db", self.temp_dir.name)
+        self.nginx = Service("sys", "nginx")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def recorded(self):
+        with open(self.fingerprints) as file:
+            return json.load(file)
+
+    @patch("src.fingerprint.compose_fingerprint", return_value="abc")
+    def test_register_does_not_fingerprint(self, mock_fingerprint):
+        """测试注册时不计算指纹，移除时删除已记录的指纹"""
+        self.manager.register_service("docker", "web", self.temp_dir.name)
+        self.manager.register_services([{"tag": "docker", "name": "db", "path": self.temp_dir.name}])
+        mock_fingerprint.assert_not_called()
+        self.assertFalse(os.path.exists(self.fingerprints))
+        self.assertEqual(self.manager.changed_services([self.web]), [self.web])
+        FingerprintStore(self.fingerprints).update({"web": "abc"})
+        self.manager.remove_services([self.manager.find_service("web")])
+        self.assertEqual(self.recorded(), {})
+
+    @patch("src.fingerprint.compose_fingerprint")
+    def test_changed_services(self, mock_fingerprint):
+        """测试只选择配置变化的 docker 服务"""
+        FingerprintStore(self.fingerprints).update({"web": "abc", "db": "old"})
+        mock_fingerprint.return_value = "abc"
+        changed = self.manager.changed_services([self.web, self.db, self.nginx])
+        self.assertEqual([s.name for s in changed], ["db", "nginx"])
+
+    @patch("src.fingerprint.compose_fingerprint", return_value=None)
+    def test_unknown_fingerprint_is_changed(self, mock_fingerprint):
+        """测试无法计算指纹时视为已变化"""
+        FingerprintStore(self.fingerprints).update({"web": "abc"})
+        self.assertEqual(self.manager.changed_services([self.web]), [self.web])
+
+    def test_changed_services_disabled(self):
+        """测试未启用指纹时报错"""
+        with self.assertRaises(ValueError):
+            Manager(self.manager.repository).changed_services([self.web])
+
+    @patch("src.fingerprint.compose_fingerprint", return_value="new")
+    def test_record_fingerprints(self, mock_fingerprint):
+        """测试启动成功后记录指纹"""
+        FingerprintStore(self.fingerprints).update({"db": "old"})
+        self.manager.record_fingerprints([self.web, self.db, self.nginx], [
+            OperationResult("web", "docker", 1, 0),
+            OperationResult("db", "docker", 1, 1, "failed"),
+            OperationResult("nginx", "sys", 1, 0),
+        ])
+        self.assertEqual(self.recorded(), {"web": "new", "db": "old"})
+
+    @patch("src.fingerprint.compose_fingerprint", return_value="new")
+    def test_operations_only_forget(self, mock_fingerprint):
+        """测试普通操作不计算指纹，停止后删除指纹"""
+        FingerprintStore(self.fingerprints).update({"web": "old", "db": "old"})
+        self.manager._operations_finished([self.web, self.db], [OperationResult("web", "docker", 1, 0),
+                                                                 OperationResult("db", "docker", 0, 0)])
+        mock_fingerprint.assert_not_called()
+        self.assertEqual(self.recorded(), {"web": "old"})
+
+    @patch("src.fingerprint.compose_fingerprint", return_value="new")
+    def test_reload_keeps_fingerprint(self, mock_fingerprint):
+        """测试重载不会应用新配置，因此不更新指纹"""
+        FingerprintStore(self.fingerprints).update({"web": "old"})
+        self.manager.record_fingerprints([self.web], [OperationResult("web", "docker", 3, 0)])
+        self.assertEqual(self.recorded(), {"web": "old"})
+
+
+if __name__ == "__main__":
+    unittest.main()
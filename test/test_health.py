@@ -0,0 +1,187 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from src.health import (Probe, StateProbe, CommandProbe, HttpProbe, TcpProbe, make_probes,
+                        wait_until_healthy)
+from src.manager import Manager
+from src.services import Service, OperationResult
+from src.status import ServiceStatus
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+
+
+class FakeProbe(Probe):
+    """Probe failing for the given service names."""
+
+    def __init__(self, unhealthy=()):
+        self.unhealthy = set(unhealthy)
+        self.checked = []
+
+    def check(self, service):
+        self.checked.append(service.name)
+        return "down" if service.name in self.unhealthy else None
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.path == "/health" else 503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestProbes(unittest.TestCase):
+    def test_command_probe(self):
+        """测试命令探针"""
+        service = Service("sys", "nginx")
+        self.assertIsNone(CommandProbe(f"{sys.executable} -c 'import sys; sys.exit(0)'").check(service))
+        self.assertIn("status 3", CommandProbe(f"{sys.executable} -c 'import sys; sys.exit(3)'").check(service))
+        self.assertIn("failed", CommandProbe("/nonexistent/{name}").check(service))
+
+    def test_http_probe(self):
+        """测试 HTTP 探针"""
+        server = HTTPServer(("127.0.0.1", 0), HealthHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base = f"http://127.0.0.1:{server.server_port}"
+        service = Service("sys", "nginx")
+        self.assertIsNone(HttpProbe(f"{base}/health").check(service))
+        self.assertIn("HTTP 503", HttpProbe(f"{base}/{{name}}").check(service))
+
+    def test_tcp_probe(self):
+        """测试 TCP 端口探针"""
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        port = listener.getsockname()[1]
+        service = Service("sys", "nginx")
+        self.assertIsNone(TcpProbe(f"127.0.0.1:{port}").check(service))
+        listener.close()
+        self.assertIsNotNone(TcpProbe(f"127.0.0.1:{port}", timeout=1).check(service))
+        with self.assertRaises(ValueError):
+            TcpProbe("localhost:http")
+
+    def test_state_probe(self):
+        """测试服务状态探针"""
+        status = MagicMock(return_value=[ServiceStatus("nginx", "sys", "failed", "exit-code")])
+        self.assertEqual(StateProbe(status).check(Service("sys", "nginx")), "state is failed (exit-code)")
+
+    def test_make_probes(self):
+        """测试根据选项创建探针"""
+        self.assertIsNone(make_probes())
+        probes = make_probes("true", "http://localhost/health", "8080")
+        self.assertEqual([type(p) for p in probes], [CommandProbe, HttpProbe, TcpProbe])
+        self.assertEqual((probes[2].host, probes[2].port), ("localhost", 8080))
+
+    @patch("src.health.time.sleep")
+    def test_wait_until_healthy(self, mock_sleep):
+        """测试等待服务恢复健康"""
+        probe = MagicMock()
+        probe.check.side_effect = ["starting", "starting", None]
+        self.assertIsNone(wait_until_healthy(Service("sys", "nginx"), [probe], timeout=10))
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(wait_until_healthy(Service("sys", "nginx"), [FakeProbe(["nginx"])], timeout=0), "down")
+
+
+class TestRollingOperation(unittest.TestCase):
+    def setUp(self):
+        self.services = [Service("sys", f"web-{i}") for i in range(5)]
+        self.manager = Manager(MagicMock())
+        self.waves = []
+
+        def bulk(wave, operation, max_parallel=4):
+            self.waves.append([s.name for s in wave])
+            return [OperationResult(s.name, s.tag, operation) for s in wave]
+
+        patcher = patch.object(self.manager, "execute_bulk_operation", side_effect=bulk)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_waves(self):
+        """测试按批次滚动重启并检查健康"""
+        probe = FakeProbe()
+        results = self.manager.execute_rolling_operation(self.services, 1, batch_size=2, probes=[probe])
+        self.assertEqual(self.waves, [["web-0", "web-1"], ["web-2", "web-3"], ["web-4"]])
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(sorted(probe.checked), [s.name for s in self.services])
+
+    def test_abort_on_unhealthy_wave(self):
+        """测试健康检查失败时中止"""
+        probe = FakeProbe(["web-2"])
+        results = self.manager.execute_rolling_operation(self.services, 1, batch_size=2, probes=[probe],
+                                                         health_timeout=0)
+        self.assertEqual(self.waves, [["web-0", "web-1"], ["web-2", "web-3"]])
+        self.assertEqual(results[2].error, "Health check failed: down")
+        self.assertTrue(results[3].ok)
+        self.assertEqual(results[4].error, "Skipped: rolling operation aborted")
+        self.assertEqual([r.name for r in results], [s.name for s in self.services])
+
+    def test_continue_policy(self):
+        """测试失败后继续滚动"""
+        probe = FakeProbe(["web-0"])
+        results = self.manager.execute_rolling_operation(self.services, 1, batch_size=2, probes=[probe],
+                                                         policy="continue", health_timeout=0)
+        self.assertEqual(len(self.waves), 3)
+        self.assertFalse(results[0].ok)
+        self.assertTrue(all(r.ok for r in results[1:]))
+
+    def test_stop_skips_health_checks(self):
+        """测试滚动停止不做健康检查"""
+        probe = FakeProbe(["web-0"])
+        results = self.manager.execute_rolling_operation(self.services, 0, batch_size=5, probes=[probe])
+        self.assertEqual(probe.checked, [])
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_invalid_arguments(self):
+        """测试无效参数"""
+        with self.assertRaises(ValueError):
+            self.manager.execute_rolling_operation(self.services, 1, batch_size=0)
+        with self.assertRaises(ValueError):
+            self.manager.execute_rolling_operation(self.services, 1, policy="retry")
+
+
+class TestRollingCli(unittest.TestCase):
+    def test_single_selector_runs_health_check(self):
+        """测试按单个名称滚动操作时仍执行健康检查"""
+        main = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 用替身 sudo 代替真实的 systemctl
+            bin_dir = os.path.join(temp_dir, "bin")
+            os.makedirs(bin_dir)
+            with open(os.path.join(bin_dir, "sudo"), "w") as file:
+                file.write("#!/bin/sh\nexit 0\n")
+            os.chmod(os.path.join(bin_dir, "sudo"), 0o755)
+            env = dict(os.environ, PATH=bin_dir + os.pathsep + os.environ.get("PATH", ""))
+            marker = os.path.join(temp_dir, "checked")
+
+            def run(*args):
+                return subprocess.run([sys.executable, main, "--no-daemon", *args], cwd=temp_dir, env=env,
+                                      capture_output=True, text=True, timeout=60)
+
+            run("register", "sys", "web-1")
+            result = run("operate", "web-1", "--action", "restart", "--rolling", "--health-timeout", "0",
+                         "--health-cmd", f"{sys.executable} -c \"open('{marker}', 'w'); raise SystemExit(1)\"")
+            self.assertTrue(os.path.exists(marker))
+            self.assertEqual(result.returncode, 1, result.stdout)
+
+    def test_health_check_requires_rolling(self):
+        """测试未指定 --rolling 时拒绝健康检查选项"""
+        main = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            result = subprocess.run([sys.executable, main, "--no-daemon", "operate", "nginx", "--action", "restart",
+                                     "--health-url", "http://127.0.0.1:1/health"],
+                                    cwd=temp_dir, capture_output=True, text=True, timeout=60)
+            self.assertEqual(result.returncode, 1)
+            self.assertIn("require --rolling", result.stdout)
+            self.assertFalse(os.path.exists(os.path.join(temp_dir, "data")))
+
+
+if __name__ == "__main__":
+    unittest.main()
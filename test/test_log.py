@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+from src.log import RateLimitFilter, JsonFormatter, JournaldHandler, make_handler, setup_logging, shutdown_logging
+import json
+import logging
+import os
+import socket
+import tempfile
+
+
+def make_record(message, level=logging.INFO, lineno=10):
+    return logging.LogRecord("src.services", level, "/src/services.py", lineno, message, None, None)
+
+
+class TestRateLimitFilter(unittest.TestCase):
+    @patch("src.log.time.monotonic", return_value=100.0)
+    def test_limits_info_per_call_site(self, mock_monotonic):
+        """测试按调用位置限制 INFO 日志速率"""
+        limiter = RateLimitFilter(rate=1, burst=2)
+        passed = [limiter.filter(make_record(f"Executing {i}")) for i in range(4)]
+        self.assertEqual(passed, [True, True, False, False])
+        # 其他调用位置和警告不受影响
+        self.assertTrue(limiter.filter(make_record("other", lineno=20)))
+        self.assertTrue(limiter.filter(make_record("failed", logging.ERROR)))
+
+        mock_monotonic.return_value = 101.0
+        record = make_record("Executing 4")
+        self.assertTrue(limiter.filter(record))
+        self.assertEqual(record.getMessage(), "Executing 4 (2 similar messages suppressed)")
+
+
+class TestSinks(unittest.TestCase):
+    def test_json_formatter(self):
+        """测试 JSON 行格式"""
+        data = json.loads(JsonFormatter().format(make_record("Saved service: nginx")))
+        self.assertEqual((data["level"], data["logger"], data["message"]), ("INFO", "src.services", "Saved service: nginx"))
+
+    def test_journald_handler(self):
+        """测试通过 journald 原生协议发送日志"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "journal.sock")
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            server.bind(path)
+            server.settimeout(5)
+            self.addCleanup(server.close)
+            handler = JournaldHandler(socket_path=path)
+            handler.emit(make_record("line one\nline two", logging.WARNING))
+            handler.close()
+            datagram = server.recv(65536)
+        self.assertIn(b"PRIORITY=4\n", datagram)
+        self.assertIn(b"SYSLOG_IDENTIFIER=wsm\n", datagram)
+        message = "line one\nline two".encode()
+        self.assertIn(b"MESSAGE\n" + len(message).to_bytes(8, "little") + message + b"\n", datagram)
+
+    def test_invalid_sink(self):
+        """测试无效的日志输出"""
+        with self.assertRaises(ValueError):
+            make_handler("syslog")
+        with self.assertRaises(ValueError):
+            make_handler("json")
+
+
+class TestPipeline(unittest.TestCase):
+    def test_queue_pipeline_writes_json_lines(self):
+        """测试日志经队列写入 JSON 文件"""
+        logger = logging.getLogger("src")
+        handlers, level = list(logger.handlers), logger.level
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "logs", "manager.log.jsonl")
+            with patch("src.log._pipeline", None):
+                setup_logging(sink="json", path=path, rate=None)
+                logging.getLogger("src.manager").info("Manager initialized")
+                logging.getLogger("src.manager").debug("hidden")
+                shutdown_logging()
+            self.assertEqual(logger.handlers, handlers)
+            logger.setLevel(level)
+            with open(path) as file:
+                lines = [json.loads(line) for line in file]
+        self.assertEqual([line["message"] for line in lines], ["Manager initialized"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,11 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from src.manager import ServiceFactory, ServiceRepository, Manager
+from src.manager import ServiceFactory, ServiceRepository, Manager, parse_index_ranges, parse_selectors
+from src.services import Service, OperationResult
 import os
 import json
 import tempfile
+import asyncio
 
 class TestServiceFactory(unittest.TestCase):
     def test_create_valid_service(self):
@@ -14,6 +16,15 @@ class TestServiceFactory(unittest.TestCase):
         self.assertEqual(service.name, "nginx")
         self.assertIsNone(service.path)
 
+    def test_create_with_dependencies(self):
+        """测试创建带依赖的服务"""
+        factory = ServiceFactory()
+        self.assertEqual(factory.create_service("sys", "app", depends_on=["db"]).depends_on, ["db"])
+        self.assertEqual(factory.create_service("sys", "app", depends_on=["db", "DB", "cache", "db"]).depends_on,
+                         ["db", "cache"])
+        with self.assertRaises(ValueError):
+            factory.create_service("sys", "app", depends_on=["App"])
+
     def test_create_invalid_tag(self):
         """测试创建无效标签的服务"""
         factory = ServiceFactory()
@@ -120,6 +131,44 @@ class TestServiceRepository(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.repo.remove("nonexistent")
 
+    def _write_services(self, services):
+        with open(self.repo_path, "w") as f:
+            json.dump(services, f)
+
+    def test_load_all_uses_cache(self):
+        """测试文件未变化时使用缓存"""
+        self._write_services([{"tag": "sys", "name": "nginx", "path": None}])
+        self.repo.load_all()
+        with patch("src.storage.json.load") as mock_load:
+            services = self.repo.load_all()
+        mock_load.assert_not_called()
+        self.assertEqual(services[0]["name"], "nginx")
+
+        # 修改返回的列表不影响缓存
+        services.append({"tag": "sys", "name": "extra", "path": None})
+        self.assertEqual(len(self.repo.load_all()), 1)
+
+    def test_load_all_detects_external_change(self):
+        """测试文件被外部修改后重新加载"""
+        self._write_services([{"tag": "sys", "name": "nginx", "path": None}])
+        self.repo.load_all()
+        self._write_services([{"tag": "sys", "name": "nginx", "path": None},
+                              {"tag": "sys", "name": "redis", "path": None}])
+        self.assertEqual(len(self.repo.load_all()), 2)
+
+        os.remove(self.repo_path)
+        self.assertEqual(self.repo.load_all(), [])
+
+    def test_cache_refreshed_on_write(self):
+        """测试自身写入后缓存更新"""
+        mock_service = MagicMock()
+        mock_service.to_dict.return_value = {"tag": "sys", "name": "nginx", "path": None}
+        self.repo.load_all()
+        self.repo.save(mock_service)
+        with patch("src.storage.json.load") as mock_load:
+            self.assertEqual(len(self.repo.load_all()), 1)
+        mock_load.assert_not_called()
+
 class TestManager(unittest.TestCase):
     @patch("src.manager.ServiceRepository")
     @patch("src.manager.ServiceFactory")
@@ -137,10 +186,15 @@ class TestManager(unittest.TestCase):
         service = manager.register_service("sys", "nginx")
         
         # 验证调用
-        mock_factory.return_value.create_service.assert_called_with("sys", "nginx", None)
+        mock_factory.return_value.create_service.assert_called_with("sys", "nginx", None, None)
         mock_repo.return_value.save.assert_called_with(mock_service)
         self.assertEqual(service, mock_service)
 
+    def test_invalid_transport(self):
+        """测试无效的传输方式"""
+        with self.assertRaises(ValueError):
+            Manager(MagicMock(), transport="ssh")
+
     @patch("src.manager.ServiceRepository")
     def test_list_services(self, mock_repo):
         """测试服务列表"""
@@ -183,6 +237,16 @@ class TestManager(unittest.TestCase):
         
         # 验证调用
         mock_service_instance.service_operation.assert_called_once()
+
+    def test_execute_service_operation_with_action(self):
+        """测试指定操作时返回结果"""
+        manager = Manager(MagicMock())
+        service = MagicMock()
+        service.service_operation.return_value = OperationResult("nginx", "sys", 2)
+        with patch.object(manager, 'list_services', return_value=[service]):
+            result = manager.execute_service_operation(0, 2)
+        service.service_operation.assert_called_once_with(2)
+        self.assertTrue(result.ok)
         
     def test_register_invalid_service(self):
         """测试注册无效服务"""
@@ -297,7 +361,219 @@ class TestManager(unittest.TestCase):
                 
         # 验证错误日志记录
         mock_logger.error.assert_called_with("Invalid service index: 0")
-            
+
+
+class TestBulkOperation(unittest.TestCase):
+    def test_parse_index_ranges(self):
+        """测试解析索引和范围"""
+        self.assertEqual(parse_index_ranges(["0", "3", "5-7", "3"]), [0, 3, 5, 6, 7])
+
+    def test_parse_invalid_index_ranges(self):
+        """测试解析无效索引"""
+        with self.assertRaises(ValueError):
+            parse_index_ranges(["a"])
+        with self.assertRaises(ValueError):
+            parse_index_ranges(["7-5"])
+
+    def test_parse_selectors(self):
+        """测试区分索引和名称选择器"""
+        self.assertEqual(parse_selectors(["0", "2-3", "web-*", "nginx"]), ([0, 2, 3], ["web-*", "nginx"]))
+        self.assertEqual(parse_selectors(["web-1"]), (None, ["web-1"]))
+
+    def test_select_services_by_name(self):
+        """测试按名称选择时不加载全部服务"""
+        repo = MagicMock()
+        repo.select.return_value = [{"tag": "docker", "name": "web-a", "path": "/srv/a"}]
+        manager = Manager(repo)
+        with patch.object(manager, 'list_services') as mock_list:
+            services = manager.select_services(names=["web-*"], tag="docker")
+        mock_list.assert_not_called()
+        repo.select.assert_called_once_with(["web-*"], "docker")
+        self.assertEqual([s.name for s in services], ["web-a"])
+
+    def test_select_services_unknown_name(self):
+        """测试按名称选择时未找到的精确名称报错，未匹配的模式不报错"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = Manager(ServiceRepository(os.path.join(temp_dir, "services.json")))
+            manager.register_service("sys", "web")
+            with self.assertRaisesRegex(ValueError, "Service 'ghost' not found"):
+                manager.select_services(names=["web", "ghost"])
+            with self.assertRaisesRegex(ValueError, "Service 'web' not found with tag 'docker'"):
+                manager.select_services(names=["web"], tag="docker")
+            with self.assertRaisesRegex(ValueError, "ghost"):
+                manager.select_services([0], names=["ghost"])
+            self.assertEqual([s.name for s in manager.select_services(names=["WEB", "db-*"])], ["web"])
+
+    def test_find_service(self):
+        """测试按名称查找服务"""
+        repo = MagicMock()
+        repo.find.side_effect = lambda name: {"tag": "sys", "name": "nginx", "path": None} if name == "nginx" else None
+        manager = Manager(repo)
+        self.assertEqual(manager.find_service("nginx").name, "nginx")
+        with self.assertRaises(ValueError):
+            manager.find_service("missing")
+
+    def test_remove_services_single_write(self):
+        """测试批量移除只写入一次"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = ServiceRepository(os.path.join(temp_dir, "services.json"))
+            manager = Manager(repo)
+            for name in ("web-a", "web-b", "nginx"):
+                manager.register_service("sys", name)
+            with patch.object(repo, "_write", wraps=repo._write) as mock_write:
+                manager.remove_services(manager.select_services(names=["web-*"]))
+            self.assertEqual(mock_write.call_count, 1)
+            self.assertEqual([s["name"] for s in repo.load_all()], ["nginx"])
+
+    def _make_service(self, name, tag="sys"):
+        service = MagicMock()
+        service.name = name
+        service.tag = tag
+        return service
+
+    def test_select_services(self):
+        """测试按索引和标签选择服务"""
+        manager = Manager(MagicMock())
+        services = [self._make_service("nginx"), self._make_service("web", "docker"),
+                    self._make_service("db", "docker")]
+        with patch.object(manager, 'list_services', return_value=services):
+            self.assertEqual(manager.select_services([0, 2]), [services[0], services[2]])
+            self.assertEqual(manager.select_services(None, "docker"), services[1:])
+            self.assertEqual(manager.select_services([0, 1], "docker"), [services[1]])
+            with self.assertRaises(IndexError):
+                manager.select_services([3])
+
+    def test_execute_bulk_operation(self):
+        """测试批量执行并收集结果"""
+        manager = Manager(MagicMock())
+        ok = self._make_service("nginx")
+        ok.run_operation.return_value = OperationResult("nginx", "sys", 1)
+        failed = self._make_service("web", "docker")
+        failed.run_operation.return_value = OperationResult("web", "docker", 1, 1, "exit 1")
+        broken = self._make_service("db", "docker")
+        broken.run_operation.side_effect = RuntimeError("boom")
+
+        results = manager.execute_bulk_operation([ok, failed, broken], 1, max_parallel=2)
+
+        self.assertEqual([r.name for r in results], ["nginx", "web", "db"])
+        self.assertTrue(results[0].ok)
+        self.assertEqual(results[1].returncode, 1)
+        self.assertFalse(results[2].ok)
+        self.assertEqual(results[2].error, "boom")
+        for service in (ok, failed, broken):
+            service.run_operation.assert_called_once_with(1)
+
+    @patch("src.strategies.run_command")
+    def test_execute_bulk_operation_coalesces_units(self, mock_run):
+        """测试批量操作将多个 systemd 单元合并为一次 systemctl 调用"""
+        manager = Manager(MagicMock())
+        services = [Service("sys", "nginx"), Service("sys", "redis"), Service("sys", "cron")]
+
+        results = manager.execute_bulk_operation(services, 0)
+
+        self.assertEqual([r.name for r in results], ["nginx", "redis", "cron"])
+        self.assertTrue(all(r.ok for r in results))
+        mock_run.assert_called_once()
+        self.assertEqual(mock_run.call_args.args[0], ["sudo", "systemctl", "stop", "nginx", "redis", "cron"])
+
+    @patch("src.strategies.run_command")
+    def test_execute_bulk_operation_no_coalesce(self, mock_run):
+        """测试关闭合并后逐个执行"""
+        manager = Manager(MagicMock())
+        services = [Service("sys", "nginx"), Service("sys", "redis")]
+
+        results = manager.execute_bulk_operation(services, 0, coalesce=False)
+
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(mock_run.call_count, 2)
+
+    def test_plan_batches(self):
+        """测试按策略分组"""
+        nginx, redis = Service("sys", "nginx"), Service("sys", "redis")
+        web = self._make_service("web", "docker")
+        self.assertEqual(Manager.plan_batches([nginx, web, redis]), [[nginx, redis], [web]])
+
+    def test_execute_bulk_operation_invalid_parallel(self):
+        """测试无效并发数"""
+        manager = Manager(MagicMock())
+        with self.assertRaises(ValueError):
+            manager.execute_bulk_operation([self._make_service("nginx")], 1, max_parallel=0)
+
+
+class TestAsyncOperation(unittest.IsolatedAsyncioTestCase):
+    async def test_execute_operations_async(self):
+        """测试异步批量执行并限制并发"""
+        manager = Manager(MagicMock())
+        running = 0
+        peak = 0
+
+        def make_service(name):
+            async def run_operation_async(operation, timeout=None, on_output=None):
+                nonlocal running, peak
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+                if name == "web":
+                    return OperationResult(name, "docker", operation, 1, "exit 1")
+                return OperationResult(name, "sys", operation)
+            service = MagicMock()
+            service.name = name
+            service.run_operation_async = run_operation_async
+            return service
+
+        services = [make_service(n) for n in ("nginx", "web", "db", "cache")]
+        results = await manager.execute_operations_async(services, 1, max_concurrency=2)
+
+        self.assertEqual([r.name for r in results], ["nginx", "web", "db", "cache"])
+        self.assertEqual([r.ok for r in results], [True, False, True, True])
+        self.assertEqual(peak, 2)
+
+
+class TestOperateCli(unittest.TestCase):
+    def test_single_service_prompt_cancelled(self):
+        """测试单个服务在提示时取消操作只询问一次"""
+        import pty
+        import subprocess
+        import sys
+        main = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def run(*args, **kwargs):
+                return subprocess.Popen([sys.executable, main, "--no-daemon", *args], cwd=temp_dir,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, **kwargs)
+
+            run("register", "sys", "nginx").wait(timeout=60)
+            master, slave = pty.openpty()
+            try:
+                process = run("operate", "nginx", stdin=slave)
+                os.write(master, b"q\n")
+                try:
+                    output, _ = process.communicate(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    output, _ = process.communicate()
+            finally:
+                os.close(slave)
+                os.close(master)
+        self.assertEqual(output.count("Please select an operation"), 1)
+        self.assertIn("Operation cancelled", output)
+        self.assertEqual(process.returncode, 0)
+
+    def test_unknown_name_in_bulk_selection(self):
+        """测试批量选择中包含未注册的名称时报错退出"""
+        import subprocess
+        import sys
+        main = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def run(*args):
+                return subprocess.run([sys.executable, main, "--no-daemon", *args], cwd=temp_dir,
+                                      stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=60)
+
+            run("register", "sys", "nginx")
+            result = run("operate", "nginx", "ghost", "--action", "stop")
+        self.assertIn("Error: Service 'ghost' not found", result.stdout)
+        self.assertEqual(result.returncode, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
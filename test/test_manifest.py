@@ -0,0 +1,125 @@
+import unittest
+from unittest.mock import patch
+from src.manager import Manager
+from src.manifest import load_manifest, parse_manifest
+from src.storage import ServiceRepository, SqliteServiceRepository
+import io
+import json
+import os
+import tempfile
+
+
+class TestParseManifest(unittest.TestCase):
+    def test_list(self):
+        """测试解析服务列表"""
+        entries = parse_manifest('[{"tag": "sys", "name": "nginx"}, '
+                                 '{"tag": "docker", "name": "web", "path": "/srv/web", "depends_on": ["nginx"]}]')
+        self.assertEqual(entries, [
+            {"tag": "sys", "name": "nginx", "path": None, "depends_on": None},
+            {"tag": "docker", "name": "web", "path": "/srv/web", "depends_on": ["nginx"]},
+        ])
+
+    def test_services_object(self):
+        """测试解析带 services 键的对象"""
+        self.assertEqual(len(parse_manifest('{"services": [{"tag": "sys", "name": "nginx"}]}')), 1)
+
+    def test_invalid_entries(self):
+        """测试无效条目"""
+        for text in ('{"tag": "sys"}', '[1]', '[{"tag": "sys"}]', '[{"tag": "sys", "name": "a", "port": 80}]',
+                     '[{"tag": "sys", "name": "a", "depends_on": "b"}]'):
+            with self.assertRaises(ValueError, msg=text):
+                parse_manifest(text, "json")
+
+    def test_invalid_json(self):
+        """测试无效 JSON"""
+        with self.assertRaises(ValueError):
+            parse_manifest("[", "json")
+
+    def test_yaml_without_pyyaml(self):
+        """测试未安装 PyYAML 时报错"""
+        with patch.dict("sys.modules", {"yaml": None}):
+            with self.assertRaises(ValueError) as ctx:
+                parse_manifest("- tag: sys\n  name: nginx\n", "yaml")
+        self.assertIn("PyYAML", str(ctx.exception))
+
+    def test_load_from_stdin(self):
+        """测试从标准输入读取清单"""
+        entries = load_manifest("-", stdin=io.StringIO('[{"tag": "sys", "name": "nginx"}]'))
+        self.assertEqual(entries[0]["name"], "nginx")
+
+
+class TestRegisterServices(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo_path = os.path.join(self.temp_dir.name, "services.json")
+        self.manager = Manager(ServiceRepository(self.repo_path))
+        self.entries = [
+            {"tag": "sys", "name": "nginx"},
+            {"tag": "docker", "name": "web", "path": self.temp_dir.name, "depends_on": ["nginx"]},
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_single_write(self):
+        """测试所有服务通过一次写入注册"""
+        with patch.object(self.manager.repository, "_write",
+                          wraps=self.manager.repository._write) as mock_write:
+            services = self.manager.register_services(self.entries)
+        self.assertEqual([s.name for s in services], ["nginx", "web"])
+        self.assertEqual(mock_write.call_count, 1)
+        with open(self.repo_path) as file:
+            self.assertEqual([s["name"] for s in json.load(file)], ["nginx", "web"])
+
+    def test_all_or_nothing(self):
+        """测试任一条目无效时不注册任何服务并列出所有错误"""
+        entries = self.entries + [
+            {"tag": "docker", "name": "db", "path": os.path.join(self.temp_dir.name, "missing")},
+            {"tag": "sys", "name": "NGINX"},
+        ]
+        with self.assertRaises(ValueError) as ctx:
+            self.manager.register_services(entries)
+        self.assertIn("2 invalid services", str(ctx.exception))
+        self.assertIn("db:", str(ctx.exception))
+        self.assertIn("NGINX: listed more than once", str(ctx.exception))
+        self.assertEqual(self.manager.list_services(), [])
+
+    def test_already_registered(self):
+        """测试已注册的服务名称"""
+        self.manager.register_service("sys", "Nginx")
+        with self.assertRaises(ValueError) as ctx:
+            self.manager.register_services(self.entries)
+        self.assertIn("already registered", str(ctx.exception))
+        self.assertEqual(len(self.manager.list_services()), 1)
+
+    def test_concurrent_registration(self):
+        """测试校验期间其他进程注册了同名服务时不写入重复名称"""
+        from src.manager import ServiceFactory
+        other = Manager(ServiceRepository(self.repo_path))
+        create_service = ServiceFactory.create_service
+
+        def create(tag, name, *args):
+            if name == "web":
+                other.register_service("sys", "nginx")
+            return create_service(tag, name, *args)
+
+        # 读取到的注册表快照早于其他进程的写入
+        with patch.object(self.manager.factory, "create_service", side_effect=create), \
+                patch.object(self.manager.repository, "load_all", return_value=[]):
+            with self.assertRaises(ValueError) as ctx:
+                self.manager.register_services(self.entries, max_parallel=1)
+        self.assertIn("nginx: already registered", str(ctx.exception))
+        self.assertEqual([s["name"] for s in ServiceRepository(self.repo_path).load_all()], ["nginx"])
+
+    def test_sqlite_repository(self):
+        """测试 SQLite 仓库批量注册"""
+        repo = SqliteServiceRepository(os.path.join(self.temp_dir.name, "services.db"))
+        try:
+            Manager(repo).register_services(self.entries)
+            self.assertEqual([s["name"] for s in repo.load_all()], ["nginx", "web"])
+        finally:
+            repo.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
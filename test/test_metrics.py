@@ -0,0 +1,177 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from src.manager import Manager
+from src.metrics import MetricsRegistry, OperationTimer, TextfileExporter, operation_metrics
+from src.services import Service, OperationResult
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_render_counter_and_gauge(self):
+        """测试以 Prometheus 文本格式输出计数器和仪表"""
+        registry = MetricsRegistry()
+        registry.counter("jobs_total", "Jobs", ("name",)).inc(name='a "b"')
+        registry.gauge("temperature", "Temperature").set(21.5)
+        self.assertEqual(registry.render(),
+                         '# HELP jobs_total Jobs\n# TYPE jobs_total counter\njobs_total{name="a \\"b\\""} 1\n'
+                         '# HELP temperature Temperature\n# TYPE temperature gauge\ntemperature 21.5\n')
+
+    def test_histogram_buckets(self):
+        """测试直方图累计分桶"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(1, 5))
+        for value in (0.5, 2, 10):
+            histogram.observe(value)
+        lines = registry.render().splitlines()[2:]
+        self.assertEqual(lines, ['latency_seconds_bucket{le="1"} 1', 'latency_seconds_bucket{le="5"} 2',
+                                 'latency_seconds_bucket{le="+Inf"} 3', 'latency_seconds_sum 12.5',
+                                 'latency_seconds_count 3'])
+
+    def test_label_mismatch(self):
+        """测试标签不匹配"""
+        counter = MetricsRegistry().counter("jobs_total", "Jobs", ("name",))
+        with self.assertRaises(ValueError):
+            counter.inc(service="nginx")
+
+    def test_merge_text(self):
+        """测试合并已导出的指标"""
+        source = MetricsRegistry()
+        source.counter("jobs_total", "Jobs", ("name",)).inc(2, name="a")
+        source.histogram("latency_seconds", "Latency", ("name",), buckets=(1, 5)).observe(3, name="a")
+        source.gauge("last", "Last", ("name",)).set(7, name="a")
+
+        target = MetricsRegistry()
+        counter = target.counter("jobs_total", "Jobs", ("name",))
+        histogram = target.histogram("latency_seconds", "Latency", ("name",), buckets=(1, 5))
+        gauge = target.gauge("last", "Last", ("name",))
+        counter.inc(name="a")
+        gauge.set(1, name="a")
+        target.merge_text(source.render() + "unknown_metric 5\n")
+
+        self.assertEqual(counter.value(name="a"), 3)
+        self.assertEqual(histogram.count(name="a"), 1)
+        self.assertIn('latency_seconds_bucket{name="a",le="5"} 1', target.render())
+        self.assertEqual(gauge.value(name="a"), 1)
+
+
+class TestOperationMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        patcher = patch("src.metrics.REGISTRY", self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.durations, self.operations, self.exit_code, _ = operation_metrics(self.registry)
+
+    def test_timer(self):
+        """测试记录操作阶段耗时和结果"""
+        timer = OperationTimer("nginx", "sys", 1)
+        with timer.phase("execute"):
+            pass
+        timer.finish(OperationResult("nginx", "sys", 1, 3, "failed"))
+        labels = {"service": "nginx", "tag": "sys", "action": "restart"}
+        self.assertEqual(self.durations.count(phase="execute", **labels), 1)
+        self.assertEqual(self.durations.count(phase="total", **labels), 1)
+        self.assertEqual(self.operations.value(result="failed", **labels), 1)
+        self.assertEqual(self.exit_code.value(**labels), 3)
+
+    @patch("src.services.SystemServiceStrategy.execute",
+           side_effect=subprocess.CalledProcessError(1, ["sudo", "systemctl", "stop", "nginx"]))
+    def test_service_operation_recorded(self, mock_execute):
+        """测试服务操作记录指标"""
+        Service("sys", "nginx").run_operation(0)
+        labels = {"service": "nginx", "tag": "sys", "action": "stop"}
+        for phase in ("generate", "execute", "total"):
+            self.assertEqual(self.durations.count(phase=phase, **labels), 1)
+        self.assertEqual(self.operations.value(result="failed", **labels), 1)
+        self.assertEqual(self.exit_code.value(**labels), 1)
+
+    def test_batch_operation_recorded(self):
+        """测试批量操作为每个单元记录指标"""
+        strategy = MagicMock()
+        strategy.execute_batch.return_value = {"nginx": (0, None), "redis": (3, "failed")}
+        services = [Service("sys", "nginx", strategy=strategy), Service("sys", "redis", strategy=strategy)]
+        Manager._run_batch(services, 1)
+        self.assertEqual(self.operations.value(service="nginx", tag="sys", action="restart", result="ok"), 1)
+        self.assertEqual(self.operations.value(service="redis", tag="sys", action="restart", result="failed"), 1)
+        self.assertEqual(self.durations.count(service="redis", tag="sys", action="restart", phase="execute"), 1)
+
+
+class TestTextfileExporter(unittest.TestCase):
+    def test_counters_accumulate_across_runs(self):
+        """测试多次运行的计数器累加"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "textfile", "wsm.prom")
+            for _ in range(2):
+                # 每次运行使用新的注册表，相当于新的进程
+                registry = MetricsRegistry()
+                OperationTimer("nginx", "sys", 1, registry).finish(OperationResult("nginx", "sys", 1))
+                exporter = TextfileExporter(path, registry)
+                exporter.export()
+                exporter.export()
+            with open(path) as file:
+                content = file.read()
+            self.assertIn('wsm_operations_total{service="nginx",tag="sys",action="restart",result="ok"} 2', content)
+            self.assertIn('wsm_operation_duration_seconds_count{service="nginx",tag="sys",action="restart",'
+                          'phase="total"} 2', content)
+            self.assertEqual([f for f in os.listdir(os.path.dirname(path)) if not f.endswith(".lock")], ["wsm.prom"])
+
+    def test_concurrent_writers(self):
+        """测试多个进程交替写同一文件时不丢失也不重复计数"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "wsm.prom")
+            registries = [MetricsRegistry(), MetricsRegistry()]
+            exporters = [TextfileExporter(path, registry) for registry in registries]
+            for registry, exporter, returncode in zip(registries, exporters, (0, 1)):
+                OperationTimer("nginx", "sys", 1, registry).finish(OperationResult("nginx", "sys", 1, returncode))
+                exporter.export()
+            OperationTimer("nginx", "sys", 1, registries[0]).finish(OperationResult("nginx", "sys", 1))
+            exporters[0].export()
+            exporters[1].export()
+            with open(path) as file:
+                content = file.read()
+            self.assertIn('wsm_operations_total{service="nginx",tag="sys",action="restart",result="ok"} 2', content)
+            self.assertIn('wsm_operations_total{service="nginx",tag="sys",action="restart",result="failed"} 1',
+                          content)
+            self.assertIn('wsm_operation_duration_seconds_count{service="nginx",tag="sys",action="restart",'
+                          'phase="total"} 3', content)
+            self.assertIn('wsm_operation_last_exit_code{service="nginx",tag="sys",action="restart"} 0', content)
+
+    def test_manager_exports_after_operation(self):
+        """测试管理器在操作后写出指标文件"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "wsm.prom")
+            with patch("src.metrics.REGISTRY", MetricsRegistry()):
+                manager = Manager(MagicMock(), metrics_textfile=path)
+                service = Service("docker", "homepage", path="/nonexistent")
+                manager.execute_bulk_operation([service], 1)
+            with open(path) as file:
+                self.assertIn('result="failed"', file.read())
+
+    @patch("src.strategies.run_command")
+    def test_named_operation_exports_and_invalidates(self, mock_run_command):
+        """测试按名称操作单个服务后写出指标并清除状态缓存"""
+        from src.status import ServiceStatus
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "wsm.prom")
+            cache_path = os.path.join(temp_dir, "status-cache.json")
+            with open(cache_path, "w") as file:
+                json.dump({"sys:nginx": ServiceStatus("nginx", "sys", "running", checked_at=time.time()).to_dict()},
+                          file)
+            repository = MagicMock()
+            repository.find.return_value = {"tag": "sys", "name": "nginx"}
+            with patch("src.metrics.REGISTRY", MetricsRegistry()):
+                manager = Manager(repository, status_cache=cache_path, metrics_textfile=path)
+                self.assertTrue(manager.execute_named_operation("nginx", 0).ok)
+            with open(path) as file:
+                self.assertIn('wsm_operations_total{service="nginx",tag="sys",action="stop",result="ok"} 1',
+                              file.read())
+            with open(cache_path) as file:
+                self.assertEqual(json.load(file), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch
+from src.output import OutputBuffer, OutputCapture, echo
+from src.services import Service, OperationResult
+from src.strategies import run_command
+import io
+import subprocess
+import sys
+
+
+class TestOutputBuffer(unittest.TestCase):
+    def test_keeps_tail_within_limit(self):
+        """测试环形缓冲区只保留末尾输出"""
+        buffer = OutputBuffer(limit=21)
+        for i in range(10):
+            buffer.append(f"line {i}")
+        self.assertEqual(buffer.text(), "... (7 earlier lines dropped)\nline 7\nline 8\nline 9")
+
+    def test_long_line_truncated(self):
+        """测试超长行被截断"""
+        buffer = OutputBuffer(limit=8)
+        buffer.append("x" * 100)
+        self.assertEqual(buffer.text(), "x" * 7)
+
+    def test_capture_forwards_and_records(self):
+        """测试捕获输出并带服务名转发"""
+        stream = io.StringIO()
+        capture = OutputCapture("web", lambda name, line: echo(name, line, stream))
+        capture("Pulling image")
+        self.assertEqual(stream.getvalue(), "[web] Pulling image\n")
+        self.assertEqual(capture.tail(), "Pulling image")
+        self.assertIsNone(OutputCapture("idle", None).tail())
+
+
+class TestRunCommand(unittest.TestCase):
+    def test_streams_stdout_and_stderr(self):
+        """测试逐行读取标准输出和标准错误"""
+        lines = []
+        script = "import sys; print('out', flush=True); print('err', file=sys.stderr, flush=True); print('a\\rb')"
+        run_command([sys.executable, "-c", script], on_output=lines.append)
+        self.assertEqual(lines, ["out", "err", "b"])
+
+    def test_failure_raises(self):
+        """测试命令失败时抛出异常"""
+        with self.assertRaises(subprocess.CalledProcessError) as context:
+            run_command([sys.executable, "-c", "raise SystemExit(4)"], on_output=lambda line: None)
+        self.assertEqual(context.exception.returncode, 4)
+
+    def test_timeout_kills_command(self):
+        """测试命令超时后被终止"""
+        lines = []
+        script = "import time; print('waiting', flush=True); time.sleep(10)"
+        with self.assertRaises(subprocess.TimeoutExpired):
+            run_command([sys.executable, "-c", script], on_output=lines.append, timeout=0.5)
+        self.assertEqual(lines, ["waiting"])
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_failure_result_carries_output(self, mock_stderr):
+        """测试失败结果附带输出末尾"""
+        service = Service("sys", "web")
+        script = "import sys; print('starting'); print('port in use', file=sys.stderr); sys.exit(1)"
+        with patch.object(type(service.strategy), "generate_command",
+                          return_value=[sys.executable, "-c", script]):
+            result = service.run_operation(1)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.output, "starting\nport in use")
+        self.assertIn("[web] port in use\n", mock_stderr.getvalue())
+        self.assertEqual(OperationResult.from_dict(result.to_dict()), result)
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_batch_failure_carries_output(self, mock_stderr):
+        """测试批量操作失败的单元附带输出末尾"""
+        from src.manager import Manager
+        from unittest.mock import MagicMock
+
+        def execute_batch(operation, names, on_output=None):
+            on_output("Job for redis.service failed.")
+            return {"nginx": (0, None), "redis": (1, "failed")}
+
+        strategy = MagicMock()
+        strategy.execute_batch.side_effect = execute_batch
+        nginx, redis = Manager._run_batch([Service("sys", "nginx", strategy=strategy),
+                                           Service("sys", "redis", strategy=strategy)], 1)
+        self.assertIsNone(nginx.output)
+        self.assertEqual(redis.output, "Job for redis.service failed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import MagicMock
+from src.manager import Manager
+from src.scheduler import dependency_levels, run_in_order, DependencyCycleError
+from src.services import Service, OperationResult
+import threading
+import time
+
+
+def names(levels):
+    return [[s.name for s in level] for level in levels]
+
+
+class TestDependencyLevels(unittest.TestCase):
+    def setUp(self):
+        self.db = Service("sys", "db")
+        self.cache = Service("sys", "cache")
+        self.app = Service("sys", "app", depends_on=["DB", "cache"])
+        self.nginx = Service("sys", "nginx", depends_on=["app"])
+
+    def test_levels(self):
+        """测试按依赖分层"""
+        services = [self.nginx, self.app, self.db, self.cache]
+        self.assertEqual(names(dependency_levels(services)), [["db", "cache"], ["app"], ["nginx"]])
+
+    def test_reverse_levels(self):
+        """测试停止时反向分层"""
+        services = [self.db, self.cache, self.app, self.nginx]
+        self.assertEqual(names(dependency_levels(services, reverse=True)), [["nginx"], ["app"], ["db", "cache"]])
+
+    def test_unselected_dependencies_ignored(self):
+        """测试忽略未选中的依赖"""
+        self.assertEqual(names(dependency_levels([self.nginx, self.db])), [["nginx", "db"]])
+
+    def test_cycle(self):
+        """测试检测循环依赖"""
+        self.db.depends_on = ["nginx"]
+        with self.assertRaises(DependencyCycleError) as context:
+            dependency_levels([self.db, self.app, self.nginx])
+        cycle = context.exception.cycle
+        self.assertEqual(cycle[0], cycle[-1])
+        self.assertEqual(set(cycle), {"db", "app", "nginx"})
+
+
+class TestRunInOrder(unittest.TestCase):
+    def test_critical_path(self):
+        """测试独立的依赖链并行执行"""
+        # Two chains: a1 -> a2 (0.2s each) and b (0.3s)
+        services = [Service("sys", "a1"), Service("sys", "a2", depends_on=["a1"]), Service("sys", "b")]
+        durations = {"a1": 0.2, "a2": 0.2, "b": 0.3}
+        finished = []
+        lock = threading.Lock()
+
+        def run(service):
+            time.sleep(durations[service.name])
+            with lock:
+                finished.append(service.name)
+            return OperationResult(service.name, service.tag, 1)
+
+        start = time.monotonic()
+        results = run_in_order(services, run, 1)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual([r.name for r in results], ["a1", "a2", "b"])
+        self.assertLess(finished.index("a1"), finished.index("a2"))
+        self.assertLess(elapsed, 0.6)
+
+    def test_failed_dependency_skips_dependents(self):
+        """测试依赖失败时跳过下游服务"""
+        services = [Service("sys", "db"), Service("sys", "app", depends_on=["db"]),
+                    Service("sys", "nginx", depends_on=["app"]), Service("sys", "cron")]
+        ran = []
+
+        def run(service):
+            ran.append(service.name)
+            if service.name == "db":
+                return OperationResult("db", "sys", 1, 1, "exit 1")
+            return OperationResult(service.name, service.tag, 1)
+
+        results = run_in_order(services, run, 1, max_parallel=1)
+
+        self.assertEqual(sorted(ran), ["cron", "db"])
+        self.assertEqual(results[1].error, "Skipped: db did not complete")
+        self.assertEqual(results[2].error, "Skipped: db did not complete")
+        self.assertTrue(results[3].ok)
+
+    def test_repeated_dependency_runs_once(self):
+        """测试重复声明的依赖不会让下游服务执行两次"""
+        services = [Service("sys", "db"), Service("sys", "app", depends_on=["db", "DB", "db"])]
+        ran = []
+
+        def run(service):
+            ran.append(service.name)
+            return OperationResult(service.name, service.tag, 1)
+
+        for reverse in (False, True):
+            ran.clear()
+            results = run_in_order(services, run, 1, reverse=reverse)
+            self.assertEqual(ran, ["app", "db"] if reverse else ["db", "app"])
+            self.assertTrue(all(r.ok for r in results))
+
+    def test_manager_stops_in_reverse(self):
+        """测试管理器停止时先停下游服务"""
+        order = []
+        services = [Service("sys", "db"), Service("sys", "app", depends_on=["db"])]
+        for service in services:
+            service._strategy = MagicMock()
+            service._strategy.generate_command.return_value = ["stop", service.name]
+            service._strategy.execute.side_effect = lambda command, on_output=None: order.append(command[1])
+
+        results = Manager(MagicMock()).execute_ordered_operation(services, 0)
+
+        self.assertEqual(order, ["app", "db"])
+        self.assertTrue(all(r.ok for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
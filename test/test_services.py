@@ -1,8 +1,11 @@
 import unittest
-from unittest.mock import patch, MagicMock
-from src.services import Service, SystemServiceStrategy, DockerServiceStrategy, get_operation
+from unittest.mock import patch, MagicMock, ANY
+from src.services import (Service, SystemServiceStrategy, DockerServiceStrategy, get_operation, parse_operation,
+                          run_command_async)
+import asyncio
 import os
 import subprocess
+import sys
 
 class TestService(unittest.TestCase):
     def test_service_initialization(self):
@@ -24,6 +27,16 @@ class TestService(unittest.TestCase):
         with self.assertRaises(ValueError):
             Service(tag="invalid", name="invalid")
 
+    def test_slots_and_lazy_strategy(self):
+        """测试服务记录使用 __slots__ 且策略延迟创建"""
+        service = Service(tag="docker", name="homepage", path="/path/to/docker")
+        self.assertFalse(hasattr(service, "__dict__"))
+        self.assertIsNone(service._strategy)
+        strategy = service.strategy
+        self.assertIsInstance(strategy, DockerServiceStrategy)
+        self.assertEqual(strategy.path, "/path/to/docker")
+        self.assertIs(service.strategy, strategy)
+
     def test_to_dict(self):
         """测试字典转换"""
         service = Service(tag="sys", name="nginx")
@@ -34,6 +47,11 @@ class TestService(unittest.TestCase):
             "path": None
         })
 
+    def test_to_dict_with_dependencies(self):
+        """测试字典转换包含依赖"""
+        service = Service(tag="sys", name="app", depends_on=["db"])
+        self.assertEqual(service.to_dict(), {"tag": "sys", "name": "app", "path": None, "depends_on": ["db"]})
+
 class TestSystemServiceStrategy(unittest.TestCase):
     def test_generate_stop_command(self):
         """测试生成停止命令"""
@@ -51,7 +69,13 @@ class TestSystemServiceStrategy(unittest.TestCase):
         """测试无效操作"""
         strategy = SystemServiceStrategy()
         with self.assertRaises(ValueError):
-            strategy.generate_command(2, "nginx")
+            strategy.generate_command(9, "nginx")
+
+    def test_generate_start_and_reload_commands(self):
+        """测试生成启动和重载命令"""
+        strategy = SystemServiceStrategy()
+        self.assertEqual(strategy.generate_command(2, "nginx"), ["sudo", "systemctl", "start", "nginx"])
+        self.assertEqual(strategy.generate_command(3, "nginx"), ["sudo", "systemctl", "reload", "nginx"])
 
     @patch("subprocess.run")
     def test_execute_command(self, mock_run):
@@ -59,14 +83,68 @@ class TestSystemServiceStrategy(unittest.TestCase):
         strategy = SystemServiceStrategy()
         command = ["sudo", "systemctl", "stop", "nginx"]
         strategy.execute(command)
-        mock_run.assert_called_with(command, check=True)
+        mock_run.assert_called_with(command, check=True, cwd=None, timeout=None)
+
+    def test_generate_batch_command(self):
+        """测试生成批量命令"""
+        strategy = SystemServiceStrategy()
+        command = strategy.generate_batch_command(1, ["nginx", "redis"])
+        self.assertEqual(command, ["sudo", "systemctl", "restart", "nginx", "redis"])
+        with self.assertRaises(ValueError):
+            strategy.generate_batch_command(1, [])
+
+    @patch("src.strategies.run_command")
+    def test_execute_batch_success(self, mock_run_command):
+        """测试批量执行成功时只调用一次 systemctl"""
+        on_output = MagicMock()
+        outcome = SystemServiceStrategy().execute_batch(0, ["nginx", "redis"], on_output=on_output)
+        self.assertEqual(outcome, {"nginx": (0, None), "redis": (0, None)})
+        mock_run_command.assert_called_once_with(["sudo", "systemctl", "stop", "nginx", "redis"],
+                                                 on_output=on_output, timeout=SystemServiceStrategy.BATCH_TIMEOUT)
+
+    @patch("subprocess.run")
+    @patch("src.strategies.run_command", side_effect=subprocess.CalledProcessError(1, ["systemctl"]))
+    def test_execute_batch_attributes_failures(self, mock_run_command, mock_run):
+        """测试批量执行失败时按单元状态归因"""
+        show_output = ("LoadState=loaded\nActiveState=active\nSubState=running\nResult=success\n\n"
+                       "LoadState=loaded\nActiveState=failed\nSubState=failed\nResult=exit-code\n\n"
+                       "LoadState=not-found\nActiveState=inactive\nSubState=dead\nResult=success\n")
+        mock_run.return_value = MagicMock(stdout=show_output)
+        outcome = SystemServiceStrategy().execute_batch(1, ["nginx", "redis", "ghost"])
+        self.assertEqual(outcome["nginx"], (0, None))
+        self.assertEqual(outcome["redis"][0], 1)
+        self.assertIn("failed", outcome["redis"][1])
+        self.assertIn("not found", outcome["ghost"][1])
+        self.assertEqual(mock_run.call_args.args[0],
+                         ["systemctl", "show", "-p", "LoadState,ActiveState,SubState,Result",
+                          "--", "nginx", "redis", "ghost"])
+
+    @patch("subprocess.run", return_value=MagicMock(stdout="LoadState=loaded\n"))
+    @patch("src.strategies.run_command", side_effect=subprocess.CalledProcessError(5, ["systemctl"]))
+    def test_execute_batch_show_failure(self, mock_run_command, mock_run):
+        """测试无法查询单元状态时所有单元都标记为失败"""
+        outcome = SystemServiceStrategy().execute_batch(0, ["nginx", "redis"])
+        self.assertEqual(outcome["nginx"][0], 5)
+        self.assertEqual(outcome["redis"][0], 5)
+        self.assertIsNotNone(outcome["redis"][1])
+
+    @patch("subprocess.run")
+    def test_execute_batch_not_run(self, mock_run):
+        """测试命令无法运行或超时时所有单元都标记为失败"""
+        for error in (FileNotFoundError("sudo"), subprocess.TimeoutExpired(["sudo"], 300)):
+            with patch("src.strategies.run_command", side_effect=error):
+                outcome = SystemServiceStrategy().execute_batch(1, ["nginx", "redis"])
+            self.assertEqual(outcome, {"nginx": (None, str(error)), "redis": (None, str(error))})
+        mock_run.assert_not_called()
 
 class TestDockerServiceStrategy(unittest.TestCase):
     def setUp(self):
         self.path = "/path/to/docker"
         self.strategy = DockerServiceStrategy(self.path)
-        os.path.exists = MagicMock(return_value=True)
-        os.path.isdir = MagicMock(return_value=True)
+        for name in ("exists", "isdir"):
+            patcher = patch(f"os.path.{name}", return_value=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
 
     def test_generate_down_command(self):
         """测试生成停止命令"""
@@ -78,6 +156,11 @@ class TestDockerServiceStrategy(unittest.TestCase):
         command = self.strategy.generate_command(1, "homepage")
         self.assertEqual(command, ["docker", "compose", "up", "-d"])
 
+    def test_generate_start_and_reload_commands(self):
+        """测试生成启动和重载命令"""
+        self.assertEqual(self.strategy.generate_command(2, "homepage"), ["docker", "compose", "up", "-d"])
+        self.assertEqual(self.strategy.generate_command(3, "homepage"), ["docker", "compose", "restart"])
+
     def test_missing_path(self):
         """测试路径为空字符串"""
         strategy = DockerServiceStrategy("")
@@ -97,7 +180,7 @@ class TestDockerServiceStrategy(unittest.TestCase):
         """测试命令执行"""
         command = ["docker", "compose", "down"]
         self.strategy.execute(command)
-        mock_run.assert_called_with(command, check=True, cwd="/path/to/docker")
+        mock_run.assert_called_with(command, check=True, cwd="/path/to/docker", timeout=None)
 
 class TestServiceOperation(unittest.TestCase):
     @patch("builtins.input", side_effect=["0"])
@@ -118,6 +201,38 @@ class TestServiceOperation(unittest.TestCase):
         result = get_operation()
         self.assertIsNone(result)
 
+    @patch("builtins.input", side_effect=["reload"])
+    def test_get_operation_by_name(self, mock_input):
+        """测试按名称输入操作"""
+        self.assertEqual(get_operation(), 3)
+
+    def test_parse_operation(self):
+        """测试解析操作名称和编号"""
+        self.assertEqual(parse_operation("stop"), 0)
+        self.assertEqual(parse_operation(" Start "), 2)
+        self.assertEqual(parse_operation(3), 3)
+        for value in ("kill", 7, True, None):
+            with self.assertRaises(ValueError):
+                parse_operation(value)
+
+    @patch("src.services.SystemServiceStrategy.execute")
+    @patch("src.services.get_operation")
+    def test_service_operation_without_prompt(self, mock_get_operation, mock_execute):
+        """测试指定操作时不提示输入并返回结果"""
+        result = Service(tag="sys", name="nginx").service_operation(2)
+        mock_get_operation.assert_not_called()
+        mock_execute.assert_called_with(["sudo", "systemctl", "start", "nginx"], on_output=ANY)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.operation, 2)
+
+    @patch("src.services.SystemServiceStrategy.execute",
+           side_effect=subprocess.CalledProcessError(5, ["sudo", "systemctl", "reload", "nginx"]))
+    def test_service_operation_failure_result(self, mock_execute):
+        """测试操作失败时返回失败结果"""
+        result = Service(tag="sys", name="nginx").service_operation(3)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.returncode, 5)
+
     @patch("builtins.input", side_effect=["invalid", "0"])
     @patch("src.services.logger.warning")
     def test_invalid_input(self, mock_warning, mock_input):
@@ -138,7 +253,7 @@ class TestServiceOperation(unittest.TestCase):
         # 验证调用
         mock_get_operation.assert_called_once()
         mock_generate.assert_called_with(0, "nginx")
-        mock_execute.assert_called_with(["sudo", "systemctl", "stop", "nginx"])
+        mock_execute.assert_called_with(["sudo", "systemctl", "stop", "nginx"], on_output=ANY)
         mock_info.assert_any_call("Executing: sudo systemctl stop nginx")
         mock_info.assert_any_call("Service nginx operation completed")
 
@@ -154,9 +269,73 @@ class TestServiceOperation(unittest.TestCase):
         # 验证调用
         mock_get_operation.assert_called_once()
         mock_generate.assert_called_with(0, "homepage", "/path/to/docker")
-        mock_execute.assert_called_with(["docker", "compose", "down"])
+        mock_execute.assert_called_with(["docker", "compose", "down"], on_output=ANY)
         mock_info.assert_any_call("Executing: docker compose down")
         mock_info.assert_any_call("Service homepage operation completed")
 
+    @patch("src.services.SystemServiceStrategy.execute",
+           side_effect=subprocess.CalledProcessError(5, ["sudo", "systemctl", "restart", "nginx"]))
+    def test_run_operation_failure(self, mock_execute):
+        """测试非交互操作返回失败结果"""
+        service = Service(tag="sys", name="nginx")
+        result = service.run_operation(1)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.returncode, 5)
+        self.assertEqual(result.name, "nginx")
+
+    @patch("src.services.SystemServiceStrategy.execute")
+    def test_run_operation_success(self, mock_execute):
+        """测试非交互操作返回成功结果"""
+        service = Service(tag="sys", name="nginx")
+        result = service.run_operation(1)
+        self.assertTrue(result.ok)
+        mock_execute.assert_called_with(["sudo", "systemctl", "restart", "nginx"], on_output=ANY)
+
+class TestAsyncExecution(unittest.IsolatedAsyncioTestCase):
+    async def test_run_command_streams_output(self):
+        """测试异步执行并逐行输出"""
+        lines = []
+        await run_command_async([sys.executable, "-c", "print('a'); print('b')"], on_output=lines.append)
+        self.assertEqual(lines, ["a", "b"])
+
+    async def test_run_command_failure(self):
+        """测试异步执行失败"""
+        with self.assertRaises(subprocess.CalledProcessError) as ctx:
+            await run_command_async([sys.executable, "-c", "raise SystemExit(3)"])
+        self.assertEqual(ctx.exception.returncode, 3)
+
+    async def test_run_command_timeout(self):
+        """测试异步执行超时"""
+        with self.assertRaises(subprocess.TimeoutExpired):
+            await run_command_async([sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.2)
+
+    async def test_run_command_cancel(self):
+        """测试取消异步执行"""
+        task = asyncio.create_task(
+            run_command_async([sys.executable, "-c", "import time; time.sleep(10)"]))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+    async def test_run_operation_async(self):
+        """测试服务异步操作"""
+        service = Service(tag="sys", name="nginx")
+        lines = []
+        with patch.object(SystemServiceStrategy, "generate_command",
+                          return_value=[sys.executable, "-c", "print('done')"]):
+            result = await service.run_operation_async(1, on_output=lambda name, line: lines.append((name, line)))
+        self.assertTrue(result.ok)
+        self.assertEqual(lines, [("nginx", "done")])
+
+    async def test_run_operation_async_timeout(self):
+        """测试服务异步操作超时"""
+        service = Service(tag="sys", name="nginx")
+        with patch.object(SystemServiceStrategy, "generate_command",
+                          return_value=[sys.executable, "-c", "import time; time.sleep(10)"]):
+            result = await service.run_operation_async(1, timeout=0.2)
+        self.assertFalse(result.ok)
+        self.assertIsNone(result.returncode)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def import_times(*args):
+    """Run main.py under ``-X importtime`` and return {module: cumulative_us} for top-level imports."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        result = subprocess.run([sys.executable, "-X", "importtime", MAIN, *args],
+                                cwd=temp_dir, capture_output=True, text=True, check=True)
+    modules = {}
+    nested = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line.split("|")
+        try:
+            cumulative = int(fields[1].strip())
+        except ValueError:
+            continue  # 表头
+        # 嵌套导入的模块名带有额外缩进
+        name = fields[2]
+        if name.startswith("  ", 1):
+            nested.add(name.strip())
+        else:
+            modules[name.strip()] = cumulative
+    return modules, nested | set(modules)
+
+
+class TestStartupTime(unittest.TestCase):
+    # 可通过环境变量调整预算，以适应较慢的机器
+    BUDGET_MS = float(os.environ.get("WSM_STARTUP_BUDGET_MS", "300"))
+    HEAVY_MODULES = ("asyncio", "subprocess", "sqlite3", "concurrent.futures", "tempfile", "src.strategies")
+
+    def test_list_does_not_import_heavy_modules(self):
+        """测试 list 命令不导入策略和子进程相关模块"""
+        _, imported = import_times("list")
+        for module in self.HEAVY_MODULES:
+            self.assertNotIn(module, imported)
+
+    def test_list_import_time_budget(self):
+        """测试 list 命令的导入时间预算"""
+        modules, _ = import_times("list")
+        total_ms = sum(modules.values()) / 1000
+        self.assertLess(total_ms, self.BUDGET_MS,
+                        f"list startup imports took {total_ms:.1f} ms (budget {self.BUDGET_MS} ms)")
+
+
+if __name__ == "__main__":
+    unittest.main()
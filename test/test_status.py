@@ -0,0 +1,143 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from src.manager import Manager
+from src.services import Service
+from src.status import StatusCollector, ServiceStatus, summarize_containers, parse_compose_status
+import json
+import os
+import tempfile
+
+
+def fake_run(units, projects):
+    """Build a subprocess.run replacement answering systemctl show and docker compose ls."""
+    def run(command, **kwargs):
+        if command[:2] == ["systemctl", "show"]:
+            blocks = []
+            for name in command[command.index("--") + 1:]:
+                active, sub, pid = units.get(name, ("inactive", "dead", 0))
+                load = "loaded" if name in units else "not-found"
+                blocks.append(f"LoadState={load}\nActiveState={active}\nSubState={sub}\nMainPID={pid}\n")
+            return MagicMock(stdout="\n".join(blocks))
+        if command[:3] == ["docker", "compose", "ls"]:
+            return MagicMock(stdout=json.dumps(projects))
+        raise AssertionError(f"unexpected command: {command}")
+    return run
+
+
+class TestStatusHelpers(unittest.TestCase):
+    def test_summarize_containers(self):
+        """测试汇总容器状态"""
+        self.assertEqual(summarize_containers({"running": 2}), ("running", "running(2)"))
+        self.assertEqual(summarize_containers({"running": 1, "exited": 1}), ("partial", "exited(1), running(1)"))
+        self.assertEqual(summarize_containers({"exited": 3}), ("stopped", "exited(3)"))
+
+    def test_parse_compose_status(self):
+        """测试解析 compose 状态"""
+        self.assertEqual(parse_compose_status("running(2), exited(1)"), {"running": 2, "exited": 1})
+
+
+class TestStatusCollector(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.project_dir = os.path.join(self.temp_dir.name, "homepage")
+        os.mkdir(self.project_dir)
+        self.units = {f"unit-{i}": ("active", "running", 1000 + i) for i in range(200)}
+        self.units["broken"] = ("failed", "failed", 0)
+        self.projects = [{"Name": "homepage", "Status": "running(1), exited(1)",
+                          "ConfigFiles": os.path.join(self.project_dir, "docker-compose.yml")}]
+        self.services = ([Service("sys", f"unit-{i}") for i in range(200)] +
+                         [Service("sys", "broken"), Service("sys", "ghost"),
+                          Service("docker", "homepage", self.project_dir), Service("docker", "blog", "/srv/blog")])
+
+    def test_one_query_per_type(self):
+        """测试每种服务只查询一次"""
+        with patch("subprocess.run", side_effect=fake_run(self.units, self.projects)) as mock_run:
+            statuses = StatusCollector().collect(self.services)
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertEqual(len(statuses), len(self.services))
+        self.assertEqual(statuses[0], ServiceStatus("unit-0", "sys", "active", "running", 1000, statuses[0].checked_at))
+        self.assertEqual(statuses[200].state, "failed")
+        self.assertIsNone(statuses[200].pid)
+        self.assertEqual(statuses[201].state, "not-found")
+        self.assertEqual(statuses[202].state, "partial")
+        self.assertEqual(statuses[203].state, "not-found")
+
+    def test_ttl_cache(self):
+        """测试在有效期内复用缓存"""
+        collector = StatusCollector(ttl=60)
+        with patch("subprocess.run", side_effect=fake_run(self.units, self.projects)) as mock_run:
+            collector.collect(self.services)
+            collector.collect(self.services[:10])
+            self.assertEqual(mock_run.call_count, 2)
+            collector.collect(self.services[:10], refresh=True)
+            self.assertEqual(mock_run.call_count, 3)
+            collector.invalidate([self.services[202]])
+            collector.collect(self.services)
+            self.assertEqual(mock_run.call_count, 4)
+            self.assertEqual(mock_run.call_args.args[0][:3], ["docker", "compose", "ls"])
+
+    def test_expired_entries_are_queried(self):
+        """测试过期后重新查询"""
+        collector = StatusCollector(ttl=0)
+        with patch("subprocess.run", side_effect=fake_run(self.units, self.projects)) as mock_run:
+            collector.collect(self.services[:2])
+            collector.collect(self.services[:2])
+        self.assertEqual(mock_run.call_count, 2)
+
+    def test_query_failure_not_cached(self):
+        """测试查询失败时状态未知且不缓存"""
+        collector = StatusCollector(ttl=60)
+        with patch("subprocess.run", side_effect=OSError("systemctl not found")):
+            statuses = collector.collect(self.services[:1])
+        self.assertEqual(statuses[0].state, "unknown")
+        with patch("subprocess.run", side_effect=fake_run(self.units, self.projects)):
+            self.assertEqual(collector.collect(self.services[:1])[0].state, "active")
+
+    def test_file_cache(self):
+        """测试缓存文件在多次运行间共享"""
+        cache_path = os.path.join(self.temp_dir.name, "status-cache.json")
+        with patch("subprocess.run", side_effect=fake_run(self.units, self.projects)):
+            StatusCollector(ttl=60, cache_path=cache_path).collect(self.services)
+        with patch("subprocess.run") as mock_run:
+            statuses = StatusCollector(ttl=60, cache_path=cache_path).collect(self.services)
+        mock_run.assert_not_called()
+        self.assertEqual(statuses[202].state, "partial")
+
+    def test_docker_api(self):
+        """测试通过 Docker API 查询项目状态"""
+        client = MagicMock()
+        client.request.return_value = (200, [
+            {"State": "running", "Labels": {"com.docker.compose.project": "homepage",
+                                            "com.docker.compose.project.working_dir": self.project_dir}},
+            {"State": "running", "Labels": {"com.docker.compose.project": "other"}},
+        ])
+        with patch("subprocess.run") as mock_run:
+            statuses = StatusCollector(docker_client=client).collect(self.services[202:])
+        mock_run.assert_not_called()
+        self.assertEqual(statuses[0].state, "running")
+        self.assertEqual(statuses[1].state, "not-found")
+
+
+class TestManagerStatus(unittest.TestCase):
+    @patch("subprocess.run")
+    def test_status_invalidated_by_operations(self, mock_run):
+        """测试操作后清除服务状态缓存"""
+        mock_run.side_effect = fake_run({"nginx": ("active", "running", 7)}, [])
+        repository = MagicMock()
+        repository.load_all.return_value = [{"tag": "sys", "name": "nginx"}]
+        manager = Manager(repository, status_ttl=60)
+
+        self.assertEqual(manager.status()[0].pid, 7)
+        manager.status()
+        self.assertEqual(mock_run.call_count, 1)
+
+        with patch("src.strategies.run_command") as mock_run_command:
+            manager.execute_bulk_operation(manager.list_services(), 1)
+        mock_run_command.assert_called_once()
+        mock_run.side_effect = fake_run({"nginx": ("active", "running", 8)}, [])
+        self.assertEqual(manager.status()[0].pid, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
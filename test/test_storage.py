@@ -0,0 +1,350 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from src.storage import (ServiceRepository, JournalServiceRepository, SqliteServiceRepository,
+                         make_repository, atomic_write)
+import multiprocessing
+import os
+import json
+import sqlite3
+import tempfile
+
+
+def make_service(name, tag="sys", path=None):
+    service = MagicMock()
+    service.name = name
+    service.to_dict.return_value = {"tag": tag, "name": name, "path": path}
+    return service
+
+
+def save_many(repo_path, prefix, count):
+    repo = ServiceRepository(repo_path)
+    for i in range(count):
+        repo.save(make_service(f"{prefix}-{i}"))
+
+
+class TestAtomicWrites(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo_path = os.path.join(self.temp_dir.name, "services.json")
+        self.repo = ServiceRepository(self.repo_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_atomic_write_replaces_file(self):
+        """测试原子写入保留权限且不留临时文件"""
+        with open(self.repo_path, "w") as f:
+            f.write("old")
+        os.chmod(self.repo_path, 0o640)
+        atomic_write(self.repo_path, "new")
+        with open(self.repo_path) as f:
+            self.assertEqual(f.read(), "new")
+        self.assertEqual(os.stat(self.repo_path).st_mode & 0o777, 0o640)
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)), ["services.json"])
+
+    def test_failed_write_keeps_old_content(self):
+        """测试写入失败时保留原内容"""
+        self.repo.save(make_service("nginx"))
+        with patch("src.storage.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.repo.save(make_service("redis"))
+        self.assertEqual([s["name"] for s in ServiceRepository(self.repo_path).load_all()], ["nginx"])
+        self.assertNotIn(".tmp", "".join(os.listdir(self.temp_dir.name)))
+
+    def test_corrupted_file_not_overwritten(self):
+        """测试文件损坏时拒绝写入"""
+        with open(self.repo_path, "w") as f:
+            f.write("[{\"tag\": ")
+        with self.assertRaises(ValueError):
+            self.repo.save(make_service("nginx"))
+        with open(self.repo_path) as f:
+            self.assertEqual(f.read(), "[{\"tag\": ")
+
+    def test_transaction_single_write(self):
+        """测试事务合并为一次写入"""
+        self.repo.save(make_service("old"))
+        with patch("src.storage.atomic_write", wraps=atomic_write) as mock_write:
+            with self.repo.transaction() as transaction:
+                transaction.save(make_service("nginx"))
+                transaction.save(make_service("redis"))
+                transaction.remove("old")
+        self.assertEqual(mock_write.call_count, 1)
+        self.assertEqual([s["name"] for s in self.repo.load_all()], ["nginx", "redis"])
+
+    def test_transaction_rollback(self):
+        """测试事务出错时不写入"""
+        self.repo.save(make_service("nginx"))
+        with self.assertRaises(ValueError):
+            with self.repo.transaction() as transaction:
+                transaction.save(make_service("redis"))
+                transaction.remove("missing")
+        self.assertEqual([s["name"] for s in ServiceRepository(self.repo_path).load_all()], ["nginx"])
+
+    def test_concurrent_processes_keep_all_updates(self):
+        """测试多进程并发写入不丢失更新"""
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=save_many, args=(self.repo_path, f"p{n}", 10))
+                     for n in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(len(ServiceRepository(self.repo_path).load_all()), 40)
+
+
+class TestNameIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo_path = os.path.join(self.temp_dir.name, "services.json")
+        self.repos = [ServiceRepository(self.repo_path),
+                      JournalServiceRepository(os.path.join(self.temp_dir.name, "journal.json")),
+                      SqliteServiceRepository(os.path.join(self.temp_dir.name, "services.db"))]
+        for repo in self.repos:
+            with repo.transaction() as transaction:
+                transaction.save(make_service("Web-A", "docker", "/srv/a"))
+                transaction.save(make_service("web-b", "docker", "/srv/b"))
+                transaction.save(make_service("nginx"))
+
+    def tearDown(self):
+        self.repos[2].close()
+        self.temp_dir.cleanup()
+
+    def test_find(self):
+        """测试按名称查找"""
+        for repo in self.repos:
+            self.assertEqual(repo.find(" web-a ")["name"], "Web-A")
+            self.assertIsNone(repo.find("missing"))
+
+    def test_select(self):
+        """测试按名称、通配符和标签选择"""
+        for repo in self.repos:
+            names = lambda records: [r["name"] for r in records]
+            self.assertEqual(names(repo.select(["web-*"])), ["Web-A", "web-b"])
+            self.assertEqual(names(repo.select(["nginx", "WEB-B"])), ["web-b", "nginx"]
+                             if isinstance(repo, SqliteServiceRepository) else ["nginx", "web-b"])
+            self.assertEqual(names(repo.select(["*"], tag="sys")), ["nginx"])
+            self.assertEqual(names(repo.select(tag="docker")), ["Web-A", "web-b"])
+            self.assertEqual(names(repo.select(["web-[!a]"])), ["web-b"])
+            self.assertEqual(repo.select(["missing"]), [])
+
+    def test_find_does_not_reparse(self):
+        """测试文件未变化时查找不重新解析"""
+        repo = self.repos[0]
+        repo.find("nginx")
+        with patch("src.storage.json.load") as mock_load:
+            self.assertIsNotNone(repo.find("web-b"))
+        mock_load.assert_not_called()
+
+    def test_index_follows_writes(self):
+        """测试写入后索引同步更新"""
+        for repo in self.repos:
+            repo.find("nginx")
+            repo.remove("nginx")
+            self.assertIsNone(repo.find("nginx"))
+            repo.save(make_service("redis"))
+            self.assertEqual(repo.find("REDIS")["tag"], "sys")
+
+
+class TestJournalServiceRepository(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo_path = os.path.join(self.temp_dir.name, "data", "services.json")
+        self.repo = JournalServiceRepository(self.repo_path, compact_threshold=100)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _journal_lines(self):
+        with open(self.repo.journal_path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_save_appends_to_journal(self):
+        """测试注册只追加日志"""
+        self.repo.save(make_service("nginx"))
+        self.repo.save(make_service("redis"))
+        self.assertFalse(os.path.exists(self.repo_path))
+        self.assertEqual([r["op"] for r in self._journal_lines()], ["register", "register"])
+        self.assertEqual([s["name"] for s in self.repo.load_all()], ["nginx", "redis"])
+
+    def test_remove_case_insensitive(self):
+        """测试移除服务（大小写不敏感）"""
+        self.repo.save(make_service("Nginx"))
+        self.repo.remove(" nginx ")
+        self.assertEqual(self.repo.load_all(), [])
+
+    def test_remove_nonexistent_service(self):
+        """测试移除不存在的服务"""
+        with self.assertRaises(ValueError):
+            self.repo.remove("nonexistent")
+
+    def test_replay_from_new_instance(self):
+        """测试新实例回放快照和日志"""
+        self.repo.save(make_service("nginx"))
+        self.repo.save(make_service("redis"))
+        self.repo.remove("nginx")
+        other = JournalServiceRepository(self.repo_path)
+        self.assertEqual([s["name"] for s in other.load_all()], ["redis"])
+
+    def test_migrates_existing_json(self):
+        """测试自动迁移已有 services.json"""
+        legacy = ServiceRepository(self.repo_path)
+        legacy.save(make_service("nginx"))
+        self.repo.save(make_service("redis"))
+        self.assertEqual([s["name"] for s in self.repo.load_all()], ["nginx", "redis"])
+
+    def test_compaction(self):
+        """测试达到阈值后压缩为快照"""
+        repo = JournalServiceRepository(self.repo_path, compact_threshold=3)
+        for name in ("a", "b", "c"):
+            repo.save(make_service(name))
+        self.assertEqual(os.path.getsize(repo.journal_path), 0)
+        with open(self.repo_path) as f:
+            self.assertEqual([s["name"] for s in json.load(f)], ["a", "b", "c"])
+        repo.save(make_service("d"))
+        other = JournalServiceRepository(self.repo_path)
+        self.assertEqual([s["name"] for s in other.load_all()], ["a", "b", "c", "d"])
+
+    def test_replay_after_interrupted_compaction(self):
+        """测试压缩中断后重复回放结果不变"""
+        self.repo.save(make_service("nginx"))
+        self.repo.remove("nginx")
+        self.repo.save(make_service("redis"))
+        # 模拟写入快照后、截断日志前崩溃
+        self.repo._write(self.repo.load_all())
+        other = JournalServiceRepository(self.repo_path)
+        self.assertEqual([s["name"] for s in other.load_all()], ["redis"])
+
+    def test_skip_corrupted_journal_line(self):
+        """测试跳过损坏的日志行"""
+        self.repo.save(make_service("nginx"))
+        with open(self.repo.journal_path, "a") as f:
+            f.write('{"op": "regis')
+        other = JournalServiceRepository(self.repo_path)
+        self.assertEqual([s["name"] for s in other.load_all()], ["nginx"])
+        other.save(make_service("redis"))
+        self.assertEqual([s["name"] for s in JournalServiceRepository(self.repo_path).load_all()],
+                         ["nginx", "redis"])
+
+    def test_transaction_single_append(self):
+        """测试事务一次追加多条记录"""
+        self.repo.save(make_service("old"))
+        with self.repo.transaction() as transaction:
+            transaction.save(make_service("nginx"))
+            transaction.remove("old")
+        self.assertEqual([r["op"] for r in self._journal_lines()], ["register", "register", "remove"])
+        self.assertEqual([s["name"] for s in JournalServiceRepository(self.repo_path).load_all()], ["nginx"])
+
+        with self.assertRaises(ValueError):
+            with self.repo.transaction() as transaction:
+                transaction.save(make_service("redis"))
+                transaction.remove("missing")
+        self.assertEqual(len(self._journal_lines()), 3)
+
+    def test_make_repository(self):
+        """测试按名称创建存储后端"""
+        self.assertIsInstance(make_repository("journal", self.repo_path), JournalServiceRepository)
+        self.assertIs(type(make_repository("json", self.repo_path)), ServiceRepository)
+        with self.assertRaises(ValueError):
+            make_repository("invalid", self.repo_path)
+
+
+class TestSqliteServiceRepository(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "data", "services.db")
+        self.repo = SqliteServiceRepository(self.db_path)
+
+    def tearDown(self):
+        self.repo.close()
+        self.temp_dir.cleanup()
+
+    def test_save_and_load(self):
+        """测试保存和按注册顺序加载"""
+        self.repo.save(make_service("nginx"))
+        self.repo.save(make_service("web", "docker", "/srv/web"))
+        self.assertEqual(self.repo.load_all(), [
+            {"tag": "sys", "name": "nginx", "path": None},
+            {"tag": "docker", "name": "web", "path": "/srv/web"},
+        ])
+
+    def test_depends_on(self):
+        """测试保存和加载依赖"""
+        service = make_service("app")
+        service.to_dict.return_value["depends_on"] = ["db", "cache"]
+        self.repo.save(service)
+        self.assertEqual(self.repo.find("app")["depends_on"], ["db", "cache"])
+
+    def test_schema_upgrade(self):
+        """测试为旧数据库添加依赖列"""
+        self.repo.close()
+        legacy_path = os.path.join(self.temp_dir.name, "legacy.db")
+        conn = sqlite3.connect(legacy_path)
+        conn.executescript("CREATE TABLE services (id INTEGER PRIMARY KEY AUTOINCREMENT, tag TEXT NOT NULL, "
+                           "name TEXT NOT NULL, name_key TEXT NOT NULL, path TEXT);"
+                           "INSERT INTO services (tag, name, name_key, path) VALUES ('sys', 'nginx', 'nginx', NULL);")
+        conn.close()
+        self.repo = SqliteServiceRepository(legacy_path)
+        self.assertEqual(self.repo.load_all(), [{"tag": "sys", "name": "nginx", "path": None}])
+
+    def test_duplicate_name(self):
+        """测试名称唯一（大小写不敏感）"""
+        self.repo.save(make_service("nginx"))
+        with self.assertRaises(ValueError):
+            self.repo.save(make_service(" NGINX "))
+
+    def test_find_and_filter(self):
+        """测试按名称查找和按标签过滤"""
+        self.repo.save(make_service("Nginx"))
+        self.repo.save(make_service("web", "docker", "/srv/web"))
+        self.assertEqual(self.repo.find(" nginx")["name"], "Nginx")
+        self.assertIsNone(self.repo.find("missing"))
+        self.assertEqual([s["name"] for s in self.repo.load_by_tag("docker")], ["web"])
+
+    def test_remove(self):
+        """测试移除服务"""
+        self.repo.save(make_service("Nginx"))
+        self.repo.remove("nginx ")
+        self.assertEqual(self.repo.load_all(), [])
+        with self.assertRaises(ValueError):
+            self.repo.remove("nginx")
+
+    def test_transaction_rollback(self):
+        """测试事务出错时整体回滚"""
+        self.repo.save(make_service("nginx"))
+        with self.assertRaises(ValueError):
+            with self.repo.transaction() as transaction:
+                transaction.save(make_service("redis"))
+                transaction.save(make_service("NGINX"))
+        self.assertEqual([s["name"] for s in self.repo.load_all()], ["nginx"])
+
+    def test_import_only_on_creation(self):
+        """测试仅在新建数据库时导入 JSON 注册表"""
+        json_path = os.path.join(self.temp_dir.name, "legacy", "services.json")
+        ServiceRepository(json_path).save(make_service("nginx"))
+        repo = make_repository("sqlite", json_path)
+        repo.remove("nginx")
+        repo.close()
+        repo = make_repository("sqlite", json_path)
+        self.addCleanup(repo.close)
+        self.assertEqual(repo.load_all(), [])
+
+    def test_wal_and_indexes(self):
+        """测试 WAL 模式和索引"""
+        conn = sqlite3.connect(self.db_path)
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(services)")}
+        self.assertTrue({"idx_services_name_key", "idx_services_tag", "idx_services_path"} <= indexes)
+
+    def test_import_json_registry(self):
+        """测试新建数据库时导入 JSON 注册表"""
+        json_path = os.path.join(self.temp_dir.name, "legacy", "services.json")
+        ServiceRepository(json_path).save(make_service("nginx"))
+        repo = make_repository("sqlite", json_path)
+        self.addCleanup(repo.close)
+        self.assertIsInstance(repo, SqliteServiceRepository)
+        self.assertEqual([s["name"] for s in repo.load_all()], ["nginx"])
+
+
+if __name__ == "__main__":
+    unittest.main()